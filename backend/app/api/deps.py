@@ -0,0 +1,86 @@
+import threading
+from typing import Optional
+from ..services.storage import VectorStorage
+from ..services.graph import GraphService
+from ..services.manifest import ManifestStore
+from ..services.lexical import LexicalIndexService
+from ..services.cache import SearchCache
+from ..services.ingestion import IngestionService
+from ..services.search import SearchService
+from ..services.jobs import JobManager
+
+class ServiceContainer:
+    """
+    Process-wide service graph. Every service shares one VectorStorage (one Chroma
+    client) and one GraphService (one graph/tree cache), so a graph built by an
+    ingest is immediately visible to search without reloading it from disk.
+    """
+    def __init__(self, storage: Optional[VectorStorage] = None, graph_service: Optional[GraphService] = None,
+                 manifest_store: Optional[ManifestStore] = None,
+                 lexical_index: Optional[LexicalIndexService] = None):
+        self.storage = storage or VectorStorage()
+        self.graph_service = graph_service or GraphService()
+        self.manifest_store = manifest_store or ManifestStore()
+        self.lexical_index = lexical_index or LexicalIndexService()
+        self.search_cache = SearchCache()
+        self.ingestion_service = IngestionService(
+            storage=self.storage,
+            graph_service=self.graph_service,
+            manifest_store=self.manifest_store,
+            lexical_index=self.lexical_index,
+            search_cache=self.search_cache
+        )
+        self.search_service = SearchService(
+            storage=self.storage,
+            graph_service=self.graph_service,
+            lexical_index=self.lexical_index,
+            cache=self.search_cache,
+            manifest_store=self.manifest_store
+        )
+        self.job_manager = JobManager(self.ingestion_service)
+
+    def shutdown(self):
+        self.job_manager.shutdown()
+
+
+_container: Optional[ServiceContainer] = None
+_container_lock = threading.Lock()
+
+def get_container() -> ServiceContainer:
+    """Returns the process-wide container, creating it on first use."""
+    global _container
+    if _container is None:
+        with _container_lock:
+            if _container is None:
+                _container = ServiceContainer()
+    return _container
+
+def set_container(container: Optional[ServiceContainer]):
+    """Replaces the process-wide container (used by tests and at shutdown)."""
+    global _container
+    with _container_lock:
+        _container = container
+
+def shutdown_container():
+    if _container is not None:
+        _container.shutdown()
+
+# FastAPI dependencies
+
+def get_storage() -> VectorStorage:
+    return get_container().storage
+
+def get_graph_service() -> GraphService:
+    return get_container().graph_service
+
+def get_ingestion_service() -> IngestionService:
+    return get_container().ingestion_service
+
+def get_manifest_store() -> ManifestStore:
+    return get_container().manifest_store
+
+def get_search_service() -> SearchService:
+    return get_container().search_service
+
+def get_job_manager() -> JobManager:
+    return get_container().job_manager
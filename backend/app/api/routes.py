@@ -1,63 +1,259 @@
-from fastapi import APIRouter, HTTPException, Query
-from ..schemas import IngestRequest
+from typing import List, Optional, Any
+from fastapi import APIRouter, HTTPException, Query, Depends
+from ..schemas import IngestRequest, BatchSearchRequest, EdgeType
 from ..services.ingestion import IngestionService
 from ..services.storage import VectorStorage
-from ..services.graph import GraphService
 from ..services.search import SearchService
+from ..services.jobs import JobManager
+from ..services.graph import GraphService
+from ..services.manifest import ManifestStore
+from .deps import get_ingestion_service, get_storage, get_search_service, get_job_manager, get_graph_service, get_manifest_store
 
 router = APIRouter()
-ingestion_service = IngestionService()
-storage_service = VectorStorage() 
-graph_service = GraphService()
-search_service = SearchService()
 
-@router.post("/ingest")
-def trigger_ingestion(request: IngestRequest):
+@router.post("/ingest", status_code=202)
+def trigger_ingestion(request: IngestRequest, job_manager: JobManager = Depends(get_job_manager)):
     """
-    Triggers ingestion from a GitHub repository URL.
-    Returns the project_id which must be used for subsequent queries.
+    Queues ingestion of a GitHub repository URL as a background job.
+    Returns the job_id to poll via /jobs/{job_id}, and the project_id
+    which must be used for subsequent queries. Each ref is indexed as its own
+    revision of the project; revisions share unchanged chunks.
     """
-    try:
-        stats = ingestion_service.ingest_project(repo_url=request.repo_url)
-        return {"status": "success", "stats": stats}
-    except Exception as e:
-        print(f"Ingestion Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    job = job_manager.submit(repo_url=request.repo_url, incremental=request.incremental, ref=request.ref)
+    return {"status": job.state, "job_id": job.id, "project_id": job.project_id}
+
+@router.get("/jobs")
+def list_jobs(job_manager: JobManager = Depends(get_job_manager)):
+    """
+    Lists known ingestion jobs (active and recently finished).
+    """
+    return {"jobs": [job.to_dict() for job in job_manager.list_jobs()]}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, job_manager: JobManager = Depends(get_job_manager)):
+    """
+    Returns the state, phase and progress counters of an ingestion job.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str, job_manager: JobManager = Depends(get_job_manager)):
+    """
+    Cancels a queued or running ingestion job.
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 @router.get("/search")
-def search_code(q: str, project_id: str = Query(..., description="The project ID returned from ingestion"), limit: int = 5):
+def search_code(q: str, project_id: str = Query(..., description="The project ID returned from ingestion"), limit: int = 5,
+                active_only: bool = Query(False, description="Return only the folders/files on hit paths"),
+                ref: Optional[str] = Query(None, description="Branch, tag or commit SHA of an ingested revision (default: the default branch)"),
+                search_service: SearchService = Depends(get_search_service),
+                storage_service: VectorStorage = Depends(get_storage)):
     """
     Semantic search + Codemap tree overlay.
     Returns the module tree with search hits injected.
     """
     try:
         # New Search Service Logic
-        result = search_service.search(project_id, q, limit)
+        result = search_service.search(project_id, q, limit, active_only=active_only, ref=ref)
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         # Fallback to simple vector search if something fails (or just raise)
         print(f"Search Error: {e}")
         try:
-             results = storage_service.query_code(project_id, q, n_results=limit)
+             scope = search_service.resolve(project_id, ref)
+             if scope is None:
+                 raise HTTPException(status_code=404, detail=f"Revision {ref} not found")
+             # Scoped to the same revision as the search itself
+             results = storage_service.query_code(project_id, q, n_results=limit, revision=scope[1])
              return {"results": results, "fallback": True}
+        except HTTPException:
+             raise
         except Exception as inner_e:
              raise HTTPException(status_code=500, detail=str(inner_e))
 
+@router.get("/graph/node")
+def get_graph_node(project_id: str = Query(..., description="The project ID returned from ingestion"),
+                   node_id: str = Query(..., description="Graph node ID, e.g. 'pkg/mod.py::MyClass'"),
+                   include_source: bool = Query(True, description="Resolve the node's source code"),
+                   ref: Optional[str] = Query(None, description="Branch, tag or commit SHA of an ingested revision (default: the default branch)"),
+                   search_service: SearchService = Depends(get_search_service)):
+    """
+    Returns a dependency-graph node's metadata, with its source resolved lazily from the vector store.
+    """
+    node = search_service.get_node(project_id, node_id, include_source=include_source, ref=ref)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return node
+
+@router.post("/search/batch")
+def search_code_batch(request: BatchSearchRequest, search_service: SearchService = Depends(get_search_service)):
+    """
+    Runs many queries against one project in a single call (one embedding batch,
+    one vector lookup). Returns per-query ranked chunks; the codemap tree overlay
+    is included only when include_tree is set.
+    """
+    try:
+        responses = search_service.search_batch(
+            request.project_id, request.queries, limit=request.limit,
+            include_tree=request.include_tree, active_only=request.active_only, ref=request.ref
+        )
+        return {"results": responses}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search/cache")
+def search_cache_stats(search_service: SearchService = Depends(get_search_service)):
+    """
+    Returns hit/miss counters and sizes of the search result and query-embedding caches.
+    """
+    return search_service.cache_stats()
+
+def _parse_edge_types(edge_types: Optional[str]) -> Optional[List[EdgeType]]:
+    if not edge_types:
+        return None
+    try:
+        return [EdgeType(t.strip().upper()) for t in edge_types.split(",") if t.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"edge_types must be a comma-separated subset of {[t.value for t in EdgeType]}")
+
+def _revision_key(project_id: str, ref: Optional[str], manifest_store: ManifestStore) -> str:
+    key = manifest_store.resolve_revision(project_id, ref)
+    if key is None:
+        raise HTTPException(status_code=404, detail=f"Revision {ref} not found")
+    return key
+
+def _paginate(items: List[Any], offset: int, limit: int) -> dict:
+    return {"total": len(items), "offset": offset, "limit": limit, "items": items[offset:offset + limit]}
+
+@router.get("/graph/tree")
+def get_graph_tree(project_id: str = Query(..., description="The project ID returned from ingestion"),
+                   ref: Optional[str] = Query(None, description="Branch, tag or commit SHA of an ingested revision (default: the default branch)"),
+                   graph_service: GraphService = Depends(get_graph_service),
+                   manifest_store: ManifestStore = Depends(get_manifest_store)):
+    """
+    Returns the hierarchical module tree (folders and files with layer and importance) of a revision.
+    """
+    tree = graph_service.get_module_tree(_revision_key(project_id, ref, manifest_store))
+    if tree is None:
+        raise HTTPException(status_code=404, detail="Project tree not found. Please ingest project first.")
+    return tree
+
+@router.get("/graph/neighbors")
+def get_graph_neighbors(project_id: str = Query(..., description="The project ID returned from ingestion"),
+                        node_id: str = Query(..., description="Graph node ID, e.g. 'pkg/mod.py'"),
+                        direction: str = Query("out", pattern="^(out|in|both)$", description="'out': what it imports/defines, 'in': what imports/defines it"),
+                        depth: int = Query(1, ge=1, le=50),
+                        edge_types: Optional[str] = Query(None, description="Comma-separated, e.g. 'IMPORTS,INHERITS'"),
+                        offset: int = Query(0, ge=0),
+                        limit: int = Query(100, ge=1, le=1000),
+                        ref: Optional[str] = Query(None, description="Branch, tag or commit SHA of an ingested revision (default: the default branch)"),
+                        graph_service: GraphService = Depends(get_graph_service),
+                        manifest_store: ManifestStore = Depends(get_manifest_store)):
+    """
+    Returns the k-hop neighbourhood of a node, ordered by distance.
+    """
+    items = graph_service.get_neighbors(_revision_key(project_id, ref, manifest_store), node_id, direction=direction, depth=depth,
+                                        edge_types=_parse_edge_types(edge_types))
+    if items is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return _paginate(items, offset, limit)
+
+@router.get("/graph/path")
+def get_graph_path(project_id: str = Query(..., description="The project ID returned from ingestion"),
+                   source: str = Query(..., description="Start node ID"),
+                   target: str = Query(..., description="End node ID"),
+                   edge_types: Optional[str] = Query(None, description="Edge types to follow (default: IMPORTS)"),
+                   ref: Optional[str] = Query(None, description="Branch, tag or commit SHA of an ingested revision (default: the default branch)"),
+                   graph_service: GraphService = Depends(get_graph_service),
+                   manifest_store: ManifestStore = Depends(get_manifest_store)):
+    """
+    Returns the shortest directed path from source to target, or null if none exists.
+    """
+    path = graph_service.find_path(_revision_key(project_id, ref, manifest_store), source, target, edge_types=_parse_edge_types(edge_types))
+    if path == []:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return {"path": path, "length": len(path) - 1 if path else None}
+
+@router.get("/graph/impact")
+def get_graph_impact(project_id: str = Query(..., description="The project ID returned from ingestion"),
+                     node_id: str = Query(..., description="File, class or function node ID"),
+                     max_depth: Optional[int] = Query(None, ge=1, description="Limit on dependency hops (default: unlimited)"),
+                     offset: int = Query(0, ge=0),
+                     limit: int = Query(100, ge=1, le=1000),
+                     ref: Optional[str] = Query(None, description="Branch, tag or commit SHA of an ingested revision (default: the default branch)"),
+                     graph_service: GraphService = Depends(get_graph_service),
+                     manifest_store: ManifestStore = Depends(get_manifest_store)):
+    """
+    Returns everything that transitively depends on a node (importers, subclasses), ordered by distance.
+    """
+    items = graph_service.get_impact(_revision_key(project_id, ref, manifest_store), node_id, max_depth=max_depth)
+    if items is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return _paginate(items, offset, limit)
+
+@router.get("/graph/analytics")
+def get_graph_analytics(project_id: str = Query(..., description="The project ID returned from ingestion"),
+                        top: int = Query(20, ge=1, le=1000, description="Number of top-ranked files to return"),
+                        ref: Optional[str] = Query(None, description="Branch, tag or commit SHA of an ingested revision (default: the default branch)"),
+                        graph_service: GraphService = Depends(get_graph_service),
+                        manifest_store: ManifestStore = Depends(get_manifest_store)):
+    """
+    Returns the analytics precomputed at ingest time: top files by PageRank,
+    import cycles, and transitive dependency counts of those files.
+    """
+    analytics = graph_service.get_analytics(_revision_key(project_id, ref, manifest_store))
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="No analytics for this project. Please ingest project first.")
+    ranks = analytics["pagerank"]
+    top_files = sorted(ranks, key=ranks.get, reverse=True)[:top]
+    depends_on, depended_by = analytics.get("depends_on") or {}, analytics.get("depended_by") or {}
+    return {
+        "files": analytics["files"],
+        "import_edges": analytics["import_edges"],
+        "cycles": analytics["cycles"],
+        "top_files": [
+            {"file": f, "pagerank": ranks[f], "depends_on": depends_on.get(f), "depended_by": depended_by.get(f)}
+            for f in top_files
+        ],
+    }
+
+@router.get("/revisions")
+def list_revisions(project_id: str = Query(..., description="The project ID"),
+                   manifest_store: ManifestStore = Depends(get_manifest_store)):
+    """
+    Lists the ingested revisions of a project: ref, commit SHA and ingest time.
+    """
+    revisions = manifest_store.load_revisions(project_id)
+    return {"revisions": [{"ref": ref, **info} for ref, info in sorted(revisions.items())]}
+
 @router.post("/clear")
-def clear_database(project_id: str = Query(..., description="The project ID to clear")):
+def clear_database(project_id: str = Query(..., description="The project ID to clear"),
+                   ref: Optional[str] = Query(None, description="Only drop this revision; chunks shared with other revisions are kept"),
+                   ingestion_service: IngestionService = Depends(get_ingestion_service)):
     """
-    Deletes all indexed data and dependency graphs for a specific project.
+    Deletes all indexed data and dependency graphs for a specific project,
+    or for one of its revisions.
     """
     try:
-        storage_count = storage_service.clear_all(project_id)
-        storage_service.delete_collection(project_id)
-        graph_service.delete_graph(project_id)
+        storage_count = ingestion_service.clear_project(project_id, ref=ref)
         return {"status": "success", "deleted_count": storage_count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stats")
-def get_stats(project_id: str = Query(..., description="The project ID")):
+def get_stats(project_id: str = Query(..., description="The project ID"),
+              storage_service: VectorStorage = Depends(get_storage)):
     """
     Get current database statistics for a project.
     """
@@ -1,8 +1,16 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api.routes import router as api_router
+from .api.deps import shutdown_container
 
-app = FastAPI(title="AutoWiki API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Cancel running ingestions so shutdown does not wait for a full clone + embed
+    shutdown_container()
+
+app = FastAPI(title="AutoWiki API", version="0.1.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
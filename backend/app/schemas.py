@@ -4,6 +4,32 @@ from enum import Enum
 
 class IngestRequest(BaseModel):
     repo_url: str
+    incremental: bool = False # Only re-index files whose blob SHA changed since the last ingest
+    ref: Optional[str] = None # Branch, tag or commit to index (default: the remote HEAD); each ref is a separate revision
+
+class BatchSearchRequest(BaseModel):
+    project_id: str
+    queries: List[str] = Field(..., min_length=1, max_length=256)
+    limit: int = Field(5, ge=1, le=100)
+    include_tree: bool = False # Codemap overlay per query (costly for large trees)
+    active_only: bool = False
+    ref: Optional[str] = None # Revision to search (default: the default branch)
+
+class JobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class JobPhase(str, Enum):
+    QUEUED = "queued"
+    CLONING = "cloning"
+    SCANNING = "scanning"
+    PARSING = "parsing"     # Parsing + chunking; embedding batches overlap with this phase
+    EMBEDDING = "embedding" # Flushing the remaining embedding batches
+    LINKING = "linking"     # Building import edges and the module tree
+    DONE = "done"
 
 class NodeType(str, Enum):
     FILE = "FILE"
@@ -41,6 +67,7 @@ class ClassInfo(BaseModel):
     bases: List[str]
     docstring: Optional[str] = None
     code: Optional[str] = None # Full source code of the class
+    chunk_id: Optional[str] = None # Vector-store chunk holding the source
     start_line: int
     end_line: int
 
@@ -50,6 +77,7 @@ class FunctionInfo(BaseModel):
     return_type: Optional[str] = None
     docstring: Optional[str] = None
     code: Optional[str] = None # Full source code of the function
+    chunk_id: Optional[str] = None # Vector-store chunk holding the source
     start_line: int
     end_line: int
 
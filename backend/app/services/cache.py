@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with an optional per-entry TTL (seconds).
+    Counts hits and misses so the size can be tuned from stats().
+    """
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at >= self.clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        expires_at = self.clock() + self.ttl if self.ttl else float("inf")
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class SearchCache:
+    """
+    Caches search responses per (project, query, parameters). Each project has a
+    generation number that is part of every key; invalidate_project() bumps it,
+    so a re-ingested or cleared project never serves stale results (the old
+    entries simply age out of the LRU).
+    """
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        if maxsize is None:
+            maxsize = int(os.getenv("AUTOWIKI_SEARCH_CACHE_SIZE", "256"))
+        if ttl is None:
+            ttl = float(os.getenv("AUTOWIKI_SEARCH_CACHE_TTL", "300"))
+        self.results = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def key(self, project_id: str, *params: Hashable) -> Tuple:
+        """
+        Builds the cache key for a request. Take it before computing the result:
+        if the project is invalidated meanwhile, the result is stored under the
+        old generation and never served.
+        """
+        return (project_id, self._generations.get(project_id, 0)) + params
+
+    def get(self, key: Tuple) -> Any:
+        return self.results.get(key)
+
+    def put(self, key: Tuple, value: Any):
+        self.results.put(key, value)
+
+    def invalidate_project(self, project_id: str):
+        with self._lock:
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return self.results.stats()
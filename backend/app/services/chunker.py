@@ -1,12 +1,39 @@
 import hashlib
 import os
-from typing import List, Dict, Any, Optional, Tuple, Union
-from .parser import CodeParser
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterator, List, Dict, Any, Optional, Tuple, Union
+from .parser import CodeParser, LANGUAGE_EXTENSIONS
 from ..schemas import FileStructure
 
+# Definitions above this many (estimated) tokens are split; the default matches
+# the embedding model's input window, beyond which text is silently truncated
+DEFAULT_CHUNK_TOKEN_BUDGET = int(os.getenv("AUTOWIKI_CHUNK_TOKEN_BUDGET", "256"))
+
+# Word pieces, numbers and single punctuation characters: close to how the
+# embedding tokenizer splits code (`build_module_tree` -> build _ module _ tree)
+_TOKEN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+# Characters read per block when chunking text files
+TEXT_BLOCK_SIZE = 1 << 20
+
+# Docs chunked as plain text; everything else needs a parser grammar
+TEXT_EXTENSIONS = frozenset({'.md', '.txt', '.rst', '.adoc'})
+# Files with any other extension produce no chunks
+CHUNKABLE_EXTENSIONS = TEXT_EXTENSIONS | frozenset(LANGUAGE_EXTENSIONS)
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+def part_chunk_id(chunk_id: str, part: int) -> str:
+    """ID of part N (N >= 1) of a split definition; part 0 keeps the definition's own ID."""
+    return hashlib.md5(f"{chunk_id}:part:{part}".encode('utf-8')).hexdigest()
+
 class CodeChunker:
-    def __init__(self):
+    def __init__(self, token_budget: Optional[int] = None):
         self.parser = CodeParser()
+        self.token_budget = token_budget or DEFAULT_CHUNK_TOKEN_BUDGET
 
     def chunk_file(self, file_path: str, rel_path: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -43,19 +70,20 @@ class CodeChunker:
             print(f"Skipping binary or non-utf8 file: {file_path}")
             return [], None
 
-        # Get Structure (new method)
-        structure = self.parser.extract_structure(code, language, path_for_id)
-        
-        # Get Definitions for chunking (using legacy logic or structure?)
-        # For now, use legacy definition extraction to preserve chunking logic exactly
-        # Ideally, we map structure -> chunks.
-        root_node = self.parser.parse_code(code, language)
-        definitions = self.parser.extract_definitions(root_node, language, code)
+        # One parse + one tree walk yields both the graph structure and the chunkable definitions
+        structure, definitions = self.parser.extract(code, language, path_for_id)
         
         chunks = []
-        for d in definitions:
-            chunk = self._create_chunk(d, file_path, path_for_id, language)
-            chunks.append(chunk)
+        chunk_ids = {}
+        for d, content_lines in zip(definitions, self._dedupe_nested(definitions)):
+            parts = self._create_chunks(d, content_lines, path_for_id, language)
+            chunks.extend(parts)
+            chunk_ids[(d['name'], d['start_line'])] = parts[0]['id']
+
+        # The source lives in the chunk; the structure only keeps a pointer to it
+        for info in structure.classes + structure.functions:
+            info.chunk_id = chunk_ids.get((info.name, info.start_line))
+            info.code = None
             
         return chunks, structure
 
@@ -64,84 +92,249 @@ class CodeChunker:
         Chunks text files with overlap. Calculates start/end lines.
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
+            return list(self.iter_text_chunks(file_path, chunk_size, overlap, rel_path))
         except UnicodeDecodeError:
             print(f"Skipping binary or non-utf8 file: {file_path}")
             return []
-            
+
+    def iter_text_chunks(self, file_path: str, chunk_size: int = 1000, overlap: int = 200,
+                         rel_path: str = None, block_size: int = TEXT_BLOCK_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Streams a text file in blocks and yields overlapping chunks of at most
+        `chunk_size` characters. Chunks end at the last heading, paragraph break or
+        line break in the window (in that order of preference) past its first half;
+        the next chunk starts on a line boundary within `overlap` of the end.
+        Only the current block plus one unfinished chunk is held in memory.
+        """
         path_for_id = rel_path if rel_path else file_path
-        chunks = []
-        start = 0
-        text_len = len(text)
-        
-        # Pre-calculate line offsets for efficient lookup
-        # lines_indices[i] = char index where line i starts
-        lines_indices = [0]
-        for i, char in enumerate(text):
-            if char == '\n':
-                lines_indices.append(i + 1)
-        
-        while start < text_len:
-            end = start + chunk_size
-            chunk_content = text[start:end]
-            
-            # Create a deterministic ID based on RELATIVE path
-            chunk_id = hashlib.md5(f"{path_for_id}:text:{start}".encode('utf-8')).hexdigest()
-            
-            # Calculate line numbers
-            start_line = self._get_line_number(start, lines_indices)
-            end_line = self._get_line_number(end, lines_indices)
+        name = os.path.basename(file_path)
+        min_size = max(chunk_size // 2, 1)
+        block_size = max(block_size, chunk_size + 1)
 
-            chunks.append({
-                "id": chunk_id,
-                "content": chunk_content,
-                "metadata": {
-                    "name": os.path.basename(file_path),
-                    "type": "documentation",
-                    "file_path": path_for_id, # Store relative path directly
-                    "language": "text", 
-                    "start_line": start_line,
-                    "end_line": end_line
+        with open(file_path, 'r', encoding='utf-8') as f:
+            buf = ""
+            buf_offset = 0  # file offset of buf[0], in characters
+            buf_line = 1    # line number of buf[0]
+            start = 0       # start of the next chunk, relative to buf
+            eof = False
+            while True:
+                if not eof and len(buf) - start <= chunk_size:
+                    # Drop what is behind the next chunk, then refill
+                    buf_line += buf.count("\n", 0, start)
+                    buf_offset += start
+                    block = f.read(block_size)
+                    buf = buf[start:] + block
+                    # A short read only happens at the end of the file
+                    eof = len(block) < block_size
+                    start = 0
+                    # lines_indices[i] = buffer index where line buf_line + i starts
+                    lines_indices = [0]
+                    lines_indices.extend(accumulate(len(line) + 1 for line in buf.split("\n")))
+                    lines_indices.pop()
+                if start >= len(buf):
+                    return
+
+                if len(buf) - start <= chunk_size:
+                    end = len(buf)
+                else:
+                    end = self._text_boundary(buf, start + min_size, start + chunk_size)
+
+                # Create a deterministic ID based on RELATIVE path, offset and content
+                content = buf[start:end]
+                chunk_id = hashlib.md5(f"{path_for_id}:text:{buf_offset + start}\0{content}".encode('utf-8')).hexdigest()
+                yield {
+                    "id": chunk_id,
+                    "content": content,
+                    "metadata": {
+                        "name": name,
+                        "type": "documentation",
+                        "file_path": path_for_id, # Store relative path directly
+                        "language": "text",
+                        "start_line": buf_line - 1 + self._get_line_number(start, lines_indices),
+                        "end_line": buf_line - 1 + self._get_line_number(end - 1, lines_indices)
+                    }
                 }
-            })
-            
-            start += (chunk_size - overlap)
-            
-        return chunks
+                if end >= len(buf) and eof:
+                    return
+
+                # Overlap: back up by `overlap`, then forward to the next line start
+                next_start = end - overlap
+                if next_start <= start:
+                    next_start = end
+                else:
+                    newline = buf.find("\n", next_start, end)
+                    if newline != -1:
+                        next_start = newline + 1
+                start = next_start
+
+    @staticmethod
+    def _text_boundary(text: str, lo: int, hi: int) -> int:
+        """Where to end a chunk within text[lo:hi]: after a heading, paragraph or line break."""
+        heading = text.rfind("\n#", lo - 1, hi)
+        if heading != -1:
+            return heading + 1
+        paragraph = text.rfind("\n\n", lo - 2, hi)
+        if paragraph != -1:
+            return paragraph + 2
+        line = text.rfind("\n", lo - 1, hi)
+        if line != -1:
+            return line + 1
+        return hi
 
     def _get_line_number(self, char_index: int, lines_indices: List[int]) -> int:
-        """Binary search or simple scan to find line number."""
-        # Simple scan is fine for now, or bisect if needed for huge files
-        # 1-based line number
-        for i, idx in enumerate(lines_indices):
-            if idx > char_index:
-                return i 
-        return len(lines_indices)
-
-    def _create_chunk(self, definition: Dict[str, Any], abs_path: str, rel_path: str, language: str) -> Dict[str, Any]:
-        """Format a definition into a storage-ready chunk."""
-        content = definition['code']
-        # Create a deterministic ID based on path + name + type + start_line
-        # Adding start_line ensures uniqueness even for overloaded methods or same-name functions in different scopes
-        unique_str = f"{rel_path}:{definition['type']}:{definition['name']}:{definition['start_line']}"
-        chunk_id = hashlib.md5(unique_str.encode('utf-8')).hexdigest()
+        """1-based line number of a character index, by binary search over line start offsets."""
+        return bisect_right(lines_indices, char_index)
+
+    def _dedupe_nested(self, definitions: List[Dict[str, Any]]) -> List[List[Tuple[int, str]]]:
+        """
+        Returns each definition's content as (line number, text) pairs, with the
+        bodies of directly nested definitions (methods, inner functions) collapsed
+        to their header plus `...`. Those are chunks of their own, so a class chunk
+        becomes a summary of its members instead of embedding their text again.
+        """
+        # Direct parent of each definition, found with a stack over (start, -end) order
+        order = sorted(range(len(definitions)),
+                       key=lambda i: (definitions[i]['start_line'], -definitions[i]['end_line']))
+        children: Dict[int, List[int]] = {}
+        stack: List[int] = []
+        for i in order:
+            d = definitions[i]
+            while stack and definitions[stack[-1]]['end_line'] < d['end_line']:
+                stack.pop()
+            if stack and d['start_line'] > definitions[stack[-1]]['start_line']:
+                children.setdefault(stack[-1], []).append(i)
+            stack.append(i)
+
+        contents = []
+        for i, d in enumerate(definitions):
+            lines = list(enumerate(d['code'].split("\n"), d['start_line']))
+            for child_index in reversed(children.get(i, [])):
+                child = definitions[child_index]
+                header_end = max(child.get('body_line', child['start_line']) - 1, child['start_line'])
+                if header_end >= child['end_line']:
+                    continue
+                first = header_end + 1 - d['start_line']
+                last = child['end_line'] - d['start_line']
+                body_text = lines[first][1]
+                indent = body_text[:len(body_text) - len(body_text.lstrip())]
+                lines[first:last + 1] = [(header_end + 1, f"{indent}...")]
+            contents.append(lines)
+        return contents
+
+    def _create_chunks(self, definition: Dict[str, Any], lines: List[Tuple[int, str]],
+                       rel_path: str, language: str) -> List[Dict[str, Any]]:
+        """
+        Formats a definition into storage-ready chunks. Content over the token
+        budget is split into parts at the body's statement boundaries; parts after
+        the first repeat the definition's first line for context.
+        """
+        source_tokens = estimate_tokens(definition['code'])
 
-        return {
-            "id": chunk_id,
-            "content": content,
-            "metadata": {
+        line_tokens = [estimate_tokens(text) for _, text in lines]
+        total_tokens = sum(line_tokens)
+        if total_tokens <= self.token_budget:
+            parts = [list(range(len(lines)))]
+        else:
+            parts = self._split_lines(lines, line_tokens, set(definition.get('boundaries', ())))
+
+        context = lines[0][1]
+        context_tokens = line_tokens[0]
+        chunks = []
+        for part, indices in enumerate(parts):
+            content = "\n".join(lines[i][1] for i in indices)
+            tokens = sum(line_tokens[i] for i in indices)
+            metadata = {
                 "name": definition['name'],
                 "type": definition['type'],
                 "file_path": rel_path, # Store relative path
                 "language": language,
-                "start_line": definition['start_line'],
-                "end_line": definition['end_line']
+                "start_line": lines[indices[0]][0],
+                "end_line": lines[indices[-1]][0] if part < len(parts) - 1 else definition['end_line'],
             }
-        }
+            if part > 0:
+                content = f"{context}\n{content}"
+                tokens += context_tokens
+                metadata["context_lines"] = 1
+            if len(parts) > 1:
+                metadata.update(part=part, parts=len(parts))
+            metadata["tokens"] = tokens
+            # What embedding the whole definition would have cost, for the ingestion stats
+            if part == 0 and (len(parts) > 1 or tokens != source_tokens):
+                metadata["source_tokens"] = source_tokens
+            chunks.append({
+                "id": None, # Assigned below, once all parts are known
+                "content": content,
+                "metadata": metadata
+            })
+
+        # Create a deterministic ID based on path + name + type + start_line
+        # Adding start_line ensures uniqueness even for overloaded methods or same-name functions in different scopes
+        unique_str = f"{rel_path}:{definition['type']}:{definition['name']}:{definition['start_line']}"
+        # ...and the content, so an ID always denotes the same stored chunk: revisions
+        # sharing a definition share its chunks, while a changed one gets new IDs
+        digest = hashlib.md5(unique_str.encode('utf-8'))
+        for chunk in chunks:
+            digest.update(b"\0" + chunk["content"].encode('utf-8'))
+        chunk_id = digest.hexdigest()
+        for part, chunk in enumerate(chunks):
+            chunk["id"] = chunk_id if part == 0 else part_chunk_id(chunk_id, part)
+        return chunks
+
+    def _split_lines(self, lines: List[Tuple[int, str]], line_tokens: List[int], boundaries: set) -> List[List[int]]:
+        """
+        Greedily packs line indices into parts within the token budget. Segments
+        start at AST boundaries (the statements/members of the body) and are only
+        cut between lines when a single segment is over budget on its own.
+        """
+        segments: List[List[int]] = []
+        for i, (line_no, _) in enumerate(lines):
+            if not segments or line_no in boundaries:
+                segments.append([])
+            segments[-1].append(i)
+
+        # Parts after the first carry the context line
+        budget = max(self.token_budget - line_tokens[0], 1)
+        parts: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+
+        def flush():
+            nonlocal current, current_tokens
+            if current:
+                parts.append(current)
+            current, current_tokens = [], 0
+
+        for segment in segments:
+            segment_tokens = sum(line_tokens[i] for i in segment)
+            if current and current_tokens + segment_tokens > budget:
+                flush()
+            if segment_tokens <= budget:
+                current.extend(segment)
+                current_tokens += segment_tokens
+                continue
+            # Oversized statement: fall back to line boundaries (a single huge line stays whole)
+            for i in segment:
+                if current and current_tokens + line_tokens[i] > budget:
+                    flush()
+                current.append(i)
+                current_tokens += line_tokens[i]
+        flush()
+        return parts
 
     def _is_text_file(self, file_path: str) -> bool:
         """Simple check for text/docs extensions."""
-        text_exts = {'.md', '.txt', '.rst', '.adoc'}
         _, ext = os.path.splitext(file_path)
-        return ext.lower() in text_exts
+        return ext.lower() in TEXT_EXTENSIONS
+
+
+# Per-process chunker for parallel ingestion; each worker holds its own CodeParser.
+_worker_chunker: Optional[CodeChunker] = None
+
+def init_chunk_worker():
+    """ProcessPoolExecutor initializer: builds the worker's parser once."""
+    global _worker_chunker
+    _worker_chunker = CodeChunker()
+
+def chunk_files_in_worker(tasks: List[Tuple[str, str]]) -> List[Tuple[List[Dict[str, Any]], Optional[FileStructure]]]:
+    """Chunks a group of (file_path, rel_path) pairs. Chunks are plain dicts, so results pickle cheaply."""
+    return [_worker_chunker.chunk_and_structure(file_path, rel_path=rel_path) for file_path, rel_path in tasks]
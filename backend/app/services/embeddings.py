@@ -0,0 +1,312 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Dict, Optional, Iterable
+import numpy as np
+from .cache import LRUCache
+
+# Backend selection and tuning; see get_embedding_backend()
+DEFAULT_EMBEDDING_BACKEND = os.getenv("AUTOWIKI_EMBEDDING_BACKEND", "onnx")
+DEFAULT_EMBEDDING_BATCH_SIZE = int(os.getenv("AUTOWIKI_EMBEDDING_BATCH_SIZE", "32"))
+# 0 lets the runtime pick (usually one thread per physical core)
+DEFAULT_EMBEDDING_THREADS = int(os.getenv("AUTOWIKI_EMBEDDING_THREADS", "0"))
+# In-memory query-text -> vector entries, in front of the persistent cache
+DEFAULT_QUERY_CACHE_SIZE = int(os.getenv("AUTOWIKI_QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+class EmbeddingBackend:
+    """
+    Turns texts into fixed-size vectors. `name` identifies the model: vectors
+    from different backends are not comparable and are cached separately.
+    """
+    name: str = "base"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embeds one batch; returns a float32 array of shape (len(texts), dim)."""
+        raise NotImplementedError
+
+
+# all-MiniLM-L6-v2 as published for Chroma's default embedding function. The default
+# directory is where Chroma itself keeps it, so an existing download is reused.
+ONNX_MODEL_URL = "https://chroma-onnx-models.s3.amazonaws.com/all-MiniLM-L6-v2/onnx.tar.gz"
+ONNX_MODEL_SHA256 = "913d7300ceae3b2dbc2c50d1de4baacab4be7b9380491c27fab7418616a16ec3"
+DEFAULT_ONNX_MODEL_DIR = os.getenv(
+    "AUTOWIKI_ONNX_MODEL_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "chroma", "onnx_models", "all-MiniLM-L6-v2"),
+)
+# The archive unpacks into this folder under the model directory
+ONNX_MODEL_FOLDER = "onnx"
+ONNX_MAX_TOKENS = 256
+
+def download_onnx_model(model_dir: str, url: str = ONNX_MODEL_URL, sha256: str = ONNX_MODEL_SHA256) -> str:
+    """
+    Makes sure the model is unpacked under model_dir and returns the folder holding
+    model.onnx and tokenizer.json. The archive is checked against sha256 before
+    anything is extracted.
+    """
+    folder = os.path.join(model_dir, ONNX_MODEL_FOLDER)
+    if all(os.path.exists(os.path.join(folder, f)) for f in ("model.onnx", "tokenizer.json")):
+        return folder
+
+    import tarfile
+    import urllib.request
+
+    os.makedirs(model_dir, exist_ok=True)
+    archive = os.path.join(model_dir, "onnx.tar.gz")
+    print(f"Downloading embedding model from {url}")
+    digest = hashlib.sha256()
+    with urllib.request.urlopen(url) as response, open(archive + ".part", "wb") as f:
+        for block in iter(lambda: response.read(1 << 20), b""):
+            digest.update(block)
+            f.write(block)
+    if digest.hexdigest() != sha256:
+        os.remove(archive + ".part")
+        raise RuntimeError(f"Embedding model download from {url} failed its sha256 check")
+    os.replace(archive + ".part", archive)
+
+    root = os.path.realpath(model_dir)
+    with tarfile.open(archive, "r:gz") as tar:
+        for member in tar.getmembers():
+            target = os.path.realpath(os.path.join(root, member.name))
+            if not (member.isfile() or member.isdir()) or os.path.commonpath([root, target]) != root:
+                raise RuntimeError(f"Refusing to extract {member.name!r} from {archive}")
+        tar.extractall(root)
+    os.remove(archive)
+    return folder
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Averages token vectors over the attention mask and L2-normalises the result."""
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (hidden * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    all-MiniLM-L6-v2 on onnxruntime (the model Chroma uses by default), with
+    explicit control over the batch size and intra-op thread count.
+    Tokenisation uses the model's tokenizer.json; pooling is done by mean_pool().
+    """
+    name = "onnx-all-MiniLM-L6-v2"
+    dimension = 384
+
+    def __init__(self, batch_size: Optional[int] = None, threads: Optional[int] = None,
+                 model_dir: Optional[str] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.batch_size = batch_size or DEFAULT_EMBEDDING_BATCH_SIZE
+        self.threads = DEFAULT_EMBEDDING_THREADS if threads is None else threads
+        self.model_dir = model_dir or DEFAULT_ONNX_MODEL_DIR
+        self._ort = ort
+        self._tokenizer_cls = Tokenizer
+        self._tokenizer = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _ensure_session(self):
+        """Downloads the model if needed and builds the tokenizer and inference session."""
+        if self._session is not None:
+            return
+        folder = download_onnx_model(self.model_dir)
+
+        tokenizer = self._tokenizer_cls.from_file(os.path.join(folder, "tokenizer.json"))
+        tokenizer.enable_truncation(max_length=ONNX_MAX_TOKENS)
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        so = self._ort.SessionOptions()
+        so.log_severity_level = 3
+        so.graph_optimization_level = self._ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads > 0:
+            so.intra_op_num_threads = self.threads
+        providers = [p for p in self._ort.get_available_providers() if p != "CoreMLExecutionProvider"]
+        self._tokenizer = tokenizer
+        self._session = self._ort.InferenceSession(
+            os.path.join(folder, "model.onnx"), providers=providers, sess_options=so
+        )
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        hidden = self._session.run(None, {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids),
+        })[0]
+        return mean_pool(hidden, attention_mask)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            self._ensure_session()
+            batches = [
+                self._embed_batch(texts[i:i + self.batch_size])
+                for i in range(0, len(texts), self.batch_size)
+            ]
+        if not batches:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.concatenate(batches)
+
+
+class HashEmbeddingBackend(EmbeddingBackend):
+    """
+    Dependency-free, deterministic feature-hashing embedding (identifier and
+    word tokens hashed into a fixed number of buckets, L2-normalised).
+    Works offline; useful for tests and air-gapped installs, where it gives
+    keyword-level rather than semantic similarity.
+    """
+    _TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self.name = f"hash-{dimension}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self._TOKEN.findall(text.lower()):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                # Signed hashing keeps collisions from only ever adding up
+                sign = 1.0 if value & 1 else -1.0
+                vectors[row, (value >> 1) % self.dimension] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+def get_embedding_backend(name: Optional[str] = None, batch_size: Optional[int] = None,
+                          threads: Optional[int] = None) -> EmbeddingBackend:
+    """Builds the backend named by `name` or AUTOWIKI_EMBEDDING_BACKEND ('onnx' or 'hash')."""
+    name = (name or DEFAULT_EMBEDDING_BACKEND).lower()
+    if name == "onnx":
+        return OnnxEmbeddingBackend(batch_size=batch_size, threads=threads)
+    if name == "hash":
+        return HashEmbeddingBackend()
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+class EmbeddingCache:
+    """
+    Persistent content-hash -> vector cache in SQLite, shared by all projects.
+    Keyed by (model name, sha256 of the text), so identical chunks (vendored
+    files, unchanged functions across re-ingests) are embedded only once.
+    """
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.getenv("AUTOWIKI_EMBEDDING_CACHE", os.path.join(os.getcwd(), "data", "embedding_cache.db"))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # One connection shared by the ingestion writer threads and API request threads
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        hashes = list(hashes)
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                for h, blob in self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch]
+                ):
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [(model, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingEngine:
+    """
+    Embeds texts through a backend in fixed-size batches, consulting the
+    persistent cache first. Duplicate texts within one call are embedded once.
+    """
+    def __init__(self, backend: Optional[EmbeddingBackend] = None, cache: Optional[EmbeddingCache] = None,
+                 batch_size: Optional[int] = None, query_cache_size: Optional[int] = None):
+        self.backend = backend or get_embedding_backend()
+        self.cache = cache
+        self.batch_size = batch_size or DEFAULT_EMBEDDING_BATCH_SIZE
+        # Query vectors depend only on the text and model, so they never need invalidating
+        self.query_cache = LRUCache(maxsize=DEFAULT_QUERY_CACHE_SIZE if query_cache_size is None else query_cache_size)
+        # Counters for ingestion stats
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        hashes = [self.content_hash(t) for t in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        if self.cache is not None:
+            vectors = self.cache.get_many(self.backend.name, set(hashes))
+
+        # Unique texts not yet cached, in first-seen order
+        missing: Dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in vectors and h not in missing:
+                missing[h] = text
+        self.cache_hits += len(texts) - sum(1 for h in hashes if h in missing)
+        self.cache_misses += len(missing)
+
+        if missing:
+            missing_hashes = list(missing)
+            computed: Dict[str, np.ndarray] = {}
+            for i in range(0, len(missing_hashes), self.batch_size):
+                batch = missing_hashes[i:i + self.batch_size]
+                for h, vector in zip(batch, self.backend.embed([missing[h] for h in batch])):
+                    computed[h] = vector
+            if self.cache is not None:
+                self.cache.put_many(self.backend.name, computed)
+            vectors.update(computed)
+
+        return [vectors[h].tolist() for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Query vectors, memoised in the bounded in-memory LRU only: ad-hoc search
+        text would otherwise grow the persistent cache with traffic, not the corpus.
+        Uncached queries are embedded together, in backend-sized batches.
+        """
+        vectors = [self.query_cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            computed = {}
+            for i in range(0, len(missing), self.batch_size):
+                batch = missing[i:i + self.batch_size]
+                for text, vector in zip(batch, self.backend.embed(batch)):
+                    computed[text] = vector.tolist()
+            for text, vector in computed.items():
+                self.query_cache.put(text, vector)
+            vectors = [v if v is not None else computed[t] for t, v in zip(texts, vectors)]
+        return vectors
@@ -1,29 +1,169 @@
 import networkx as nx
+import functools
+import hashlib
 import json
 import os
-from typing import List, Dict, Optional, Any
-from pathlib import Path
-from ..schemas import GraphNode, GraphEdge, NodeType, EdgeType, GraphData, FileStructure, ImportInfo, ClassInfo, FunctionInfo
+import threading
+from contextlib import contextmanager
+import numpy as np
+from typing import List, Dict, Optional, Any, Iterable, Tuple
+from ..schemas import GraphNode, GraphEdge, NodeType, EdgeType, GraphData, FileStructure, ClassInfo, FunctionInfo
+from .graph_store import GraphStore, EDGE_TYPE_CODES
+from .import_resolver import ImportResolver, js_module_keys, js_key_files
+from .graph_index import CSRGraph, GraphIndex, pagerank, strongly_connected_components, reachability_counts
+
+# Transitive dependency counts use O(files^2) bits; skip them for larger graphs
+ANALYTICS_REACH_MAX_FILES = int(os.getenv("AUTOWIKI_ANALYTICS_REACH_MAX_FILES", "20000"))
+
+class ReadWriteLock:
+    """
+    Many readers or one writer, preferring writers: once a writer waits, new
+    readers queue behind it, so a stream of queries cannot starve an ingest.
+    A thread that already reads may read again without waiting, and the writer
+    may re-enter and read. A thread holding only a read lock must not take the
+    write lock (it would wait for itself).
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        # thread ident -> read depth
+        self._readers: Dict[int, int] = {}
+        self._writer: Optional[int] = None
+        self._depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._cond:
+            owned = self._writer == me
+            if not owned:
+                if me not in self._readers:
+                    while self._writer is not None or self._waiting_writers:
+                        self._cond.wait()
+                self._readers[me] = self._readers.get(me, 0) + 1
+        try:
+            yield
+        finally:
+            if not owned:
+                with self._cond:
+                    self._readers[me] -= 1
+                    if not self._readers[me]:
+                        del self._readers[me]
+                        if not self._readers:
+                            self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._cond.wait()
+                finally:
+                    self._waiting_writers -= 1
+                self._writer = me
+            self._depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+def _reads(method):
+    """Runs a GraphService method under the read lock of its project/revision."""
+    @functools.wraps(method)
+    def wrapper(self, project_id, *args, **kwargs):
+        with self.lock(project_id).read():
+            return method(self, project_id, *args, **kwargs)
+    return wrapper
+
+def _writes(method):
+    """Runs a GraphService method under the write lock of its project/revision."""
+    @functools.wraps(method)
+    def wrapper(self, project_id, *args, **kwargs):
+        with self.lock(project_id).write():
+            return method(self, project_id, *args, **kwargs)
+    return wrapper
+
 
 class GraphService:
+    """
+    Dependency graphs, module trees and analytics per project revision, shared by
+    ingestion workers and API requests. Each revision has a ReadWriteLock: methods
+    that change its graph or caches take the write side, queries the read side.
+    """
     def __init__(self, base_path: str = "backend/data/graphs"):
         self.base_path = base_path
         # Cache for multiple projects: project_id -> nx.DiGraph
         self.graphs: Dict[str, nx.DiGraph] = {}
         # Cache for multiple projects: project_id -> {module_path: file_path}
         self.file_maps: Dict[str, Dict[str, str]] = {}
+        # Parsed module trees: project_id -> tree, plus node_id -> child-index path from the root
+        self.trees: Dict[str, Dict[str, Any]] = {}
+        self.tree_paths: Dict[str, Dict[str, Tuple[int, ...]]] = {}
+        # Per-file search re-ranking signals: project_id -> {importance, layer, neighbors}
+        self.rank_signals: Dict[str, Dict[str, Any]] = {}
+        # Precomputed graph analytics: project_id -> metrics (see compute_analytics)
+        self.analytics: Dict[str, Dict[str, Any]] = {}
+        # CSR adjacency for graph queries, rebuilt lazily after the graph changes
+        self.graph_indexes: Dict[str, GraphIndex] = {}
+        # Compiled imports and resolution state per project, bound to that project's file_map
+        self.import_resolvers: Dict[str, ImportResolver] = {}
+        # Nodes whose attributes changed since the last save: project_id -> {node_id}
+        self.dirty_nodes: Dict[str, set] = {}
+        self._locks: Dict[str, ReadWriteLock] = {}
+        self._locks_lock = threading.Lock()
+        # Serialises lazy loads: concurrent readers of an unloaded graph load it once
+        self._load_lock = threading.Lock()
         
         if not os.path.exists(self.base_path):
             os.makedirs(self.base_path, exist_ok=True)
 
     def _get_graph_path(self, project_id: str) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in project_id)
+        return os.path.join(self.base_path, f"{safe_id}.graph.db")
+
+    def _get_legacy_graph_path(self, project_id: str) -> str:
+        """Indented-JSON format written by earlier versions; still readable."""
         safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in project_id)
         return os.path.join(self.base_path, f"{safe_id}.json")
 
+    def _get_store(self, project_id: str) -> GraphStore:
+        return GraphStore(self._get_graph_path(project_id))
+
+    def _get_tree_path(self, project_id: str) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in project_id)
+        return os.path.join(self.base_path, f"{safe_id}_tree.json")
+
+    def _get_signals_path(self, project_id: str) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in project_id)
+        return os.path.join(self.base_path, f"{safe_id}_signals.json")
+
+    def _get_analytics_path(self, project_id: str) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in project_id)
+        return os.path.join(self.base_path, f"{safe_id}_analytics.json")
+
+    def lock(self, project_id: str) -> ReadWriteLock:
+        """
+        The reader/writer lock of a project (revision). Hold `.read()` while using
+        objects returned by the graph or tree accessors across several calls, and
+        `.write()` around a sequence of changes that readers must see all at once.
+        """
+        with self._locks_lock:
+            return self._locks.setdefault(project_id, ReadWriteLock())
+
     def _get_or_create_graph(self, project_id: str) -> nx.DiGraph:
         """Retrieves graph from memory or loads it."""
         if project_id not in self.graphs:
-            self.load_graph(project_id)
+            with self._load_lock:
+                if project_id not in self.graphs:
+                    self.load_graph(project_id)
         return self.graphs[project_id]
 
     def _get_file_map(self, project_id: str) -> Dict[str, str]:
@@ -31,90 +171,170 @@ class GraphService:
             self.file_maps[project_id] = {}
         return self.file_maps[project_id]
 
+    def _get_import_resolver(self, project_id: str) -> ImportResolver:
+        graph = self._get_or_create_graph(project_id)
+        file_map = self._get_file_map(project_id)
+        resolver = self.import_resolvers.get(project_id)
+        # load_graph() replaces the file_map, which invalidates the resolver's state
+        if resolver is None or resolver.module_index is not file_map:
+            resolver = ImportResolver(file_map, graph.graph.get("path_aliases"))
+            self.import_resolvers[project_id] = resolver
+        return resolver
+
+    @_writes
+    def set_path_aliases(self, project_id: str, path_aliases: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        Stores the tsconfig/jsconfig aliases of a project (see load_path_aliases).
+        Returns True if they changed, in which case all import edges must be rebuilt.
+        """
+        graph = self._get_or_create_graph(project_id)
+        if graph.graph.get("path_aliases", {}) == path_aliases:
+            return False
+        if path_aliases:
+            graph.graph["path_aliases"] = path_aliases
+        else:
+            graph.graph.pop("path_aliases", None)
+        self.import_resolvers.pop(project_id, None)
+        return True
+
     def load_graph(self, project_id: str):
-        """Loads the graph from JSON storage and rebuilds the file_map."""
-        path = self._get_graph_path(project_id)
+        """
+        Loads the graph and rebuilds the file_map. Only node IDs, types and edges are
+        read; node attributes stay on disk until get_node_attributes asks for them.
+        """
+        store = self._get_store(project_id)
+        legacy_path = self._get_legacy_graph_path(project_id)
         graph = nx.DiGraph()
         file_map = {}
+        dirty = set()
         
-        if os.path.exists(path):
-            try:
-                with open(path, 'r') as f:
-                    data = json.load(f)
-                    # Reconstruct graph from JSON
-                    for node in data.get("nodes", []):
-                        graph.add_node(node["id"], **node)
-                        # Rebuild file_map if it's a file node
-                        if node.get("type") == NodeType.FILE:
-                            file_path = node.get("attributes", {}).get("path")
-                            if file_path:
-                                self._update_file_map_entry(file_map, file_path)
-                                
-                    for edge in data.get("edges", []):
-                        graph.add_edge(edge["source"], edge["target"], **edge)
-            except Exception as e:
-                print(f"Error loading graph for {project_id}: {e}")
+        try:
+            if store.exists():
+                graph = store.load()
+            elif os.path.exists(legacy_path):
+                graph = self._load_legacy_graph(legacy_path)
+                # Everything is re-written on the next save, migrating to the compact format
+                dirty = set(graph.nodes)
+        except Exception as e:
+            print(f"Error loading graph for {project_id}: {e}")
+            graph = nx.DiGraph()
+
+        # Rebuild file_map from FILE node IDs (the ID is the relative path)
+        for node_id, node_type in graph.nodes(data="type"):
+            if node_type == NodeType.FILE:
+                self._update_file_map_entry(file_map, node_id)
         
         self.graphs[project_id] = graph
         self.file_maps[project_id] = file_map
+        self.dirty_nodes[project_id] = dirty
 
+    def _load_legacy_graph(self, path: str) -> nx.DiGraph:
+        graph = nx.DiGraph()
+        with open(path, 'r') as f:
+            data = json.load(f)
+        graph.add_nodes_from(
+            (node["id"], {"type": NodeType(node["type"]), "attributes": node.get("attributes", {})})
+            for node in data.get("nodes", [])
+        )
+        graph.add_edges_from(
+            (edge["source"], edge["target"], {"type": EdgeType(edge["type"])})
+            for edge in data.get("edges", [])
+        )
+        return graph
+
+    @_writes
     def save_graph(self, project_id: str):
-        """Persists the graph to JSON storage."""
+        """
+        Persists the graph in the compact SQLite format. Only attributes of nodes
+        changed since the last save are re-encoded. Afterwards class/function
+        attributes are released from memory; they can be re-read lazily.
+        """
         if project_id not in self.graphs:
             return
 
-        path = self._get_graph_path(project_id)
         graph = self.graphs[project_id]
-        
-        # Convert graph to serializable format
-        nodes_data = []
-        for n, attrs in graph.nodes(data=True):
-            nodes_data.append({
-                "id": n,
-                "type": attrs.get("type"),
-                "attributes": attrs.get("attributes", {})
-            })
-            
-        edges_data = []
-        for u, v, attrs in graph.edges(data=True):
-            edges_data.append({
-                "source": u,
-                "target": v,
-                "type": attrs.get("type"),
-                "attributes": attrs.get("attributes", {})
-            })
+        dirty = self.dirty_nodes.get(project_id, set())
+        self._get_store(project_id).save(graph, dirty)
+        self.dirty_nodes[project_id] = set()
 
-        data = {
-            "nodes": nodes_data,
-            "edges": edges_data
-        }
-        
-        with open(path, 'w') as f:
-            json.dump(data, f, indent=2)
+        legacy_path = self._get_legacy_graph_path(project_id)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+
+        for node_id, attrs in graph.nodes(data=True):
+            if attrs.get("type") in (NodeType.CLASS, NodeType.FUNCTION):
+                attrs.pop("attributes", None)
+
+    def get_node_attributes(self, project_id: str, node_id: str) -> Dict[str, Any]:
+        """Returns a node's attributes, reading them from the graph store on first access."""
+        return self.get_nodes_attributes(project_id, [node_id]).get(node_id, {})
 
+    @_reads
+    def get_nodes_attributes(self, project_id: str, node_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Batch version of get_node_attributes: one store read for all missing nodes."""
+        graph = self._get_or_create_graph(project_id)
+        result = {}
+        missing = []
+        for node_id in node_ids:
+            if not graph.has_node(node_id):
+                continue
+            attrs = graph.nodes[node_id].get("attributes")
+            if attrs is None:
+                missing.append(node_id)
+            else:
+                result[node_id] = attrs
+        if missing:
+            loaded = self._get_store(project_id).read_attributes(missing)
+            for node_id in missing:
+                attrs = loaded.get(node_id, {})
+                # FILE attributes (imports) are small and reused by build_edges, so keep them
+                if graph.nodes[node_id].get("type") == NodeType.FILE:
+                    graph.nodes[node_id]["attributes"] = attrs
+                result[node_id] = attrs
+        return result
+
+    @_writes
     def delete_graph(self, project_id: str):
         """Deletes the graph file, the tree file, and clears memory."""
-        # 1. Delete Graph JSON
-        graph_path = self._get_graph_path(project_id)
-        if os.path.exists(graph_path):
-            os.remove(graph_path)
+        # 1. Delete Graph store (and any legacy JSON)
+        self._get_store(project_id).delete()
+        legacy_path = self._get_legacy_graph_path(project_id)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
             
-        # 2. Delete Tree JSON
-        tree_path = os.path.join(self.base_path, f"{project_id}_tree.json")
-        if os.path.exists(tree_path):
-            os.remove(tree_path)
+        # 2. Delete Tree, re-ranking signals and analytics JSON
+        for path in (self._get_tree_path(project_id), self._get_signals_path(project_id),
+                     self._get_analytics_path(project_id)):
+            if os.path.exists(path):
+                os.remove(path)
 
         # 3. Clear Memory
-        if project_id in self.graphs:
-            del self.graphs[project_id]
-        if project_id in self.file_maps:
-            del self.file_maps[project_id]
+        self.evict(project_id)
+
+    @_writes
+    def evict(self, project_id: str):
+        """Drops the in-memory caches for a project; the next access reloads from disk."""
+        self.graphs.pop(project_id, None)
+        self.file_maps.pop(project_id, None)
+        self.import_resolvers.pop(project_id, None)
+        self.dirty_nodes.pop(project_id, None)
+        self.trees.pop(project_id, None)
+        self.tree_paths.pop(project_id, None)
+        self.rank_signals.pop(project_id, None)
+        self.analytics.pop(project_id, None)
+        self.graph_indexes.pop(project_id, None)
 
     def _update_file_map_entry(self, file_map: Dict[str, str], file_path: str):
         """Helper to update a specific file_map dict."""
         # Normalize path separators
         normalized_path = file_path.replace(chr(92), "/")
         
+        # JS/TS: extensionless path keys, so probing `./api` is a single lookup
+        for key in js_module_keys(normalized_path):
+            existing = file_map.get(key)
+            if existing is None or existing == file_path or self._js_priority(key, file_path) < self._js_priority(key, existing):
+                file_map[key] = file_path
+
         # Remove extension
         if normalized_path.endswith(".py"):
             module_path = normalized_path[:-3].replace("/", ".")
@@ -125,6 +345,13 @@ class GraphService:
                 package_path = module_path[:-9]
                 file_map[package_path] = file_path
 
+    @staticmethod
+    def _js_priority(key: str, file_path: str) -> int:
+        candidates = js_key_files(key)
+        normalized_path = file_path.replace(chr(92), "/")
+        return candidates.index(normalized_path) if normalized_path in candidates else len(candidates)
+
+    @_writes
     def update_dependency_graph(self, project_id: str, structure: FileStructure):
         """
         Adds a file node and its constituent class/function nodes to the graph.
@@ -132,9 +359,13 @@ class GraphService:
         """
         graph = self._get_or_create_graph(project_id)
         file_map = self._get_file_map(project_id)
+        dirty = self.dirty_nodes.setdefault(project_id, set())
+        self.graph_indexes.pop(project_id, None)
         
         file_path = structure.file_path
         self._update_file_map_entry(file_map, file_path)
+        imports = [imp.model_dump() for imp in structure.imports]
+        self._get_import_resolver(project_id).set_imports(file_path, ImportResolver.compile(imports, file_path))
         
         # 1. Add File Node
         graph.add_node(
@@ -142,9 +373,10 @@ class GraphService:
             type=NodeType.FILE, 
             attributes={
                 "path": file_path,
-                "imports": [imp.model_dump() for imp in structure.imports]
+                "imports": imports
             }
         )
+        dirty.add(file_path)
         
         # 2. Add Class Nodes
         for cls in structure.classes:
@@ -152,12 +384,12 @@ class GraphService:
             graph.add_node(
                 class_id, 
                 type=NodeType.CLASS, 
-                attributes=cls.model_dump()
+                # Source code is not duplicated here; chunk_id points at it in the vector store
+                attributes=cls.model_dump(exclude={"code"})
             )
+            dirty.add(class_id)
             graph.add_edge(file_path, class_id, type=EdgeType.DEFINES)
-            
-            # Store inheritance info (resolved later or lazily)
-            # For now, just store 'bases' in attributes, which is already done by model_dump()
+            # INHERITS edges to the classes in `bases` are added by build_edges
 
         # 3. Add Function Nodes
         for func in structure.functions:
@@ -165,128 +397,280 @@ class GraphService:
             graph.add_node(
                 func_id, 
                 type=NodeType.FUNCTION, 
-                attributes=func.model_dump()
+                attributes=func.model_dump(exclude={"code"})
             )
+            dirty.add(func_id)
             graph.add_edge(file_path, func_id, type=EdgeType.DEFINES)
 
-    def _resolve_import(self, project_id: str, current_file: str, import_info: ImportInfo) -> Optional[str]:
+    @_writes
+    def remove_file(self, project_id: str, file_path: str) -> List[str]:
         """
-        Resolves an import to a file path (node ID) using the file_map.
+        Removes a file node together with the class/function nodes it defines.
+        Returns the files that imported it, since their IMPORTS edges must be re-resolved.
         """
+        graph = self._get_or_create_graph(project_id)
+        if not graph.has_node(file_path):
+            return []
+
+        importers = [
+            u for u, _, attrs in graph.in_edges(file_path, data=True)
+            if attrs.get("type") == EdgeType.IMPORTS and u != file_path
+        ]
+        defined = [
+            v for _, v, attrs in graph.out_edges(file_path, data=True)
+            if attrs.get("type") == EdgeType.DEFINES
+        ]
+        graph.remove_nodes_from(defined)
+        graph.remove_node(file_path)
+        self.graph_indexes.pop(project_id, None)
+
+        # Drop the module entries pointing at this file
         file_map = self._get_file_map(project_id)
-        module = import_info.module
-        
-        if import_info.type == "stdlib":
-            return None
-            
-        target_file = None
-        
-        if import_info.type == "local_absolute":
-            # Direct lookup
-            target_file = file_map.get(module)
-            
-        elif import_info.type == "local_relative":
-            # Resolve relative path
-            # current_file: backend/app/services/graph_service.py
-            # module: .parser  (from .parser import ...)
-            
-            # 1. Determine current package
-            current_file_path = Path(current_file)
-            current_package_parts = list(current_file_path.parent.parts)
-            
-            # 2. Count dots in module (e.g., ..utils -> 2 dots)
-            dots = 0
-            for char in module:
-                if char == ".":
-                    dots += 1
-                else:
-                    break
-            
-            relative_module_name = module[dots:]
-            
-            # 3. Go up (dots - 1) levels. 
-            # If dots=1 (.), same dir. If dots=2 (..), parent dir.
-            if dots > 0:
-                # remove 'dots-1' levels from stack
-                for _ in range(dots - 1):
-                    if current_package_parts:
-                        current_package_parts.pop()
-                
-                # 4. Construct target module path
-                target_parts = current_package_parts
-                if relative_module_name:
-                     target_parts.append(relative_module_name)
-                
-                # Reconstruct generic module path to lookup in file_map
-                # We need to match how we stored keys in file_map (backend.app...)
-                # But relative resolution relies on file system structure more than module names
-                # Let's try to reconstruct the file path directly
-                
-                # Assume root is where execution started? No, file_path is relative to root.
-                target_path_prefix = Path(*target_parts)
-                
-                # Try finding this path in our file_map values
-                # This is inefficient. Better to construct the module path string.
-                # Assuming current_file is relative to project root, e.g. "backend/app/..."
-                
-                # Construct candidate module path
-                candidate_module = ".".join(target_parts)
-                target_file = file_map.get(candidate_module)
-
-        return target_file
-
-    def build_edges(self, project_id: str):
-        """
-        Re-scans all file nodes and rebuilds IMPORT edges based on the current file_map.
+        for module_path in [m for m, f in file_map.items() if f == file_path]:
+            del file_map[module_path]
+            # Another file may have been shadowed by this one (e.g. api.ts over api/index.ts)
+            if module_path.startswith("/"):
+                fallback = next((f for f in js_key_files(module_path) if graph.has_node(f)), None)
+                if fallback is not None:
+                    file_map[module_path] = fallback
+        self._get_import_resolver(project_id).forget(file_path)
+
+        return importers
+
+    @_writes
+    def build_edges(self, project_id: str, file_ids: Optional[Iterable[str]] = None):
+        """
+        Re-scans file nodes and rebuilds IMPORT edges based on the current file_map,
+        and INHERITS edges from their classes to the base classes they resolve to.
         Should be called after batch ingestion.
+        If file_ids is given, only those files (plus files whose unresolved local
+        imports a newly added file may now satisfy) are re-linked.
         """
         graph = self._get_or_create_graph(project_id)
-        
-        # Iterate over all nodes
-        # Use list(graph.nodes) to avoid runtime error if graph changes (though it shouldn't here)
-        for node_id, attrs in list(graph.nodes(data=True)):
-            if attrs.get("type") == NodeType.FILE:
-                imports_data = attrs.get("attributes", {}).get("imports", [])
-                for imp_data in imports_data:
-                    imp = ImportInfo(**imp_data)
-                    target_file = self._resolve_import(project_id, node_id, imp)
-                    
-                    if target_file and graph.has_node(target_file):
-                        # Avoid self-loops if any
-                        if target_file != node_id:
-                            graph.add_edge(node_id, target_file, type=EdgeType.IMPORTS)
-        
+        resolver = self._get_import_resolver(project_id)
+
+        if file_ids is None:
+            targets = [n for n, attrs in graph.nodes(data=True) if attrs.get("type") == NodeType.FILE]
+        else:
+            selected = set(file_ids) | resolver.newly_resolvable()
+            # Files whose unresolved imports this resolver has not seen yet (e.g. after a reload)
+            for node_id, attrs in graph.nodes(data=True):
+                if (attrs.get("type") == NodeType.FILE and attrs.get("unresolved_imports")
+                        and not resolver.is_tracked(node_id)):
+                    selected.add(node_id)
+            targets = [n for n in selected if graph.has_node(n)]
+
+        # Compile imports from the file attributes (which may still be on disk) only where needed
+        uncompiled = [n for n in targets if not resolver.has_imports(n)]
+        for node_id, attributes in self.get_nodes_attributes(project_id, uncompiled).items():
+            resolver.set_imports(node_id, ImportResolver.compile(attributes.get("imports", []), node_id))
+
+        for node_id in targets:
+            # Drop stale outgoing IMPORTS edges before re-resolving
+            stale = [
+                v for _, v, attrs in graph.out_edges(node_id, data=True)
+                if attrs.get("type") == EdgeType.IMPORTS
+            ]
+            graph.remove_edges_from((node_id, v) for v in stale)
+
+            resolved, unresolved = resolver.resolve_file(node_id)
+            for target_file in resolved:
+                # Avoid self-loops if any
+                if target_file != node_id and graph.has_node(target_file):
+                    graph.add_edge(node_id, target_file, type=EdgeType.IMPORTS)
+            # Kept on the node itself (not in attributes) so it is available without a lazy read
+            graph.nodes[node_id]["unresolved_imports"] = unresolved
+
+        self._link_inheritance(project_id, targets)
+        self.graph_indexes.pop(project_id, None)
         self.save_graph(project_id)
 
+    def _link_inheritance(self, project_id: str, file_ids: List[str]):
+        """
+        Rebuilds the INHERITS edges (subclass -> base class) of the classes defined
+        in file_ids. Bases are resolved through the file's imports by the ImportResolver;
+        bases outside the project (stdlib, third-party) get no edge.
+        """
+        graph = self._get_or_create_graph(project_id)
+        resolver = self._get_import_resolver(project_id)
+        classes = {
+            file_id: [v for _, v, t in graph.out_edges(file_id, data="type")
+                      if t == EdgeType.DEFINES and graph.nodes[v].get("type") == NodeType.CLASS]
+            for file_id in file_ids
+        }
+        class_attributes = self.get_nodes_attributes(project_id, [c for ids in classes.values() for c in ids])
+        with_bases = [f for f, ids in classes.items() if any(class_attributes.get(c, {}).get("bases") for c in ids)]
+        file_attributes = self.get_nodes_attributes(project_id, with_bases)
+
+        for file_id, class_ids in classes.items():
+            imports = file_attributes.get(file_id, {}).get("imports", [])
+            for class_id in class_ids:
+                stale = [v for _, v, t in graph.out_edges(class_id, data="type") if t == EdgeType.INHERITS]
+                graph.remove_edges_from((class_id, v) for v in stale)
+                for base in class_attributes.get(class_id, {}).get("bases", []):
+                    resolved = resolver.resolve_symbol(file_id, base, imports)
+                    if resolved is None:
+                        continue
+                    base_id = f"{resolved[0]}::{resolved[1]}"
+                    if base_id != class_id and graph.has_node(base_id):
+                        graph.add_edge(class_id, base_id, type=EdgeType.INHERITS)
+
+    @_reads
+    def get_graph_index(self, project_id: str) -> GraphIndex:
+        """CSR adjacency of the whole graph (forward and reverse), built on first query."""
+        index = self.graph_indexes.get(project_id)
+        if index is None:
+            graph = self._get_or_create_graph(project_id)
+            index = GraphIndex.from_graph(graph, {EdgeType(t): c for t, c in EDGE_TYPE_CODES.items()})
+            self.graph_indexes[project_id] = index
+        return index
+
+    @_reads
+    def get_neighbors(self, project_id: str, node_id: str, direction: str = "out", depth: int = 1,
+                      edge_types: Optional[List[EdgeType]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Nodes within `depth` hops of node_id, ordered by (distance, id).
+        direction: "out" (what it imports/defines), "in" (what imports/defines it) or "both".
+        Returns None if the node does not exist.
+        """
+        index = self.get_graph_index(project_id)
+        start = index.index.get(node_id)
+        if start is None:
+            return None
+        nodes, distances, _ = index.bfs([start], direction=direction, max_depth=depth, edge_types=edge_types)
+        return self._describe_nodes(project_id, index, nodes[1:], distances[1:])
+
+    @_reads
+    def find_path(self, project_id: str, source: str, target: str,
+                  edge_types: Optional[List[EdgeType]] = None) -> Optional[List[str]]:
+        """
+        Shortest directed path from source to target (by default over IMPORTS edges).
+        Returns [] if either node is missing and None if target is unreachable.
+        """
+        index = self.get_graph_index(project_id)
+        if source not in index.index or target not in index.index:
+            return []
+        path = index.shortest_path(index.index[source], index.index[target],
+                                   edge_types=edge_types or [EdgeType.IMPORTS])
+        return [index.nodes[i] for i in path] if path is not None else None
+
+    @_reads
+    def get_impact(self, project_id: str, node_id: str, max_depth: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Reverse-dependency impact set ("blast radius"): everything that transitively
+        imports node_id, or inherits from it. For a class or function, the file that
+        defines it is the starting point for import dependents.
+        Ordered by (distance, id); None if the node does not exist.
+        """
+        index = self.get_graph_index(project_id)
+        start = index.index.get(node_id)
+        if start is None:
+            return None
+        sources = [start]
+        graph = self._get_or_create_graph(project_id)
+        if graph.nodes[node_id].get("type") != NodeType.FILE:
+            sources.extend(
+                index.index[u] for u, _, t in graph.in_edges(node_id, data="type") if t == EdgeType.DEFINES
+            )
+        nodes, distances, _ = index.bfs(sources, direction="in", max_depth=max_depth,
+                                        edge_types=[EdgeType.IMPORTS, EdgeType.INHERITS])
+        keep = ~np.isin(nodes, sources)
+        return self._describe_nodes(project_id, index, nodes[keep], distances[keep])
+
+    def _describe_nodes(self, project_id: str, index: GraphIndex, nodes: np.ndarray,
+                        distances: np.ndarray) -> List[Dict[str, Any]]:
+        graph = self._get_or_create_graph(project_id)
+        items = [
+            {"id": index.nodes[i], "type": graph.nodes[index.nodes[i]].get("type"), "distance": int(d)}
+            for i, d in zip(nodes.tolist(), distances.tolist())
+        ]
+        items.sort(key=lambda item: (item["distance"], item["id"]))
+        return items
+
     def compute_node_importance(self, project_id: str) -> Dict[str, float]:
         """
-        Computes the importance of each node using PageRank (or similar centrality).
-        Returns a dict of node_id -> score.
+        Returns file_path -> importance, served from the precomputed analytics.
+        Importance is PageRank over the file import graph: a file is important if
+        important files import it (core utilities rank high, entry points low).
+        """
+        return dict(self.compute_analytics(project_id)["pagerank"])
+
+    @_writes
+    def compute_analytics(self, project_id: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Computes graph metrics over the file-level IMPORTS graph and persists them
+        to <project_id>_analytics.json:
+        - pagerank: file -> PageRank score
+        - cycles: strongly connected components with more than one file (import cycles)
+        - depends_on / depended_by: number of files transitively imported by /
+          importing each file (skipped above ANALYTICS_REACH_MAX_FILES files)
+        The result is keyed by a fingerprint of the file set and import edges; when
+        those are unchanged the cached metrics are returned without recomputing.
+        PageRank is warm-started from the previous scores when the graph changed.
         """
         graph = self._get_or_create_graph(project_id)
-        if graph.number_of_nodes() == 0:
-            return {}
+        csr = CSRGraph.from_graph(graph, edge_types=[EdgeType.IMPORTS], node_types=[NodeType.FILE])
+        fingerprint = self._edge_fingerprint(csr)
 
-        try:
-            # Pagerank is good for "global importance"
-            # We might want 'reverse pagerank' to see what is most depended upon (Utils)?
-            # Or standard pagerank to see what 'uses' the most things? 
-            # Actually, standard Pagerank: "Important nodes are referenced by other important nodes".
-            # For code, if A imports B, A depends on B. B is a dependency.
-            # If we want "High Level Modules" (Entry points), they have high OUT-degree, low IN-degree.
-            # If we want "Core Utils", they have high IN-degree.
-            
-            # For the Codemap, we want to sort by "Logical Priority".
-            # Usually Entry Points (API) -> Domain Logic -> Utilities.
-            # This aligns with Topological Sort somewhat.
-            
-            # Let's use a simple heuristic for now: In-Degree Centrality
-            # (How many files import me?)
-            scores = nx.in_degree_centrality(graph)
-            return scores
-        except Exception as e:
-            print(f"Error computing graph importance: {e}")
-            return {n: 0.0 for n in graph.nodes()}
+        previous = self.get_analytics(project_id)
+        if previous is not None and previous.get("fingerprint") == fingerprint and not force:
+            return previous
+
+        initial = None
+        if previous is not None and previous.get("pagerank"):
+            old = previous["pagerank"]
+            initial = np.array([old.get(node, 0.0) for node in csr.nodes])
+            if not initial.any():
+                initial = None
+        ranks = pagerank(csr, initial=initial)
+        component, num_components = strongly_connected_components(csr)
+
+        sizes = np.bincount(component, minlength=num_components) if len(csr) else np.zeros(0, dtype=np.int64)
+        cycles: Dict[int, List[str]] = {}
+        for i, node in enumerate(csr.nodes):
+            if sizes[component[i]] > 1:
+                cycles.setdefault(int(component[i]), []).append(node)
+
+        analytics: Dict[str, Any] = {
+            "fingerprint": fingerprint,
+            "files": len(csr),
+            "import_edges": csr.num_edges,
+            "pagerank": {node: float(score) for node, score in zip(csr.nodes, ranks)},
+            "cycles": sorted(cycles.values(), key=lambda c: (-len(c), c[0])),
+            "depends_on": None,
+            "depended_by": None,
+        }
+        if len(csr) <= ANALYTICS_REACH_MAX_FILES:
+            forward = reachability_counts(csr, component, num_components)
+            transposed = csr.transpose()
+            reverse = reachability_counts(transposed, *strongly_connected_components(transposed))
+            analytics["depends_on"] = dict(zip(csr.nodes, forward.tolist()))
+            analytics["depended_by"] = dict(zip(csr.nodes, reverse.tolist()))
+
+        tmp_path = self._get_analytics_path(project_id) + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(analytics, f)
+        os.replace(tmp_path, self._get_analytics_path(project_id))
+        self.analytics[project_id] = analytics
+        return analytics
+
+    @_reads
+    def get_analytics(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the last computed analytics from memory (loading them once), or None."""
+        if project_id not in self.analytics:
+            analytics_path = self._get_analytics_path(project_id)
+            if not os.path.exists(analytics_path):
+                return None
+            with open(analytics_path, 'r') as f:
+                self.analytics[project_id] = json.load(f)
+        return self.analytics[project_id]
+
+    def _edge_fingerprint(self, csr: CSRGraph) -> str:
+        digest = hashlib.sha1()
+        digest.update("\n".join(csr.nodes).encode("utf-8"))
+        digest.update(csr.indptr.tobytes())
+        digest.update(csr.indices.tobytes())
+        return digest.hexdigest()
 
     def classify_node_layer(self, file_path: str) -> int:
         """
@@ -317,6 +701,7 @@ class GraphService:
             
         return 4
 
+    @_writes
     def build_module_tree(self, project_id: str):
         """
         Constructs a hierarchical JSON tree of the project structure,
@@ -328,70 +713,151 @@ class GraphService:
         
         importance_scores = self.compute_node_importance(project_id)
         
-        # 1. Build basic directory tree structure
+        tree_root = self._assemble_tree(file_nodes, importance_scores)
+
+        # Save Tree, and keep it parsed in memory for search
+        with open(self._get_tree_path(project_id), 'w') as f:
+            json.dump(tree_root, f)
+        self._cache_tree(project_id, tree_root)
+
+        self.build_rank_signals(project_id, importance_scores)
+
+    def _assemble_tree(self, file_nodes: Iterable[str], importance_scores: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Builds the folder/file tree in linear time without recursion:
+        - folders are indexed by directory path, so each file finds its parent in O(1)
+        - folders are finalised in reverse creation order (children before parents),
+          which sorts each one and rolls its `importance` (the sum over the files
+          below it) up into the parent in the same pass
+        Children: folders alphabetically, then files by layer ASC, importance DESC.
+        """
         tree_root = {"id": "root", "name": "root", "type": "folder", "children": []}
-        
-        # Helper to find/create folder path
-        def get_folder_node(path_parts, current_node):
-            if not path_parts:
-                return current_node
-            
-            part = path_parts[0]
-            existing = next((c for c in current_node["children"] if c["name"] == part and c["type"] == "folder"), None)
-            
-            if not existing:
-                new_folder = {"id": f"{current_node['id']}/{part}", "name": part, "type": "folder", "children": []}
-                current_node["children"].append(new_folder)
-                existing = new_folder
-            
-            return get_folder_node(path_parts[1:], existing)
+        folders: Dict[str, Dict[str, Any]] = {"": tree_root}
+        # Creation order; a folder is always created after its parent
+        folder_order: List[Tuple[str, Dict[str, Any]]] = []
+
+        def get_folder_node(dir_path: str) -> Dict[str, Any]:
+            node = folders.get(dir_path)
+            if node is not None:
+                return node
+            # Walk up to the nearest existing ancestor, then create the missing folders top-down
+            missing = []
+            while dir_path not in folders:
+                missing.append(dir_path)
+                dir_path = dir_path.rpartition("/")[0]
+            parent = folders[dir_path]
+            for path in reversed(missing):
+                node = {"id": f"root/{path}", "name": path.rpartition("/")[2], "type": "folder", "children": []}
+                parent["children"].append(node)
+                folders[path] = node
+                folder_order.append((path, node))
+                parent = node
+            return parent
 
-        # 2. Populate Tree
         for file_path in file_nodes:
-            parts = file_path.split("/")
-            filename = parts[-1]
-            folder_parts = parts[:-1]
-            
-            parent = get_folder_node(folder_parts, tree_root)
-            
-            layer = self.classify_node_layer(file_path)
-            score = importance_scores.get(file_path, 0)
-            
-            file_node = {
+            dir_path, _, filename = file_path.rpartition("/")
+            get_folder_node(dir_path)["children"].append({
                 "id": file_path,
                 "name": filename,
                 "type": "file",
-                "layer": layer,
-                "importance": score,
+                "layer": self.classify_node_layer(file_path),
+                "importance": importance_scores.get(file_path, 0),
                 "children": [] # Can add classes/functions here later if needed
-            }
-            parent["children"].append(file_node)
-
-        # 3. Recursive Sort
-        def sort_node(node):
-            # Sort children:
-            # Folders first, then Files? Or mixed?
-            # Let's keep Folders and Files mixed but sorted by importance logic.
-            # But usually users expect Folders at top or alphabetical.
-            # Let's do: Folders (Alphabetical), then Files (Sorted by Layer ASC, then Importance DESC)
-            
-            folders = [c for c in node["children"] if c["type"] == "folder"]
-            files = [c for c in node["children"] if c["type"] == "file"]
-            
-            folders.sort(key=lambda x: x["name"])
-            
-            # Sort files: Layer 0 -> 1 -> 2 -> 3. Inside layer: Importance High -> Low.
-            files.sort(key=lambda x: (x["layer"], -x["importance"]))
-            
-            node["children"] = folders + files
-            
+            })
+
+        folder_scores: Dict[str, float] = {}
+        for path, node in reversed([("", tree_root)] + folder_order):
+            sub_folders, files = [], []
             for child in node["children"]:
-                if child["type"] == "folder":
-                    sort_node(child)
+                (sub_folders if child["type"] == "folder" else files).append(child)
+            sub_folders.sort(key=lambda x: x["name"])
+            files.sort(key=lambda x: (x["layer"], -x["importance"]))
+            node["children"] = sub_folders + files
 
-        sort_node(tree_root)
-        
-        # Save Tree
-        tree_path = os.path.join(self.base_path, f"{project_id}_tree.json")
-        with open(tree_path, 'w') as f:
-            json.dump(tree_root, f, indent=2)
+            score = folder_scores.pop(path, 0.0) + sum(f["importance"] for f in files)
+            node["importance"] = score
+            if path:
+                parent_path = path.rpartition("/")[0]
+                folder_scores[parent_path] = folder_scores.get(parent_path, 0.0) + score
+        return tree_root
+
+    @_writes
+    def build_rank_signals(self, project_id: str, importance_scores: Optional[Dict[str, float]] = None):
+        """
+        Precomputes per-file signals used to re-rank search hits, so search never
+        touches the graph itself:
+        - importance: PageRank over the file import graph (compute_node_importance()),
+          normalised to [0, 1] over files
+        - layer: classify_node_layer()
+        - neighbors: files linked by an IMPORTS edge in either direction
+        Saves to <project_id>_signals.json.
+        """
+        graph = self._get_or_create_graph(project_id)
+        if importance_scores is None:
+            importance_scores = self.compute_node_importance(project_id)
+
+        file_nodes = [n for n, attrs in graph.nodes(data=True) if attrs.get("type") == NodeType.FILE]
+        max_importance = max((importance_scores.get(f, 0.0) for f in file_nodes), default=0.0)
+        neighbors: Dict[str, set] = {}
+        for u, v, attrs in graph.edges(data=True):
+            if attrs.get("type") == EdgeType.IMPORTS:
+                neighbors.setdefault(u, set()).add(v)
+                neighbors.setdefault(v, set()).add(u)
+
+        signals = {
+            "importance": {
+                f: (importance_scores.get(f, 0.0) / max_importance if max_importance else 0.0) for f in file_nodes
+            },
+            "layer": {f: self.classify_node_layer(f) for f in file_nodes},
+            "neighbors": neighbors,
+        }
+        with open(self._get_signals_path(project_id), 'w') as f:
+            json.dump(dict(signals, neighbors={k: sorted(v) for k, v in neighbors.items()}), f)
+        self.rank_signals[project_id] = signals
+
+    @_reads
+    def get_rank_signals(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached re-ranking signals, loading them on first use (None if never built)."""
+        if project_id not in self.rank_signals:
+            signals_path = self._get_signals_path(project_id)
+            if not os.path.exists(signals_path):
+                return None
+            with open(signals_path, 'r') as f:
+                signals = json.load(f)
+            # Set lookups during re-ranking
+            signals["neighbors"] = {k: set(v) for k, v in signals["neighbors"].items()}
+            self.rank_signals[project_id] = signals
+        return self.rank_signals[project_id]
+
+    @_reads
+    def get_module_tree(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached module tree, loading <project_id>_tree.json only on first use.
+        Callers must treat it as read-only (copy before annotating).
+        """
+        if project_id not in self.trees:
+            tree_path = self._get_tree_path(project_id)
+            if not os.path.exists(tree_path):
+                return None
+            with open(tree_path, 'r') as f:
+                self._cache_tree(project_id, json.load(f))
+        return self.trees[project_id]
+
+    @_reads
+    def get_tree_paths(self, project_id: str) -> Dict[str, Tuple[int, ...]]:
+        """node_id -> indices of the children to follow from the root to reach that node."""
+        if self.get_module_tree(project_id) is None:
+            return {}
+        return self.tree_paths[project_id]
+
+    def _cache_tree(self, project_id: str, tree: Dict[str, Any]):
+        paths: Dict[str, Tuple[int, ...]] = {tree["id"]: ()}
+        stack = [(tree, ())]
+        while stack:
+            node, path = stack.pop()
+            for i, child in enumerate(node.get("children", [])):
+                child_path = path + (i,)
+                paths[child["id"]] = child_path
+                stack.append((child, child_path))
+        self.trees[project_id] = tree
+        self.tree_paths[project_id] = paths
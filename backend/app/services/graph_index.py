@@ -0,0 +1,306 @@
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import numpy as np
+import networkx as nx
+
+class CSRGraph:
+    """
+    Immutable compressed-sparse-row adjacency over integer node indices.
+    Successors of node i are indices[indptr[i]:indptr[i + 1]] (sorted), and
+    edge_codes (if present) holds a small integer type per edge, aligned with indices.
+    Built once from a networkx graph, it lets analytics and traversals run on
+    flat numpy arrays instead of per-node dict lookups.
+    """
+    def __init__(self, nodes: List[str], indptr: np.ndarray, indices: np.ndarray,
+                 edge_codes: Optional[np.ndarray] = None, index: Optional[Dict[str, int]] = None):
+        self.nodes = nodes
+        self.index: Dict[str, int] = index if index is not None else {node: i for i, node in enumerate(nodes)}
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_codes = edge_codes
+
+    @classmethod
+    def from_edges(cls, nodes: List[str], edges: Iterable[Tuple[str, str]],
+                   edge_codes: Optional[Iterable[int]] = None) -> "CSRGraph":
+        index = {node: i for i, node in enumerate(nodes)}
+        pairs = np.array([(index[u], index[v]) for u, v in edges], dtype=np.int64).reshape(-1, 2)
+        codes = np.fromiter(edge_codes, dtype=np.int8) if edge_codes is not None else None
+        order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+        pairs = pairs[order]
+        # Drop duplicate (source, target) pairs, keeping the first
+        keep = np.ones(len(pairs), dtype=bool)
+        keep[1:] = np.any(pairs[1:] != pairs[:-1], axis=1)
+        pairs = pairs[keep]
+        if codes is not None:
+            codes = codes[order][keep]
+        counts = np.bincount(pairs[:, 0], minlength=len(nodes))
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(nodes, indptr, pairs[:, 1].astype(np.int32), codes, index)
+
+    @classmethod
+    def from_graph(cls, graph: nx.DiGraph, edge_types: Optional[Iterable[Any]] = None,
+                   node_types: Optional[Iterable[Any]] = None,
+                   edge_type_codes: Optional[Dict[Any, int]] = None) -> "CSRGraph":
+        """
+        CSR view of `graph`, optionally restricted to some node and edge types.
+        With edge_type_codes (edge type -> int), each edge's type is kept in edge_codes.
+        """
+        node_types = set(node_types) if node_types is not None else None
+        edge_types = set(edge_types) if edge_types is not None else None
+        nodes = sorted(
+            n for n, node_type in graph.nodes(data="type")
+            if node_types is None or node_type in node_types
+        )
+        member = set(nodes)
+        edges = [
+            (u, v, edge_type) for u, v, edge_type in graph.edges(data="type")
+            if (edge_types is None or edge_type in edge_types) and u in member and v in member
+        ]
+        codes = [edge_type_codes[t] for _, _, t in edges] if edge_type_codes is not None else None
+        return cls.from_edges(nodes, [(u, v) for u, v, _ in edges], codes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def num_edges(self) -> int:
+        return int(self.indptr[-1])
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def successors(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def sources(self) -> np.ndarray:
+        """Source index of every edge, aligned with `indices`."""
+        return np.repeat(np.arange(len(self.nodes), dtype=np.int32), self.out_degree())
+
+    def transpose(self) -> "CSRGraph":
+        src = self.sources()
+        order = np.lexsort((src, self.indices))
+        counts = np.bincount(self.indices, minlength=len(self.nodes))
+        indptr = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        codes = self.edge_codes[order] if self.edge_codes is not None else None
+        return CSRGraph(self.nodes, indptr, src[order], codes, self.index)
+
+    def expand(self, frontier: np.ndarray, allowed_codes: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        All edges leaving `frontier` in one vectorised gather.
+        Returns (source, target) arrays; with allowed_codes, only edges of those types.
+        """
+        starts = self.indptr[frontier]
+        lengths = self.indptr[frontier + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        # Edge positions: concatenation of range(start, start + length) per frontier node
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = np.arange(total) + offsets
+        sources = np.repeat(frontier, lengths)
+        if allowed_codes is not None and self.edge_codes is not None:
+            mask = np.isin(self.edge_codes[positions], allowed_codes)
+            positions, sources = positions[mask], sources[mask]
+        return sources, self.indices[positions].astype(np.int64)
+
+
+class GraphIndex:
+    """
+    Forward and reverse CSR adjacency over a whole project graph (files, classes,
+    functions; all edge types), for neighbourhood, path and impact queries.
+    Rebuilt lazily by GraphService after the graph changes.
+    """
+    def __init__(self, forward: CSRGraph, edge_type_codes: Dict[Any, int]):
+        self.forward = forward
+        self.reverse = forward.transpose()
+        self.edge_type_codes = edge_type_codes
+
+    @classmethod
+    def from_graph(cls, graph: nx.DiGraph, edge_type_codes: Dict[Any, int]) -> "GraphIndex":
+        return cls(CSRGraph.from_graph(graph, edge_type_codes=edge_type_codes), edge_type_codes)
+
+    @property
+    def nodes(self) -> List[str]:
+        return self.forward.nodes
+
+    @property
+    def index(self) -> Dict[str, int]:
+        return self.forward.index
+
+    def _codes(self, edge_types: Optional[Iterable[Any]]) -> Optional[np.ndarray]:
+        if edge_types is None:
+            return None
+        return np.array([self.edge_type_codes[t] for t in edge_types], dtype=np.int8)
+
+    def bfs(self, sources: Iterable[int], direction: str = "out", max_depth: Optional[int] = None,
+            edge_types: Optional[Iterable[Any]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Level-synchronous BFS from `sources` ("out": follow edges, "in": follow them
+        backwards, "both": either). Each level is one vectorised frontier expansion.
+        Returns (nodes, distances, parents) in visit order, sources included at distance 0.
+        """
+        graphs = {"out": [self.forward], "in": [self.reverse], "both": [self.forward, self.reverse]}[direction]
+        codes = self._codes(edge_types)
+        n = len(self.forward)
+        distance = np.full(n, -1, dtype=np.int64)
+        parent = np.full(n, -1, dtype=np.int64)
+
+        frontier = np.unique(np.fromiter(sources, dtype=np.int64))
+        distance[frontier] = 0
+        visited = [frontier]
+        depth = 0
+        while len(frontier) and (max_depth is None or depth < max_depth):
+            depth += 1
+            found_src, found_dst = [], []
+            for csr in graphs:
+                src, dst = csr.expand(frontier, codes)
+                found_src.append(src)
+                found_dst.append(dst)
+            src, dst = np.concatenate(found_src), np.concatenate(found_dst)
+            fresh = distance[dst] == -1
+            src, dst = src[fresh], dst[fresh]
+            # First discovery wins for parents; np.unique returns the first index of each target
+            dst, first = np.unique(dst, return_index=True)
+            parent[dst] = src[first]
+            distance[dst] = depth
+            frontier = dst
+            visited.append(dst)
+
+        nodes = np.concatenate(visited)
+        return nodes, distance[nodes], parent[nodes]
+
+    def shortest_path(self, source: int, target: int, direction: str = "out",
+                      edge_types: Optional[Iterable[Any]] = None) -> Optional[List[int]]:
+        """Unweighted shortest path as a list of node indices, or None if unreachable."""
+        if source == target:
+            return [source]
+        nodes, _, parents = self.bfs([source], direction=direction, edge_types=edge_types)
+        parent_of = dict(zip(nodes.tolist(), parents.tolist()))
+        if target not in parent_of:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(parent_of[path[-1]])
+        return path[::-1]
+
+
+def pagerank(csr: CSRGraph, damping: float = 0.85, tol: float = 1e-10, max_iter: int = 100,
+             initial: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Power-iteration PageRank on a CSR graph, vectorised with numpy.
+    Dangling nodes spread their rank uniformly (as networkx does). `initial`
+    warm-starts from a previous result, which converges in a few iterations
+    when the graph changed only slightly.
+    """
+    n = len(csr)
+    if n == 0:
+        return np.zeros(0)
+    out_degree = csr.out_degree().astype(np.float64)
+    dangling = out_degree == 0
+    inv_degree = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    src, dst = csr.sources(), csr.indices
+
+    x = np.full(n, 1.0 / n) if initial is None else initial / initial.sum()
+    for _ in range(max_iter):
+        contrib = np.bincount(dst, weights=x[src] * inv_degree[src], minlength=n)
+        x_new = damping * (contrib + x[dangling].sum() / n) + (1.0 - damping) / n
+        delta = np.abs(x_new - x).sum()
+        x = x_new
+        if delta < n * tol:
+            break
+    return x
+
+
+def strongly_connected_components(csr: CSRGraph) -> Tuple[np.ndarray, int]:
+    """
+    Iterative Tarjan (no recursion limit on deep import chains).
+    Returns (component id per node, number of components). Components are
+    numbered in reverse topological order of the condensation: every edge
+    between components goes from a higher id to a lower (or equal) id.
+    """
+    n = len(csr)
+    indptr, indices = csr.indptr, csr.indices
+    index = np.full(n, -1, dtype=np.int64)
+    low = np.zeros(n, dtype=np.int64)
+    component = np.full(n, -1, dtype=np.int64)
+    on_stack = np.zeros(n, dtype=bool)
+    stack: List[int] = []
+    counter = 0
+    components = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        # Each frame: (node, position of the next successor to visit)
+        work = [(root, int(indptr[root]))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            v, pos = work[-1]
+            end = indptr[v + 1]
+            while pos < end:
+                w = int(indices[pos])
+                pos += 1
+                if index[w] == -1:
+                    work[-1] = (v, pos)
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, int(indptr[w])))
+                    break
+                if on_stack[w]:
+                    low[v] = min(low[v], index[w])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component[w] = components
+                        if w == v:
+                            break
+                    components += 1
+    return component, components
+
+
+def reachability_counts(csr: CSRGraph, component: np.ndarray, num_components: int) -> np.ndarray:
+    """
+    For every node, the number of other nodes reachable from it (size of its
+    transitive closure). Uses bitsets over the SCC condensation, visited in
+    the reverse topological order Tarjan produced, so each component is
+    processed once after all its successors. Memory is O(V^2 / 8) bytes in the
+    worst case; callers should cap V.
+    """
+    n = len(csr)
+    members: List[int] = [0] * num_components
+    for node in range(n):
+        members[component[node]] |= 1 << node
+
+    # Condensation edges, grouped by source component
+    src_c = component[csr.sources()]
+    dst_c = component[csr.indices]
+    cross = src_c != dst_c
+    successors: Dict[int, set] = {}
+    for a, b in zip(src_c[cross].tolist(), dst_c[cross].tolist()):
+        successors.setdefault(a, set()).add(b)
+
+    reach: List[int] = [0] * num_components
+    for c in range(num_components):
+        bits = members[c]
+        for succ in successors.get(c, ()):
+            bits |= reach[succ]
+        reach[c] = bits
+
+    counts = np.empty(n, dtype=np.int64)
+    for node in range(n):
+        # A node reaches the rest of its own SCC but does not count itself
+        counts[node] = reach[component[node]].bit_count() - 1
+    return counts
@@ -0,0 +1,147 @@
+import json
+import os
+import sqlite3
+import zlib
+from array import array
+from typing import Dict, Any, Iterable, List
+import networkx as nx
+from ..schemas import NodeType, EdgeType
+
+# Edge types are stored as small integers in the packed edge array
+EDGE_TYPES: List[EdgeType] = [EdgeType.DEFINES, EdgeType.INHERITS, EdgeType.IMPORTS]
+EDGE_TYPE_CODES: Dict[str, int] = {t.value: i for i, t in enumerate(EDGE_TYPES)}
+
+class GraphStore:
+    """
+    Compact on-disk format for one project graph, backed by SQLite:
+    - nodes:      interned node IDs (row index = integer ID) with type and small flags
+    - meta:       'edges' is a packed int32 array of (source, target, type) triples,
+                  plus format version and graph-level attributes
+    - attributes: zlib-compressed JSON per node, read lazily and only when needed
+    Loading a project reads node IDs and one edge blob; attribute blobs stay on disk.
+    """
+    FORMAT_VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Let SQLite serve reads from a memory map instead of copying pages
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB);
+            CREATE TABLE IF NOT EXISTS nodes (
+                idx INTEGER PRIMARY KEY,
+                node_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                unresolved_imports INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS attributes (node_id TEXT PRIMARY KEY, data BLOB NOT NULL);
+        """)
+        return conn
+
+    def save(self, graph: nx.DiGraph, dirty: Iterable[str]):
+        """
+        Rewrites the node table and edge array, and upserts the attribute blobs of
+        dirty nodes. Attributes of unchanged nodes are left untouched on disk.
+        """
+        index: Dict[str, int] = {}
+        node_rows = []
+        for idx, (node_id, attrs) in enumerate(graph.nodes(data=True)):
+            index[node_id] = idx
+            node_type = attrs.get("type")
+            node_rows.append((
+                idx,
+                node_id,
+                node_type.value if isinstance(node_type, NodeType) else str(node_type),
+                attrs.get("unresolved_imports", 0)
+            ))
+
+        edges = array("i")
+        for u, v, attrs in graph.edges(data=True):
+            edge_type = attrs.get("type")
+            edge_type = edge_type.value if isinstance(edge_type, EdgeType) else str(edge_type)
+            edges.extend((index[u], index[v], EDGE_TYPE_CODES[edge_type]))
+
+        attr_rows = []
+        for node_id in dirty:
+            if graph.has_node(node_id) and "attributes" in graph.nodes[node_id]:
+                attr_rows.append((node_id, self._encode(graph.nodes[node_id]["attributes"])))
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM nodes")
+                conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?)", node_rows)
+                conn.execute("DELETE FROM attributes WHERE node_id NOT IN (SELECT node_id FROM nodes)")
+                conn.executemany("INSERT OR REPLACE INTO attributes VALUES (?, ?)", attr_rows)
+                conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                    ("format_version", str(self.FORMAT_VERSION)),
+                    ("edges", edges.tobytes()),
+                    ("graph", json.dumps(graph.graph)),
+                ])
+        finally:
+            conn.close()
+
+    def load(self) -> nx.DiGraph:
+        """Loads node IDs, types and edges in bulk. Node attributes are not read."""
+        graph = nx.DiGraph()
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT node_id, type, unresolved_imports FROM nodes ORDER BY idx").fetchall()
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        finally:
+            conn.close()
+
+        node_ids = [r[0] for r in rows]
+        graph.add_nodes_from(
+            (node_id, {"type": NodeType(node_type), "unresolved_imports": unresolved})
+            for node_id, node_type, unresolved in rows
+        )
+
+        edges = array("i")
+        if meta.get("edges"):
+            edges.frombytes(meta["edges"])
+        graph.add_edges_from(
+            (node_ids[edges[i]], node_ids[edges[i + 1]], {"type": EDGE_TYPES[edges[i + 2]]})
+            for i in range(0, len(edges), 3)
+        )
+        if meta.get("graph"):
+            graph.graph.update(json.loads(meta["graph"]))
+        return graph
+
+    def read_attributes(self, node_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Reads the attribute blobs of specific nodes."""
+        node_ids = list(node_ids)
+        if not node_ids or not self.exists():
+            return {}
+        result = {}
+        conn = self._connect()
+        try:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(node_ids), 500):
+                batch = node_ids[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                for node_id, data in conn.execute(
+                    f"SELECT node_id, data FROM attributes WHERE node_id IN ({placeholders})", batch
+                ):
+                    result[node_id] = self._decode(data)
+        finally:
+            conn.close()
+        return result
+
+    def delete(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def _encode(self, attributes: Dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(attributes, separators=(",", ":")).encode("utf-8"))
+
+    def _decode(self, data: bytes) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(data).decode("utf-8"))
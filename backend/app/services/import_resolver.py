@@ -0,0 +1,341 @@
+import json
+import os
+import posixpath
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+LOCAL_IMPORT_TYPES = ("local_absolute", "local_relative")
+
+# (import type, module as written), e.g. ("local_relative", "..utils")
+ImportTuple = Tuple[str, str]
+
+# Probe order for extensionless JS/TS specifiers (`./api` -> api.ts, api.tsx, ..., api/index.ts, ...)
+JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mts", ".cts", ".mjs", ".cjs")
+# Specifiers of non-code files, which never become graph nodes
+ASSET_EXTENSIONS = frozenset({
+    ".css", ".scss", ".sass", ".less", ".json", ".svg", ".png", ".jpg", ".jpeg", ".gif",
+    ".webp", ".ico", ".woff", ".woff2", ".ttf", ".md", ".html", ".wasm",
+})
+TS_CONFIG_FILES = ("tsconfig.json", "jsconfig.json")
+
+_JSONC_COMMENTS = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+_JSONC_TRAILING_COMMAS = re.compile(r'("(?:\\.|[^"\\])*")|,(?=\s*[}\]])')
+
+def is_js_file(file_path: str) -> bool:
+    return file_path.endswith(JS_EXTENSIONS)
+
+def _normalize(path: str) -> str:
+    path = posixpath.normpath(path)
+    return "" if path == "." else path
+
+def _js_key(path: str) -> Optional[str]:
+    """
+    Module-index key of a JS/TS module path: '/' + the repo-relative path without
+    extension. The leading slash keeps these apart from dotted Python module keys.
+    """
+    path = _normalize(path)
+    if path == ".." or path.startswith("../") or path.startswith("/"):
+        return None
+    root, ext = posixpath.splitext(path)
+    if ext in JS_EXTENSIONS:
+        path = root
+    return "/" + path
+
+def js_module_keys(file_path: str) -> List[str]:
+    """Keys a JS/TS file answers to: its extensionless path and, for index files, its directory."""
+    root, ext = posixpath.splitext(file_path)
+    if ext not in JS_EXTENSIONS:
+        return []
+    keys = ["/" + root]
+    directory, _, name = root.rpartition("/")
+    if name == "index":
+        keys.append("/" + directory)
+    return keys
+
+def js_key_files(key: str) -> List[str]:
+    """Files that can answer to a key, in resolution priority order."""
+    path = key[1:]
+    index_prefix = f"{path}/index" if path else "index"
+    return [path + ext for ext in JS_EXTENSIONS if path] + [index_prefix + ext for ext in JS_EXTENSIONS]
+
+def parse_jsonc(text: str) -> Any:
+    """json.loads for tsconfig-style JSON with comments and trailing commas."""
+    keep_strings = lambda m: m.group(1) or ""
+    text = _JSONC_COMMENTS.sub(keep_strings, text)
+    return json.loads(_JSONC_TRAILING_COMMAS.sub(keep_strings, text))
+
+def load_path_aliases(root_path: str, config_files: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Reads `baseUrl` and `paths` from tsconfig/jsconfig files (repo-relative paths),
+    following relative `extends`. Returns {config dir: {"base_url", "paths"}} with all
+    paths resolved to repo-relative form; configs without either option are left out.
+    """
+    aliases = {}
+    for config_file in sorted(config_files):
+        options = _read_compiler_paths(root_path, config_file.replace(os.sep, "/"))
+        if options.get("base_url") is not None or options.get("paths"):
+            aliases[posixpath.dirname(config_file.replace(os.sep, "/"))] = {
+                "base_url": options.get("base_url"),
+                "paths": options.get("paths", {}),
+            }
+    return aliases
+
+def _read_compiler_paths(root_path: str, config_file: str, depth: int = 0) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(root_path, config_file), "r", encoding="utf-8") as f:
+            data = parse_jsonc(f.read())
+    except (OSError, ValueError) as e:
+        print(f"Skipping {config_file}: {e}")
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    config_dir = posixpath.dirname(config_file)
+    result: Dict[str, Any] = {}
+    extends = data.get("extends")
+    # Only configs inside the repo; package configs (e.g. @tsconfig/*) are not available
+    if isinstance(extends, str) and extends.startswith(".") and depth < 5:
+        base_file = _normalize(posixpath.join(config_dir, extends))
+        if not base_file.endswith(".json"):
+            base_file += ".json"
+        if not base_file.startswith(".."):
+            result.update(_read_compiler_paths(root_path, base_file, depth + 1))
+
+    options = data.get("compilerOptions") or {}
+    if isinstance(options.get("baseUrl"), str):
+        result["base_url"] = _normalize(posixpath.join(config_dir, options["baseUrl"]))
+    if isinstance(options.get("paths"), dict):
+        # `paths` are relative to baseUrl, or to the config itself without one
+        paths_base = result.get("base_url", config_dir)
+        result["paths"] = {
+            pattern: [_normalize(posixpath.join(paths_base, t)) for t in targets if isinstance(t, str)]
+            for pattern, targets in options["paths"].items() if isinstance(targets, list)
+        }
+    return result
+
+class ImportResolver:
+    """
+    Resolves the local imports of one project against its module index
+    (GraphService's file_map: dotted Python module or '/'-prefixed extensionless
+    JS/TS path -> file path).
+    - each file's imports are compiled once into raw (type, module) tuples,
+      keeping only the local ones (stdlib/third-party never resolve)
+    - the dotted candidate of a relative import depends only on the importing
+      package and the module string, so it is memoised per (package, module)
+    - JS/TS specifiers are resolved by path: relative ones against the importing
+      directory, bare ones through the nearest tsconfig `paths`/`baseUrl`. Keys are
+      extensionless, so one lookup covers extension probing and index files.
+      Results are memoised per (directory, specifier) as well.
+    - unresolved candidates are remembered per file, so after new files are
+      added only the importers waiting for one of them need re-linking
+    """
+    def __init__(self, module_index: Dict[str, str], path_aliases: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.module_index = module_index
+        self.path_aliases = path_aliases or {}
+        self.file_imports: Dict[str, Tuple[ImportTuple, ...]] = {}
+        self._candidates: Dict[Tuple[str, str], Optional[str]] = {}
+        # (directory, specifier) -> (candidate keys in priority order, counts as unresolved if missing)
+        self._js_candidates: Dict[Tuple[str, str], Tuple[Tuple[str, ...], bool]] = {}
+        # directory -> tsconfig aliases that apply to it (from the nearest enclosing config)
+        self._dir_aliases: Dict[str, Optional[Dict[str, Any]]] = {}
+        # file -> candidate modules it could not resolve; only for files resolved by this instance
+        self._unresolved: Dict[str, Set[str]] = {}
+        # candidate module -> files waiting for it
+        self._waiting: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def compile(imports: Iterable[Dict], file_path: str = "") -> Tuple[ImportTuple, ...]:
+        """
+        (type, module) tuples from ImportInfo dicts. Only local imports are kept,
+        except in JS/TS files, where bare specifiers may be tsconfig path aliases.
+        """
+        kept = LOCAL_IMPORT_TYPES + ("third_party",) if is_js_file(file_path) else LOCAL_IMPORT_TYPES
+        return tuple((imp["type"], imp["module"]) for imp in imports if imp.get("type") in kept)
+
+    def set_imports(self, file_path: str, imports: Tuple[ImportTuple, ...]):
+        self.file_imports[file_path] = imports
+
+    def has_imports(self, file_path: str) -> bool:
+        return file_path in self.file_imports
+
+    def is_tracked(self, file_path: str) -> bool:
+        """Whether this resolver knows which modules file_path is still waiting for."""
+        return file_path in self._unresolved
+
+    def forget(self, file_path: str):
+        self.file_imports.pop(file_path, None)
+        self._set_unresolved(file_path, None)
+
+    def candidate(self, file_path: str, import_type: str, module: str) -> Optional[str]:
+        """The dotted module path an import refers to, or None if it cannot be formed."""
+        if import_type == "local_absolute":
+            return module
+        package = file_path.rpartition("/")[0]
+        key = (package, module)
+        try:
+            return self._candidates[key]
+        except KeyError:
+            pass
+
+        stripped = module.lstrip(".")
+        dots = len(module) - len(stripped)
+        result = None
+        # `.mod` is the same package, each further dot goes up one level
+        if dots > 0:
+            parts = [p for p in package.split("/") if p and p != "."]
+            if dots > 1:
+                del parts[max(len(parts) - (dots - 1), 0):]
+            if stripped:
+                parts.append(stripped)
+            result = ".".join(parts)
+        self._candidates[key] = result
+        return result
+
+    def js_candidates(self, file_path: str, module: str) -> Tuple[Tuple[str, ...], bool]:
+        """
+        Module-index keys a JS/TS specifier may refer to, in priority order, and
+        whether it counts as an unresolved local import when none exists.
+        """
+        directory = file_path.rpartition("/")[0]
+        key = (directory, module)
+        result = self._js_candidates.get(key)
+        if result is not None:
+            return result
+
+        if posixpath.splitext(module)[1].lower() in ASSET_EXTENSIONS:
+            result = ((), False)
+        elif module.startswith("."):
+            candidate = _js_key(posixpath.join(directory, module))
+            result = ((candidate,) if candidate is not None else (), True)
+        else:
+            result = self._alias_candidates(directory, module)
+        self._js_candidates[key] = result
+        return result
+
+    def _alias_candidates(self, directory: str, module: str) -> Tuple[Tuple[str, ...], bool]:
+        aliases = self._aliases_for(directory)
+        if aliases is None:
+            return (), False
+
+        # The most specific pattern wins: exact match, else the longest prefix before `*`
+        best, best_length, star = None, -1, ""
+        for pattern, targets in aliases["paths"].items():
+            prefix, wildcard, suffix = pattern.partition("*")
+            if not wildcard:
+                if module == pattern:
+                    best, star = targets, ""
+                    break
+            elif (module.startswith(prefix) and module.endswith(suffix)
+                  and len(module) >= len(prefix) + len(suffix) and len(prefix) > best_length):
+                best, best_length = targets, len(prefix)
+                star = module[len(prefix):len(module) - len(suffix)]
+        if best is not None:
+            keys = (_js_key(target.replace("*", star, 1)) for target in best)
+            return tuple(k for k in keys if k is not None), True
+
+        # Non-relative specifiers also resolve from baseUrl; otherwise it is a package
+        if aliases["base_url"] is not None:
+            candidate = _js_key(posixpath.join(aliases["base_url"], module))
+            if candidate is not None:
+                return (candidate,), False
+        return (), False
+
+    def _aliases_for(self, directory: str) -> Optional[Dict[str, Any]]:
+        if directory not in self._dir_aliases:
+            # Nearest enclosing config dir (checked from the directory itself up to the root)
+            current = directory
+            while current not in self.path_aliases and current:
+                current = current.rpartition("/")[0]
+            self._dir_aliases[directory] = self.path_aliases.get(current)
+        return self._dir_aliases[directory]
+
+    def resolve_file(self, file_path: str) -> Tuple[List[str], int]:
+        """
+        Resolves the compiled imports of file_path.
+        Returns (target files, number of unresolved local imports).
+        """
+        targets = []
+        unresolved = 0
+        waiting: Set[str] = set()
+        module_index = self.module_index
+        js = is_js_file(file_path)
+        for import_type, module in self.file_imports.get(file_path, ()):
+            if js:
+                candidates, local = self.js_candidates(file_path, module)
+            else:
+                candidate = self.candidate(file_path, import_type, module)
+                candidates, local = ((candidate,) if candidate is not None else ()), True
+            target = None
+            for candidate in candidates:
+                target = module_index.get(candidate)
+                if target is not None:
+                    break
+            if target is not None:
+                targets.append(target)
+            else:
+                if local:
+                    unresolved += 1
+                waiting.update(candidates)
+        self._set_unresolved(file_path, waiting)
+        return targets, unresolved
+
+    def resolve_symbol(self, file_path: str, name: str, imports: Iterable[Dict]) -> Optional[Tuple[str, str]]:
+        """
+        Resolves a (possibly dotted) Python name used in file_path, such as a class
+        base (`Base`, `models.Base`, `pkg.models.Base`), through the file's imports
+        (ImportInfo dicts). Returns (defining file, symbol name) or None.
+        An unqualified name that no import binds refers to file_path itself.
+        """
+        head, _, rest = name.partition(".")
+        for imp in imports:
+            imported, alias = imp.get("name"), imp.get("alias")
+            bound = alias or imported or imp["module"].partition(".")[0]
+            if bound != head:
+                continue
+            # Bound by a stdlib or third-party import
+            if imp.get("type") not in LOCAL_IMPORT_TYPES:
+                return None
+            if imported is not None:
+                # from M import N [as A]: N is a member of M, or a submodule when followed by more
+                package = self.candidate(file_path, imp["type"], imp["module"])
+                if package is None:
+                    return None
+                if not rest:
+                    target = self.module_index.get(package)
+                    return (target, imported) if target is not None else None
+                qualified = ".".join(p for p in (package, imported, rest) if p)
+            elif alias is not None:
+                # import M as A
+                if not rest:
+                    return None
+                qualified = f"{imp['module']}.{rest}"
+            else:
+                # import a.b binds `a`: the name spells out the whole module path
+                qualified = name
+            break
+        else:
+            return (file_path, name) if not rest else None
+
+        module, _, symbol = qualified.rpartition(".")
+        target = self.module_index.get(module)
+        return (target, symbol) if target is not None else None
+
+    def newly_resolvable(self) -> Set[str]:
+        """Tracked files waiting for a module that is now in the index."""
+        files: Set[str] = set()
+        for candidate, waiting in self._waiting.items():
+            if candidate in self.module_index:
+                files.update(waiting)
+        return files
+
+    def _set_unresolved(self, file_path: str, candidates: Optional[Set[str]]):
+        for candidate in self._unresolved.pop(file_path, ()):
+            waiting = self._waiting.get(candidate)
+            if waiting is not None:
+                waiting.discard(file_path)
+                if not waiting:
+                    del self._waiting[candidate]
+        if candidates is not None:
+            self._unresolved[file_path] = candidates
+            for candidate in candidates:
+                self._waiting.setdefault(candidate, set()).add(file_path)
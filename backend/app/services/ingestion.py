@@ -2,137 +2,452 @@ import os
 import shutil
 import uuid
 import hashlib
-from typing import List, Dict, Any
+import multiprocessing
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Tuple, TYPE_CHECKING
 import git
-from .chunker import CodeChunker
-from .storage import VectorStorage
+from .chunker import CodeChunker, init_chunk_worker, chunk_files_in_worker, estimate_tokens, CHUNKABLE_EXTENSIONS
+from .storage import VectorStorage, ChunkWriter, revision_field
 from .graph import GraphService
+from .manifest import ManifestStore, git_blob_sha, revision_key, DEFAULT_REF
+from .lexical import LexicalIndexService
+from .cache import SearchCache
+from .import_resolver import load_path_aliases, TS_CONFIG_FILES
+from .scanner import RepositoryScanner, ScanStats
+from .mirror import MirrorCache
+from ..schemas import FileStructure, JobPhase
+
+if TYPE_CHECKING:
+    from .jobs import IngestionJob
 
 class IngestionService:
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None, upsert_batch_size: Optional[int] = None,
+                 storage: Optional[VectorStorage] = None, graph_service: Optional[GraphService] = None,
+                 manifest_store: Optional[ManifestStore] = None,
+                 lexical_index: Optional[LexicalIndexService] = None,
+                 search_cache: Optional[SearchCache] = None,
+                 mirror_cache: Optional[MirrorCache] = None):
+        # Chunks per upsert batch (None -> AUTOWIKI_UPSERT_BATCH_SIZE)
+        self.upsert_batch_size = upsert_batch_size
+        if workers is None:
+            workers = int(os.getenv("AUTOWIKI_INGEST_WORKERS", "1"))
+        # 0 means "one worker per CPU core"
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
         self.chunker = CodeChunker()
-        self.storage = VectorStorage()
-        self.graph_service = GraphService()
+        # .gitignore/.autowikiignore, chunkable extensions, size limit and binary/minified sniffing;
+        # tsconfig/jsconfig files yield no chunks but are read for path aliases
+        self.scanner = RepositoryScanner(extensions=CHUNKABLE_EXTENSIONS, keep_names=TS_CONFIG_FILES)
+        # Shared instances are injected by the API container; defaults keep standalone use working
+        self.storage = storage or VectorStorage()
+        self.graph_service = graph_service or GraphService()
+        self.manifest_store = manifest_store or ManifestStore()
+        self.lexical_index = lexical_index or LexicalIndexService()
+        # Search results of a project are invalidated whenever its index changes
+        self.search_cache = search_cache
+        # Bare mirrors of ingested repositories; re-ingests only fetch new objects
+        self.mirror_cache = mirror_cache or MirrorCache()
+        self._project_locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
         
     def _generate_project_id(self, repo_url: str) -> str:
         """Generates a consistent project ID from the repo URL."""
         return hashlib.md5(repo_url.encode('utf-8')).hexdigest()
 
-    def ingest_project(self, repo_url: str) -> Dict[str, Any]:
+    def ingest_project(self, repo_url: str, incremental: bool = False, job: Optional["IngestionJob"] = None,
+                       ref: Optional[str] = None) -> Dict[str, Any]:
         """
-        Ingests a project by cloning from a git URL.
+        Ingests a project from a git URL, at `ref` (a branch, tag or commit; default:
+        the remote HEAD). The repository is fetched into a persistent mirror and
+        checked out from there. Each ref is kept as a separate revision of the
+        project; re-ingesting one ref never touches the others.
+        With incremental=True, only files whose blob SHA changed since the last
+        ingest of that ref are re-chunked, re-embedded and re-linked.
+        If a job is given, progress is reported into it and cancellation is honoured.
         """
         project_id = self._generate_project_id(repo_url)
-        
-        # Overwrite Strategy: Clear existing data for this project
-        self.storage.delete_collection(project_id)
-        self.graph_service.delete_graph(project_id)
-        
-        # Use UUID for temp folder to ensure isolation during clone
-        temp_id = str(uuid.uuid4())[:8]
-        target_path = os.path.join(os.getcwd(), "temp_repos", temp_id)
-        
-        try:
-            self._clone_repo(repo_url, target_path)
-            stats = self.ingest_directory(target_path, project_id)
-            stats["repo_url"] = repo_url
-            stats["project_id"] = project_id
-            return stats
-        finally:
-            if os.path.exists(target_path):
-                shutil.rmtree(target_path)
-
-    def _clone_repo(self, url: str, target_dir: str):
-        """Clones a git repo to target_dir. Supports SSH."""
-        if os.path.exists(target_dir):
-            shutil.rmtree(target_dir)
-        
-        print(f"Cloning {url} to {target_dir}...")
-        
-        # Configure env to ignore strict host key checking for SSH
-        # This allows cloning from github.com (or others) without pre-populating known_hosts in Docker
-        env = os.environ.copy()
-        env["GIT_SSH_COMMAND"] = "ssh -o UserKnownHostsFile=/dev/null -o StrictHostKeyChecking=no"
-        
-        git.Repo.clone_from(url, target_dir, depth=1, env=env)
-        print("Clone complete.")
+        key = revision_key(project_id, ref)
+
+        # Revisions share chunks, so ingests of one project never overlap
+        with self._project_lock(project_id):
+            # Without a manifest we cannot tell what is already indexed, so fall back to a full rebuild
+            if incremental and not self.manifest_store.exists(key):
+                incremental = False
+
+            if not incremental:
+                # Overwrite Strategy: rebuild this revision's graph and symbol index.
+                # Its manifest is kept: the new chunks are diffed against it, so
+                # unchanged chunks are reused and only the stale ones are released.
+                self.graph_service.delete_graph(key)
+                self.lexical_index.delete_index(key)
+                self._invalidate_search(key)
+
+            # Use UUID for temp folder to ensure isolation during checkout
+            temp_id = str(uuid.uuid4())[:8]
+            target_path = os.path.join(os.getcwd(), "temp_repos", temp_id)
+
+            try:
+                if job:
+                    job.set_phase(JobPhase.CLONING)
+                commit = self.mirror_cache.checkout(repo_url, target_path, ref=ref)
+                stats = self.ingest_directory(target_path, project_id, incremental=incremental, job=job,
+                                              ref=ref, commit=commit)
+                stats["repo_url"] = repo_url
+                stats["project_id"] = project_id
+                stats["ref"] = ref or DEFAULT_REF
+                stats["commit"] = commit
+                return stats
+            except BaseException:
+                self._discard_partial_ingest(project_id, key, incremental)
+                raise
+            finally:
+                if os.path.exists(target_path):
+                    shutil.rmtree(target_path)
+
+    def _project_lock(self, project_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._project_locks.setdefault(project_id, threading.Lock())
+
+    def clear_project(self, project_id: str, ref: Optional[str] = None) -> int:
+        """
+        Deletes all indexed data, the dependency graphs and the manifests of a project,
+        or with `ref`, only that revision (chunks other revisions share are kept).
+        Returns the number of deleted chunks.
+        """
+        with self._project_lock(project_id):
+            if ref is not None:
+                key = self.manifest_store.resolve_revision(project_id, ref)
+                return self._release_revision(project_id, key) if key else 0
+
+            count = self.storage.clear_all(project_id)
+            self.storage.delete_collection(project_id)
+            keys = {r["key"] for r in self.manifest_store.load_revisions(project_id).values()}
+            for key in keys | {project_id}:
+                self.graph_service.delete_graph(key)
+                self.manifest_store.delete(key)
+                self.lexical_index.delete_index(key)
+                self._invalidate_search(key)
+            self.manifest_store.delete_revisions(project_id)
+            return count
+
+    def _release_revision(self, project_id: str, key: str) -> int:
+        """
+        Drops one revision: its graph, symbol index and manifest. Its chunks are
+        deleted unless another revision references them, in which case they are
+        only removed from this revision. Returns the number of deleted chunks.
+        """
+        chunk_ids = {cid for entry in self.manifest_store.load(key).values() for cid in entry.get("chunk_ids", [])}
+        shared_ids = self.manifest_store.referenced_chunk_ids(project_id, exclude_key=key)
+        deleted = [cid for cid in chunk_ids if cid not in shared_ids]
+        self.storage.delete_chunks(project_id, deleted)
+        self.storage.set_revision(project_id, [cid for cid in chunk_ids if cid in shared_ids], key, member=False)
+
+        self.graph_service.delete_graph(key)
+        self.lexical_index.delete_index(key)
+        self.manifest_store.delete(key)
+        self.manifest_store.delete_revision(project_id, key)
+        self._invalidate_search(key)
+        return len(deleted)
 
-    def ingest_directory(self, root_path: str, project_id: str):
+    def _discard_partial_ingest(self, project_id: str, key: str, incremental: bool):
+        """
+        Cleans up after a failed or cancelled ingest. A full rebuild drops the
+        revision entirely; an incremental one keeps the last saved graph and
+        manifest, so the next incremental run simply redoes the files that changed.
+        Chunks written by the failed run itself are removed by ingest_directory.
+        """
+        if incremental:
+            self.graph_service.evict(key)
+            self.lexical_index.evict(key)
+            self._invalidate_search(key)
+        else:
+            self._release_revision(project_id, key)
+
+    def _invalidate_search(self, project_id: str):
+        if self.search_cache is not None:
+            self.search_cache.invalidate_project(project_id)
+
+    def ingest_directory(self, root_path: str, project_id: str, incremental: bool = False,
+                         workers: Optional[int] = None, job: Optional["IngestionJob"] = None,
+                         ref: Optional[str] = None, commit: Optional[str] = None):
         """
         Recursively scans a directory, chunks content, saves to Vector DB, and builds dependency graph.
+        With incremental=True, files whose blob SHA matches the stored manifest are skipped,
+        and stale chunks/graph nodes of modified or deleted files are removed.
+        workers > 1 parses files in a process pool; results are merged in scan order,
+        so chunk IDs and graph contents are identical to a single-process run.
+
+        The directory is indexed as revision `ref` of the project: its manifest, graph
+        and symbol index live under revision_key(project_id, ref), while chunks go to
+        the project's collection, shared by all revisions. Chunk IDs are content
+        addressed, so a chunk another revision already stored is only marked as part
+        of this one (no embedding, no write); chunks are deleted once no revision's
+        manifest references them any more.
         """
         abs_path = os.path.abspath(root_path)
-        all_chunks = []
+        key = revision_key(project_id, ref)
+        if self.manifest_store.load_revisions(project_id):
+            previous = self.manifest_store.load(key)
+        else:
+            # Nothing, or an index from before revisions existed, whose chunks lack revision
+            # fields: reusing them would leave them invisible to this revision, so start over
+            self.storage.delete_collection(project_id)
+            self.graph_service.delete_graph(key)
+            self.lexical_index.delete_index(key)
+            incremental = False
+            previous = {}
+        previous_chunk_ids = {cid for entry in previous.values() for cid in entry.get("chunk_ids", [])}
+        # Chunks other revisions hold: already stored, and they must survive this one's changes
+        shared_chunk_ids = self.manifest_store.referenced_chunk_ids(project_id, exclude_key=key)
+        field = revision_field(key)
+        blob_shas = self._read_index_shas(abs_path)
+        manifest: Dict[str, Dict[str, Any]] = {}
+        symbol_index = self.lexical_index.get_index(key)
+
+        new_chunk_ids = set()
+        chunks_generated = 0
+        stale_chunk_ids = []
+        # Stored chunks (of other revisions) to mark as part of this one
+        reused_chunk_ids = []
+        # Written by this run; removed again if it fails
+        written_chunk_ids = set()
+        # Files whose IMPORTS edges must be re-resolved
+        affected_files = set()
+
         file_count = 0
         code_files = 0
         doc_files = 0
+        unchanged_files = 0
         
         code_chunks_count = 0
         doc_chunks_count = 0
-        
-        for dirpath, dirnames, filenames in os.walk(abs_path):
-            dirnames[:] = [d for d in dirnames if not self._is_ignored(d)]
-            
-            for filename in filenames:
-                if self._is_ignored(filename):
-                    continue
-                    
-                file_path = os.path.join(dirpath, filename)
-                # Calculate relative path for stable ID generation
-                rel_path = os.path.relpath(file_path, abs_path)
-                
-                # Pass rel_path to chunker
-                chunks, structure = self.chunker.chunk_and_structure(file_path, rel_path=rel_path)
-                
-                # Update Graph
-                if structure:
-                    self.graph_service.update_dependency_graph(project_id, structure)
-                
-                if chunks:
-                    all_chunks.extend(chunks)
-                    file_count += 1
-                    
-                    # Count logic
-                    is_doc_file = False
-                    for c in chunks:
-                        if c['metadata'].get('type') == 'documentation':
-                            doc_chunks_count += 1
-                            is_doc_file = True
+        chunks_reused = 0
+        # Estimated tokens sent to the embedder, vs. embedding each definition whole
+        embedded_tokens = 0
+        source_tokens = 0
+
+        try:
+            # 1. Scan: decide which files need (re)processing
+            if job:
+                job.set_phase(JobPhase.SCANNING)
+            pending = []
+            seen = set()
+            ts_configs = []
+            scan_stats = ScanStats()
+            for file_path, rel_path in self.scanner.scan(abs_path, scan_stats):
+                seen.add(rel_path)
+                if os.path.basename(rel_path) in TS_CONFIG_FILES:
+                    ts_configs.append(rel_path)
+                sha = self._lookup_index_sha(blob_shas, rel_path, file_path) or git_blob_sha(file_path)
+                old_entry = previous.get(rel_path)
+                if old_entry is not None:
+                    if incremental and old_entry["sha"] == sha:
+                        manifest[rel_path] = old_entry
+                        unchanged_files += 1
+                        continue
+                    # Modified (or rebuilt): drop what was indexed for the old version
+                    stale_chunk_ids.extend(old_entry.get("chunk_ids", []))
+                    affected_files.update(self.graph_service.remove_file(key, rel_path))
+                pending.append((file_path, rel_path, sha))
+            if scan_stats.files_skipped or scan_stats.dirs_ignored:
+                skipped = ", ".join(f"{n} {reason}" for reason, n in scan_stats.skipped.items() if n)
+                print(f"Scan ({scan_stats.source}): {scan_stats.files_yielded} files kept, "
+                      f"skipped {skipped or 'none'}; {scan_stats.dirs_ignored} directories ignored")
+
+            # 2. Chunk + parse (optionally in worker processes), merged in scan order
+            # Chunks stream through the writer in bounded upsert batches instead of accumulating here
+            if job:
+                job.set_phase(JobPhase.PARSING)
+                job.update(files_total=len(pending))
+            on_batch = (lambda written, _batches: job.update(chunks_embedded=written)) if job else None
+            results = self._chunk_files([(fp, rp) for fp, rp, _ in pending], workers or self.workers)
+            writer = ChunkWriter(self.storage, project_id, batch_size=self.upsert_batch_size, on_batch=on_batch)
+            with writer:
+                for files_parsed, ((file_path, rel_path, sha), (chunks, structure)) in enumerate(zip(pending, results), 1):
+                    if job:
+                        job.raise_if_cancelled()
+                        job.update(files_parsed=files_parsed)
+
+                    # Update Graph
+                    if structure:
+                        self.graph_service.update_dependency_graph(key, structure)
+                        affected_files.add(rel_path)
+
+                    if chunks or structure:
+                        manifest[rel_path] = {"sha": sha, "chunk_ids": [c["id"] for c in chunks]}
+
+                    if chunks:
+                        # Only content not stored yet is embedded and written
+                        to_write = []
+                        for c in chunks:
+                            if c["id"] in previous_chunk_ids:
+                                chunks_reused += 1
+                            elif c["id"] in shared_chunk_ids:
+                                chunks_reused += 1
+                                reused_chunk_ids.append(c["id"])
+                            else:
+                                to_write.append(dict(c, metadata={**c["metadata"], field: True}))
+                        if to_write:
+                            written_chunk_ids.update(c["id"] for c in to_write)
+                            writer.add(to_write)
+                        symbol_index.add_chunks(chunks)
+                        new_chunk_ids.update(c["id"] for c in chunks)
+                        chunks_generated += len(chunks)
+                        file_count += 1
+
+                        # Count logic
+                        is_doc_file = False
+                        for c in chunks:
+                            meta = c['metadata']
+                            tokens = meta.get('tokens')
+                            if tokens is None:
+                                tokens = estimate_tokens(c['content'])
+                            embedded_tokens += tokens
+                            # Continuation parts are covered by part 0's source_tokens
+                            if not meta.get('part'):
+                                source_tokens += meta.get('source_tokens', tokens)
+                            if c['metadata'].get('type') == 'documentation':
+                                doc_chunks_count += 1
+                                is_doc_file = True
+                            else:
+                                code_chunks_count += 1
+
+                        if is_doc_file:
+                            doc_files += 1
                         else:
-                            code_chunks_count += 1
-                            
-                    if is_doc_file:
-                        doc_files += 1
-                    else:
-                        code_files += 1
-                    
-        if all_chunks:
-            self.storage.save_chunks(project_id, all_chunks)
-            
-        # Build edges after all files are processed
-        self.graph_service.build_edges(project_id)
-        
-        # Build hierarchical module tree
-        self.graph_service.build_module_tree(project_id)
+                            code_files += 1
+
+                if job:
+                    job.set_phase(JobPhase.EMBEDDING)
+
+            # Deleted: indexed last time but no longer present
+            deleted_files = [p for p in previous if p not in seen]
+            for rel_path in deleted_files:
+                stale_chunk_ids.extend(previous[rel_path].get("chunk_ids", []))
+                affected_files.update(self.graph_service.remove_file(key, rel_path))
+
+            # Chunk IDs are deterministic, so a modified file may reuse some of its old IDs
+            stale_chunk_ids = list(dict.fromkeys(cid for cid in stale_chunk_ids if cid not in new_chunk_ids))
+            if stale_chunk_ids:
+                symbol_index.remove_chunks(stale_chunk_ids)
+
+            # Build edges after all files are processed
+            if job:
+                job.set_phase(JobPhase.LINKING)
+            # Readers see the edges, analytics and tree of one build: all old or all new
+            with self.graph_service.lock(key).write():
+                # tsconfig path aliases can change how any JS/TS import resolves
+                aliases_changed = self.graph_service.set_path_aliases(key, load_path_aliases(abs_path, ts_configs))
+                if incremental and not aliases_changed:
+                    self.graph_service.build_edges(key, file_ids=affected_files)
+                else:
+                    self.graph_service.build_edges(key)
+                # PageRank, import cycles, transitive dependency counts; skipped if the import edges are unchanged
+                self.graph_service.compute_analytics(key)
+
+                # Build hierarchical module tree
+                self.graph_service.build_module_tree(key)
+
+            self.manifest_store.save(key, manifest)
+            self.manifest_store.save_revision(project_id, ref or DEFAULT_REF, commit)
+        except BaseException:
+            # Nothing references what this run wrote; the previous manifest stays valid
+            if written_chunk_ids:
+                try:
+                    self.storage.delete_chunks(project_id, list(written_chunk_ids))
+                except Exception as e:
+                    print(f"Could not remove chunks of the failed ingest of {key}: {e}")
+            raise
+
+        # The new manifest is saved: release what only the old version of this revision used
+        deleted_chunk_ids = [cid for cid in stale_chunk_ids if cid not in shared_chunk_ids]
+        self.storage.delete_chunks(project_id, deleted_chunk_ids)
+        self.storage.set_revision(project_id, [cid for cid in stale_chunk_ids if cid in shared_chunk_ids],
+                                  key, member=False)
+        self.storage.set_revision(project_id, list(dict.fromkeys(reused_chunk_ids)), key)
+
+        self.lexical_index.save_index(key)
+        self._invalidate_search(key)
         
         # Get graph stats
-        graph = self.graph_service._get_or_create_graph(project_id)
+        graph = self.graph_service._get_or_create_graph(key)
+        if job:
+            job.update(edges_built=graph.number_of_edges())
             
         return {
             "files_processed": file_count,
             "code_files": code_files,
             "doc_files": doc_files,
-            "chunks_generated": len(all_chunks),
+            "files_unchanged": unchanged_files,
+            "files_deleted": len(deleted_files),
+            "chunks_generated": chunks_generated,
+            "chunks_reused": chunks_reused,
+            "upsert_batches": writer.batches_committed,
+            "chunks_deleted": len(deleted_chunk_ids),
             "code_chunks": code_chunks_count,
             "doc_chunks": doc_chunks_count,
+            "embedded_tokens": embedded_tokens,
+            "source_tokens": source_tokens,
+            "token_reduction": round(1 - embedded_tokens / source_tokens, 4) if source_tokens else 0.0,
             "graph_nodes": graph.number_of_nodes(),
-            "graph_edges": graph.number_of_edges()
+            "graph_edges": graph.number_of_edges(),
+            "files_skipped": scan_stats.files_skipped,
+            "scan": scan_stats.to_dict()
         }
 
-    def _is_ignored(self, name: str) -> bool:
-        """Simple ignore list."""
-        ignored = {
-            '.git', '__pycache__', 'node_modules', '.next', 'venv', '.venv', 
-            '.DS_Store', 'dist', 'build', '.pytest_cache', 'data', 'temp_repos'
-        }
-        return name in ignored or name.startswith('.')
+    def _chunk_files(self, files: List[Tuple[str, str]], workers: int) -> Iterator[Tuple[List[Dict[str, Any]], Optional[FileStructure]]]:
+        """
+        Chunks (file_path, rel_path) pairs, yielding (chunks, structure) in input order.
+        With workers > 1, each worker process holds its own CodeParser.
+        """
+        if workers <= 1 or len(files) < 2:
+            for file_path, rel_path in files:
+                # Pass rel_path to chunker
+                yield self.chunker.chunk_and_structure(file_path, rel_path=rel_path)
+            return
+
+        # 'spawn' avoids forking a process that may hold Chroma/DB threads
+        ctx = multiprocessing.get_context("spawn")
+        group_size = max(1, min(16, len(files) // (workers * 4)))
+        groups = (files[i:i + group_size] for i in range(0, len(files), group_size))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=init_chunk_worker) as pool:
+            # Keep a bounded window of in-flight groups (instead of pool.map submitting everything)
+            # so parsed results cannot pile up faster than the chunk writer drains them.
+            # Futures are consumed in submission order, keeping the merge deterministic.
+            window = deque(pool.submit(chunk_files_in_worker, g) for g in islice(groups, workers * 2))
+            while window:
+                results = window.popleft().result()
+                next_group = next(groups, None)
+                if next_group is not None:
+                    window.append(pool.submit(chunk_files_in_worker, next_group))
+                yield from results
+
+    def _read_index_shas(self, root_path: str) -> Dict[str, Any]:
+        """
+        Reads path -> (blob SHA, size, mtime) from the git index of a checkout, so unchanged
+        files never need to be read just to hash them. Returns {} for non-git directories.
+        """
+        if not os.path.isdir(os.path.join(root_path, ".git")):
+            return {}
+        try:
+            repo = git.Repo(root_path)
+            return {
+                path: (entry.hexsha, entry.size, entry.mtime[0])
+                for (path, _stage), entry in repo.index.entries.items()
+            }
+        except Exception as e:
+            print(f"Could not read git index for {root_path}: {e}")
+            return {}
+
+    def _lookup_index_sha(self, blob_shas: Dict[str, Any], rel_path: str, file_path: str) -> Optional[str]:
+        """Returns the indexed blob SHA only if the working file still matches the index stat data."""
+        entry = blob_shas.get(rel_path.replace(os.sep, "/"))
+        if not entry:
+            return None
+        sha, size, mtime = entry
+        st = os.stat(file_path)
+        if st.st_size != size or int(st.st_mtime) != mtime:
+            return None
+        return sha
@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Optional, List
+from ..schemas import JobState, JobPhase
+
+class IngestionCancelled(Exception):
+    """Raised inside an ingestion when its job has been cancelled."""
+
+
+class IngestionJob:
+    """
+    State of one background ingestion. The ingestion pipeline reports into it
+    (set_phase/update) and polls raise_if_cancelled() between units of work.
+    """
+    def __init__(self, repo_url: str, project_id: str, incremental: bool = False, ref: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.repo_url = repo_url
+        self.project_id = project_id
+        self.incremental = incremental
+        self.ref = ref
+        self.state = JobState.QUEUED
+        self.phase = JobPhase.QUEUED
+        self.progress: Dict[str, int] = {
+            "files_total": 0,
+            "files_parsed": 0,
+            "chunks_embedded": 0,
+            "edges_built": 0,
+        }
+        self.stats: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in (JobState.SUCCEEDED, JobState.FAILED, JobState.CANCELLED)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def raise_if_cancelled(self):
+        if self._cancel_event.is_set():
+            raise IngestionCancelled(f"Ingestion job {self.id} was cancelled")
+
+    def set_phase(self, phase: JobPhase):
+        self.raise_if_cancelled()
+        with self._lock:
+            self.phase = phase
+
+    def update(self, **counters: int):
+        with self._lock:
+            self.progress.update(counters)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "project_id": self.project_id,
+                "repo_url": self.repo_url,
+                "incremental": self.incremental,
+                "ref": self.ref,
+                "state": self.state,
+                "phase": self.phase,
+                "progress": dict(self.progress),
+                "stats": self.stats,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    """
+    In-process ingestion queue. Jobs run on a bounded thread pool, so at most
+    max_workers ingestions run concurrently; the rest wait as QUEUED.
+    Only one active job per project and ref is allowed; submitting again returns it.
+    """
+    def __init__(self, ingestion_service, max_workers: Optional[int] = None, max_finished_jobs: int = 100):
+        if max_workers is None:
+            max_workers = int(os.getenv("AUTOWIKI_MAX_CONCURRENT_INGESTS", "2"))
+        self.ingestion_service = ingestion_service
+        self.max_finished_jobs = max_finished_jobs
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ingest")
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self.futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, repo_url: str, incremental: bool = False, ref: Optional[str] = None) -> IngestionJob:
+        project_id = self.ingestion_service._generate_project_id(repo_url)
+        with self._lock:
+            for job in self.jobs.values():
+                if job.project_id == project_id and job.ref == ref and not job.is_finished:
+                    return job
+
+            job = IngestionJob(repo_url, project_id, incremental=incremental, ref=ref)
+            self.jobs[job.id] = job
+            self.futures[job.id] = self.executor.submit(self._run, job)
+            self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[IngestionJob]:
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            future = self.futures.get(job_id)
+        if job is None or job.is_finished:
+            return job
+
+        job.cancel()
+        # A job still waiting in the queue never starts
+        if future is not None and future.cancel():
+            self._finish(job, JobState.CANCELLED)
+        return job
+
+    def shutdown(self, wait: bool = False):
+        for job in self.list_jobs():
+            if not job.is_finished:
+                job.cancel()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job: IngestionJob):
+        if job.cancelled:
+            self._finish(job, JobState.CANCELLED)
+            return
+
+        job.state = JobState.RUNNING
+        job.started_at = time.time()
+        try:
+            stats = self.ingestion_service.ingest_project(
+                repo_url=job.repo_url, incremental=job.incremental, job=job, ref=job.ref
+            )
+            job.stats = stats
+            self._finish(job, JobState.SUCCEEDED)
+        except IngestionCancelled:
+            self._finish(job, JobState.CANCELLED)
+        except Exception as e:
+            print(f"Ingestion Error ({job.id}): {e}")
+            job.error = str(e)
+            self._finish(job, JobState.FAILED)
+
+    def _finish(self, job: IngestionJob, state: JobState):
+        job.state = state
+        job.phase = JobPhase.DONE
+        job.finished_at = time.time()
+        # Runs on worker threads, concurrently with submit() and cancel()
+        with self._lock:
+            self.futures.pop(job.id, None)
+
+    def _prune(self):
+        """Forgets the oldest finished jobs beyond max_finished_jobs."""
+        finished = [jid for jid, job in self.jobs.items() if job.is_finished]
+        for jid in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[jid]
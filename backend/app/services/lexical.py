@@ -0,0 +1,271 @@
+import gzip
+import json
+import math
+import os
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+# A query that is a single identifier (optionally dotted), e.g. `build_module_tree` or `schemas.ImportInfo`
+_SYMBOL_QUERY = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+
+# Field weights: a term in the symbol name counts more than one in the path or body
+NAME_WEIGHT = 3
+PATH_WEIGHT = 2
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased identifier tokens. Compound identifiers are kept whole and also
+    split into their parts: `build_module_tree` -> build_module_tree, build, module, tree;
+    `ImportInfo` -> importinfo, import, info.
+    """
+    tokens = []
+    for word in _WORD.findall(text):
+        lower = word.lower()
+        tokens.append(lower)
+        parts = [p.lower() for piece in word.split("_") for p in _CAMEL.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+def is_symbol_query(query: str) -> bool:
+    return bool(_SYMBOL_QUERY.match(query.strip()))
+
+
+class SymbolIndex:
+    """
+    In-memory inverted index over the chunks of one project.
+    - symbols: sorted (lower-cased name, chunk_id) pairs for exact/prefix lookups via bisect
+    - postings: term -> {chunk_id: weighted term frequency}, scored with BM25
+    Chunk contents are not kept; only the chunk metadata needed to render a hit.
+    """
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+        self._symbols: List[Tuple[str, str]] = []
+        self._symbols_dirty = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add_chunks(self, chunks: Iterable[Dict[str, Any]]):
+        with self._lock:
+            for chunk in chunks:
+                meta = chunk.get("metadata", {})
+                terms: Counter = Counter()
+                for token in tokenize(meta.get("name") or ""):
+                    terms[token] += NAME_WEIGHT
+                for token in tokenize(meta.get("file_path") or ""):
+                    terms[token] += PATH_WEIGHT
+                terms.update(tokenize(chunk.get("content") or ""))
+                self._add(chunk["id"], meta, dict(terms))
+
+    def remove_chunks(self, chunk_ids: Iterable[str]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+
+    def _add(self, chunk_id: str, metadata: Dict[str, Any], terms: Dict[str, int]):
+        if chunk_id in self.docs:
+            self._remove(chunk_id)
+        length = sum(terms.values())
+        self.docs[chunk_id] = {"metadata": metadata, "terms": terms, "length": length}
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+        # Re-sorted lazily on the next lookup, so bulk loads stay O(n log n)
+        self._symbols_dirty = True
+
+    def _remove(self, chunk_id: str):
+        doc = self.docs.pop(chunk_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc["length"]
+        for term in doc["terms"]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(chunk_id, None)
+                if not posting:
+                    del self.postings[term]
+        self._symbols_dirty = True
+
+    def _sorted_symbols(self) -> List[Tuple[str, str]]:
+        if self._symbols_dirty:
+            self._symbols = sorted(
+                (doc["metadata"].get("name", "").lower(), chunk_id)
+                for chunk_id, doc in self.docs.items()
+            )
+            self._symbols_dirty = False
+        return self._symbols
+
+    def lookup(self, name: str, prefix: bool = False, limit: int = 50) -> List[str]:
+        """Chunk IDs whose symbol name equals (or starts with) `name`, case-insensitively."""
+        key = name.lower()
+        with self._lock:
+            symbols = self._sorted_symbols()
+            ids = []
+            i = bisect_left(symbols, (key, ""))
+            while i < len(symbols) and len(ids) < limit:
+                symbol, chunk_id = symbols[i]
+                if symbol != key and not (prefix and symbol.startswith(key)):
+                    break
+                ids.append(chunk_id)
+                i += 1
+            return ids
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Ranks chunks for `query`: exact symbol-name matches first, then prefix
+        matches, then the rest by BM25. Each result carries a `match` kind.
+        """
+        with self._lock:
+            if not self.docs:
+                return []
+            query = query.strip()
+            # For `pkg.mod.Name`, the symbol is the last component
+            symbol = query.rsplit(".", 1)[-1] if is_symbol_query(query) else None
+
+            bm25 = self._bm25(tokenize(query))
+            ranked: List[Tuple[int, float, str]] = []
+            seen = set()
+            if symbol:
+                for rank, ids in ((0, self.lookup(symbol, limit=limit)),
+                                  (1, self.lookup(symbol, prefix=True, limit=limit))):
+                    for chunk_id in ids:
+                        if chunk_id not in seen:
+                            seen.add(chunk_id)
+                            ranked.append((rank, -bm25.get(chunk_id, 0.0), chunk_id))
+            for chunk_id, score in bm25.items():
+                if chunk_id not in seen:
+                    ranked.append((2, -score, chunk_id))
+            ranked.sort()
+
+            kinds = ("exact", "prefix", "bm25")
+            return [
+                {
+                    "id": chunk_id,
+                    "metadata": self.docs[chunk_id]["metadata"],
+                    "score": -neg_score,
+                    "match": kinds[rank],
+                }
+                for rank, neg_score, chunk_id in ranked[:limit]
+            ]
+
+    def _bm25(self, query_terms: List[str]) -> Dict[str, float]:
+        n = len(self.docs)
+        avg_length = self.total_length / n if n else 0.0
+        scores: Dict[str, float] = {}
+        for term in set(query_terms):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for chunk_id, tf in posting.items():
+                length = self.docs[chunk_id]["length"]
+                norm = tf + self.K1 * (1 - self.B + self.B * length / avg_length) if avg_length else tf + self.K1
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.K1 + 1) / norm
+        return scores
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"docs": {cid: {"metadata": d["metadata"], "terms": d["terms"]} for cid, d in self.docs.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SymbolIndex":
+        index = cls()
+        for chunk_id, doc in data.get("docs", {}).items():
+            index._add(chunk_id, doc["metadata"], doc["terms"])
+        return index
+
+
+class LexicalIndexService:
+    """
+    Per-project SymbolIndex cache, persisted as gzipped JSON next to the graphs.
+    Built and updated during ingestion, read by search.
+    """
+    def __init__(self, base_path: str = "backend/data/symbols"):
+        self.base_path = base_path
+        # Cache for multiple projects: project_id -> SymbolIndex
+        self.indexes: Dict[str, SymbolIndex] = {}
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.base_path):
+            os.makedirs(self.base_path, exist_ok=True)
+
+    def _get_index_path(self, project_id: str) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in project_id)
+        return os.path.join(self.base_path, f"{safe_id}_symbols.json.gz")
+
+    def get_index(self, project_id: str) -> SymbolIndex:
+        """Returns the cached index, loading it from disk on first use."""
+        with self._lock:
+            index = self.indexes.get(project_id)
+            if index is None:
+                index = self._load(project_id)
+                self.indexes[project_id] = index
+            return index
+
+    def _load(self, project_id: str) -> SymbolIndex:
+        path = self._get_index_path(project_id)
+        if not os.path.exists(path):
+            return SymbolIndex()
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return SymbolIndex.from_dict(json.load(f))
+        except Exception as e:
+            print(f"Error loading symbol index for {project_id}: {e}")
+            return SymbolIndex()
+
+    def search(self, project_id: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.get_index(project_id).search(query, limit)
+
+    def save_index(self, project_id: str):
+        index = self.indexes.get(project_id)
+        if index is None:
+            return
+        path = self._get_index_path(project_id)
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def delete_index(self, project_id: str):
+        with self._lock:
+            self.indexes.pop(project_id, None)
+        path = self._get_index_path(project_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def evict(self, project_id: str):
+        """Drops the in-memory index; the next access reloads the last saved state."""
+        with self._lock:
+            self.indexes.pop(project_id, None)
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Merges ranked result lists by chunk ID using RRF: score = sum(1 / (k + rank)).
+    Rank-based, so BM25 scores and vector distances need no common scale.
+    The first occurrence of a chunk provides its fields; `rrf_score` is added.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, res in enumerate(results, 1):
+            entry = fused.get(res["id"])
+            if entry is None:
+                entry = fused[res["id"]] = dict(res, rrf_score=0.0)
+            else:
+                # Keep fields only the later list has (e.g. content, distance)
+                for key, value in res.items():
+                    entry.setdefault(key, value)
+            entry["rrf_score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda r: r["rrf_score"], reverse=True)
@@ -0,0 +1,153 @@
+import json
+import os
+import hashlib
+import threading
+import time
+from typing import Dict, Any, Optional, Set
+
+# Ref recorded for ingests that do not name one (the remote HEAD / default branch)
+DEFAULT_REF = "HEAD"
+
+def revision_key(project_id: str, ref: Optional[str] = None) -> str:
+    """
+    Key of one revision's manifest, graph and symbol index. The default revision
+    keeps the bare project ID, so single-revision projects are stored as before.
+    """
+    if not ref or ref == DEFAULT_REF:
+        return project_id
+    return f"{project_id}@{ref}"
+
+class ManifestStore:
+    """
+    Per-project record of what is currently indexed:
+    rel_path -> {"sha": <git blob sha>, "chunk_ids": [...]}.
+    Used by incremental ingestion to find added, modified and deleted files.
+    Each revision of a project has its own manifest (keyed by revision_key());
+    a per-project registry records which revisions exist and their commits.
+    """
+    def __init__(self, base_path: str = "backend/data/manifests"):
+        self.base_path = base_path
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.base_path):
+            os.makedirs(self.base_path, exist_ok=True)
+
+    def _get_manifest_path(self, project_id: str) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in project_id)
+        return os.path.join(self.base_path, f"{safe_id}_manifest.json")
+
+    def exists(self, project_id: str) -> bool:
+        return os.path.exists(self._get_manifest_path(project_id))
+
+    def load(self, project_id: str) -> Dict[str, Dict[str, Any]]:
+        """Returns the stored manifest, or an empty dict if none exists."""
+        path = self._get_manifest_path(project_id)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f).get("files", {})
+        except Exception as e:
+            print(f"Error loading manifest for {project_id}: {e}")
+            return {}
+
+    def save(self, project_id: str, files: Dict[str, Dict[str, Any]]):
+        path = self._get_manifest_path(project_id)
+        # Write to a temp file first so a crash mid-write never leaves a truncated manifest
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"files": files}, f)
+        os.replace(tmp_path, path)
+
+    def delete(self, project_id: str):
+        path = self._get_manifest_path(project_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+    def _get_revisions_path(self, project_id: str) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in project_id)
+        return os.path.join(self.base_path, f"{safe_id}_revisions.json")
+
+    def load_revisions(self, project_id: str) -> Dict[str, Dict[str, Any]]:
+        """ref -> {"key", "commit", "ingested_at"}; empty for projects indexed before revisions existed."""
+        path = self._get_revisions_path(project_id)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f).get("revisions", {})
+        except Exception as e:
+            print(f"Error loading revisions for {project_id}: {e}")
+            return {}
+
+    def _save_revisions(self, project_id: str, revisions: Dict[str, Dict[str, Any]]):
+        path = self._get_revisions_path(project_id)
+        if not revisions:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"revisions": revisions}, f)
+        os.replace(tmp_path, path)
+
+    def save_revision(self, project_id: str, ref: str, commit: Optional[str]):
+        with self._lock:
+            revisions = self.load_revisions(project_id)
+            revisions[ref] = {"key": revision_key(project_id, ref), "commit": commit, "ingested_at": time.time()}
+            self._save_revisions(project_id, revisions)
+
+    def delete_revision(self, project_id: str, key: str):
+        """Forgets every ref pointing at the revision stored under `key`."""
+        with self._lock:
+            revisions = self.load_revisions(project_id)
+            self._save_revisions(project_id, {ref: r for ref, r in revisions.items() if r["key"] != key})
+
+    def delete_revisions(self, project_id: str):
+        with self._lock:
+            self._save_revisions(project_id, {})
+
+    def resolve_revision(self, project_id: str, ref: Optional[str] = None) -> Optional[str]:
+        """
+        Maps a ref name, or a commit SHA (full or an unambiguous prefix of at least
+        7 characters), to its revision key. Without a ref: the default revision,
+        else the most recently ingested one. None if nothing matches.
+        """
+        revisions = self.load_revisions(project_id)
+        if not revisions:
+            return revision_key(project_id) if not ref or ref == DEFAULT_REF else None
+        if not ref:
+            if DEFAULT_REF in revisions:
+                return revisions[DEFAULT_REF]["key"]
+            return max(revisions.values(), key=lambda r: r["ingested_at"])["key"]
+        if ref in revisions:
+            return revisions[ref]["key"]
+        if len(ref) >= 7:
+            prefix = ref.lower()
+            keys = {r["key"] for r in revisions.values() if (r.get("commit") or "").startswith(prefix)}
+            if len(keys) == 1:
+                return keys.pop()
+        return None
+
+    def referenced_chunk_ids(self, project_id: str, exclude_key: Optional[str] = None) -> Set[str]:
+        """
+        Chunk IDs referenced by the manifests of the project's revisions, except
+        `exclude_key`. Chunks are shared between revisions and only deleted once
+        no manifest references them.
+        """
+        ids: Set[str] = set()
+        for key in {r["key"] for r in self.load_revisions(project_id).values()}:
+            if key == exclude_key:
+                continue
+            for entry in self.load(key).values():
+                ids.update(entry.get("chunk_ids", []))
+        return ids
+
+
+def git_blob_sha(file_path: str) -> str:
+    """Computes the same SHA-1 git uses for a blob object, so unchanged files match the git index."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    header = f"blob {len(data)}\0".encode('utf-8')
+    return hashlib.sha1(header + data).hexdigest()
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import git
+
+# Total size the mirrors may take on disk before the least recently used are evicted
+DEFAULT_MIRROR_BUDGET_MB = int(os.getenv("AUTOWIKI_MIRROR_BUDGET_MB", "4096"))
+
+def git_env() -> Dict[str, str]:
+    # Ignore strict host key checking for SSH, so github.com (or others) work
+    # without pre-populating known_hosts in Docker
+    env = os.environ.copy()
+    env["GIT_SSH_COMMAND"] = "ssh -o UserKnownHostsFile=/dev/null -o StrictHostKeyChecking=no"
+    return env
+
+
+class MirrorCache:
+    """
+    Persistent bare mirrors of remote repositories, one per URL. The first ingest
+    of a repository clones it with --mirror; later ones only fetch new objects.
+    Checkouts for ingestion are `clone --shared` work trees that borrow the
+    mirror's objects, so nothing is downloaded or copied twice (ingestion reads
+    only the work tree and index, so a checkout stays usable even if its mirror
+    is evicted meanwhile). The least recently used mirrors are evicted once the
+    total exceeds the disk budget.
+    """
+    def __init__(self, base_path: str = "backend/data/mirrors", max_bytes: Optional[int] = None):
+        self.base_path = base_path
+        self.max_bytes = DEFAULT_MIRROR_BUDGET_MB * 1024 * 1024 if max_bytes is None else max_bytes
+        # Per-mirror locks: concurrent ingests of one URL fetch one at a time,
+        # and a mirror in use is never evicted
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.base_path):
+            os.makedirs(self.base_path, exist_ok=True)
+
+    def mirror_path(self, url: str) -> str:
+        return os.path.join(self.base_path, hashlib.md5(url.encode('utf-8')).hexdigest() + ".git")
+
+    def _mirror_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def checkout(self, url: str, target_dir: str, ref: Optional[str] = None) -> str:
+        """
+        Updates the mirror of `url` and checks out `ref` (default: the remote HEAD)
+        into target_dir, detached. Returns the commit SHA checked out.
+        """
+        path = self.mirror_path(url)
+        with self._mirror_lock(path):
+            mirror = self._fetch(url, path)
+            commit = mirror.commit(ref or "HEAD").hexsha
+
+            if os.path.exists(target_dir):
+                shutil.rmtree(target_dir)
+            # --shared borrows the mirror's objects through .git/objects/info/alternates
+            repo = git.Repo.clone_from(path, target_dir, shared=True, no_checkout=True, env=git_env())
+            repo.git.checkout("--detach", commit)
+            self._touch(path)
+        self.evict(keep=path)
+        return commit
+
+    def _fetch(self, url: str, path: str) -> git.Repo:
+        if os.path.isdir(path):
+            try:
+                mirror = git.Repo(path)
+                print(f"Fetching {url} into mirror {path}...")
+                mirror.git.fetch("--prune", "--force", "origin", env=git_env())
+                return mirror
+            except (git.GitCommandError, git.InvalidGitRepositoryError, git.NoSuchPathError) as e:
+                # A broken mirror is rebuilt from scratch
+                print(f"Mirror of {url} is unusable, cloning again: {e}")
+                shutil.rmtree(path, ignore_errors=True)
+        print(f"Cloning {url} to mirror {path}...")
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        git.Repo.clone_from(url, tmp_path, mirror=True, env=git_env())
+        # Only complete mirrors ever appear under their final name
+        os.replace(tmp_path, path)
+        print("Clone complete.")
+        return git.Repo(path)
+
+    def _touch(self, path: str):
+        now = time.time()
+        os.utime(path, (now, now))
+
+    def entries(self) -> List[Tuple[str, float, int]]:
+        """(path, last used, size in bytes) of every complete mirror."""
+        result = []
+        for name in os.listdir(self.base_path):
+            path = os.path.join(self.base_path, name)
+            if not name.endswith(".git") or not os.path.isdir(path):
+                continue
+            result.append((path, os.stat(path).st_mtime, _dir_size(path)))
+        return result
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """Removes least recently used mirrors until the cache fits its budget; returns their paths."""
+        evicted = []
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda e: e[1])
+            total = sum(size for _, _, size in entries)
+            for path, _, size in entries:
+                if total <= self.max_bytes:
+                    break
+                lock = self._locks.setdefault(path, threading.Lock())
+                # Mirrors being fetched or checked out are skipped
+                if path == keep or not lock.acquire(blocking=False):
+                    continue
+                try:
+                    shutil.rmtree(path, ignore_errors=True)
+                finally:
+                    lock.release()
+                total -= size
+                evicted.append(path)
+        for path in evicted:
+            print(f"Evicted mirror {path}")
+        return evicted
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                continue
+    return total
@@ -1,16 +1,34 @@
 import os
-from typing import Dict, List, Optional, Any
-from tree_sitter import Language, Parser, Node
+from typing import Dict, List, Optional, Any, Tuple, Iterator
+from tree_sitter import Language, Parser, Node, Query, QueryCursor
 import tree_sitter_python
 import tree_sitter_typescript
 import tree_sitter_javascript
 from ..schemas import FileStructure, ClassInfo, FunctionInfo, ImportInfo
 
+# Extraction engine: 'query' (precompiled tree-sitter queries, matched natively)
+# or 'cursor' (Python TreeCursor walk over every node; kept for comparison)
+PARSER_ENGINES = ('query', 'cursor')
+DEFAULT_PARSER_ENGINE = os.getenv("AUTOWIKI_PARSER_ENGINE", "query")
+
+# Source extensions (lower case) and the grammar that parses them
+LANGUAGE_EXTENSIONS = {
+    '.py': 'python',
+    '.ts': 'typescript', '.mts': 'typescript', '.cts': 'typescript',
+    '.tsx': 'tsx',
+    '.js': 'javascript', '.jsx': 'javascript', '.mjs': 'javascript', '.cjs': 'javascript',
+}
+
 class CodeParser:
-    def __init__(self):
+    def __init__(self, engine: Optional[str] = None):
         self.parsers: Dict[str, Parser] = {}
         self.languages: Dict[str, Language] = {}
+        self.queries: Dict[str, Query] = {}
+        self.engine = (engine or DEFAULT_PARSER_ENGINE).lower()
+        if self.engine not in PARSER_ENGINES:
+            raise ValueError(f"Unknown parser engine: {self.engine}")
         self._initialize_parsers()
+        self._compile_queries()
 
     def _initialize_parsers(self):
         """Initialize Tree-sitter parsers for supported languages."""
@@ -38,19 +56,19 @@ class CodeParser:
         except Exception as e:
             print(f"Error initializing parsers: {e}")
 
+    def _compile_queries(self):
+        """Compiles the extraction query of each language once; a language without one uses the cursor walk."""
+        for name, language in self.languages.items():
+            try:
+                source = PYTHON_QUERY if name == 'python' else _ts_query_source(language)
+                self.queries[name] = Query(language, source)
+            except Exception as e:
+                print(f"Error compiling extraction query for {name}: {e}")
+
     def get_language_from_ext(self, file_path: str) -> Optional[str]:
         """Map file extension to language string."""
         _, ext = os.path.splitext(file_path)
-        ext = ext.lower()
-        if ext in ['.py']:
-            return 'python'
-        elif ext in ['.ts', '.mts', '.cts']:
-            return 'typescript'
-        elif ext in ['.tsx']:
-            return 'tsx'
-        elif ext in ['.js', '.jsx', '.mjs', '.cjs']:
-            return 'javascript'
-        return None
+        return LANGUAGE_EXTENSIONS.get(ext.lower())
 
     def parse_code(self, code: str, language_name: str) -> Optional[Node]:
         """Parse source code into an AST root node."""
@@ -59,153 +77,166 @@ class CodeParser:
             return None
         
         # Tree-sitter expects bytes
-        tree = parser.parse(bytes(code, "utf8"))
+        tree = parser.parse(code.encode("utf8"))
         return tree.root_node
 
-    def extract_structure(self, code: str, language_name: str, file_path: str) -> FileStructure:
+    def extract(self, code: str, language_name: str, file_path: str) -> Tuple[FileStructure, List[Dict[str, Any]]]:
         """
-        Extracts structural information (imports, classes, functions) from code.
+        Single-pass extraction: one parse and one query run (or cursor walk) produce
+        both the FileStructure (for the graph) and the definition list (for chunking).
         """
         root_node = self.parse_code(code, language_name)
         if not root_node:
-            return FileStructure(file_path=file_path)
-            
-        if language_name == 'python':
-            return self._extract_python_structure(root_node, code, file_path)
-        elif language_name in ['typescript', 'tsx', 'javascript']:
-             return self._extract_ts_structure(root_node, code, file_path)
-        
-        return FileStructure(file_path=file_path)
+            return FileStructure(file_path=file_path), []
 
-    def _extract_ts_structure(self, root_node: Node, code: str, file_path: str) -> FileStructure:
-        code_bytes = bytes(code, "utf8")
-        
-        imports = self._extract_ts_imports(root_node, code_bytes)
-        classes = self._extract_ts_classes(root_node, code_bytes)
-        functions = self._extract_ts_functions(root_node, code_bytes)
-        
-        return FileStructure(
+        walk = self._get_walker(language_name)
+        if walk is None:
+            return FileStructure(file_path=file_path), []
+        imports, classes, functions, definitions = walk(root_node)
+
+        structure = FileStructure(
             file_path=file_path,
             imports=imports,
             classes=classes,
             functions=functions
         )
+        return structure, definitions
 
-    def _extract_ts_imports(self, root_node: Node, code_bytes: bytes) -> List[ImportInfo]:
-        imports = []
-        cursor = root_node.walk()
-        
-        def visit(cursor):
-            node = cursor.node
-            if node.type == 'import_statement':
-                # import { x } from 'y';
-                # import x from 'y';
-                source_node = node.child_by_field_name('source')
-                module_name = source_node.text.decode('utf8').strip("'\"") if source_node else ""
-                
-                import_clause = node.child_by_field_name('clause')
-                if import_clause:
-                     # Default import?
-                     # Flatten structure for now
-                     pass
-
-                # Simple regex-like extraction from text might be safer given tree complexity, 
-                # but let's try basic named_imports traversal if possible.
-                # For now, just register the module dependency.
-                imports.append(ImportInfo(module=module_name, type="third_party")) 
+    def extract_structure(self, code: str, language_name: str, file_path: str) -> FileStructure:
+        """
+        Extracts structural information (imports, classes, functions) from code.
+        """
+        structure, _ = self.extract(code, language_name, file_path)
+        return structure
 
-            if cursor.goto_first_child():
-                while True:
-                    visit(cursor)
-                    if not cursor.goto_next_sibling():
-                        break
-                cursor.goto_parent()
-                
-        visit(cursor)
-        return imports
-
-    def _extract_ts_classes(self, root_node: Node, code_bytes: bytes) -> List[ClassInfo]:
-        classes = []
-        cursor = root_node.walk()
-        
-        def visit(cursor):
-            node = cursor.node
-            if node.type == 'class_declaration':
-                name_node = node.child_by_field_name('name')
-                name = name_node.text.decode('utf8') if name_node else "AnonymousClass"
-                
-                classes.append(ClassInfo(
-                    name=name,
-                    bases=[], # TS 'extends' logic omitted for brevity
-                    code=node.text.decode('utf8'),
-                    start_line=node.start_point[0],
-                    end_line=node.end_point[0]
-                ))
-            
-            if cursor.goto_first_child():
-                while True:
-                    visit(cursor)
-                    if not cursor.goto_next_sibling():
-                        break
-                cursor.goto_parent()
-                
-        visit(cursor)
-        return classes
-
-    def _extract_ts_functions(self, root_node: Node, code_bytes: bytes) -> List[FunctionInfo]:
-        functions = []
+    # Legacy method for callers that already hold a parsed tree
+    def extract_definitions(self, root_node: Node, language_name: str, code: str) -> List[Dict[str, Any]]:
+        """
+        Legacy wrapper: returns the chunkable definitions under root_node.
+        """
+        walk = self._get_walker(language_name)
+        return walk(root_node)[3] if walk else []
+
+    def _get_walker(self, language_name: str):
+        """The extraction function for a language under the configured engine."""
+        use_query = self.engine == 'query' and language_name in self.queries
+        if language_name == 'python':
+            return self._query_python if use_query else self._walk_python
+        if language_name in TS_LANGUAGES:
+            return (lambda root: self._query_ts(root, language_name)) if use_query else self._walk_ts
+        return None
+
+    def _iter_nodes(self, root_node: Node) -> Iterator[Node]:
+        """
+        Pre-order traversal with a single TreeCursor. Iterative, so deeply nested
+        files cannot hit the recursion limit.
+        """
         cursor = root_node.walk()
-        
-        def visit(cursor):
-            node = cursor.node
-            if node.type in ('function_declaration', 'method_definition'):
-                name_node = node.child_by_field_name('name')
-                name = name_node.text.decode('utf8') if name_node else "AnonymousFunction"
-                
-                functions.append(FunctionInfo(
-                    name=name,
-                    args=[], # Args parsing omitted
-                    code=node.text.decode('utf8'),
-                    start_line=node.start_point[0],
-                    end_line=node.end_point[0]
-                ))
-            
+        while True:
+            yield cursor.node
             if cursor.goto_first_child():
-                while True:
-                    visit(cursor)
-                    if not cursor.goto_next_sibling():
-                        break
-                cursor.goto_parent()
-                
-        visit(cursor)
-        return functions
-
-    def _extract_python_structure(self, root_node: Node, code: str, file_path: str) -> FileStructure:
-        code_bytes = bytes(code, "utf8")
-        
-        imports = self._extract_python_imports(root_node, code_bytes)
-        classes = self._extract_python_classes(root_node, code_bytes)
-        functions = self._extract_python_functions(root_node, code_bytes)
-        
-        return FileStructure(
-            file_path=file_path,
-            imports=imports,
-            classes=classes,
-            functions=functions
-        )
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return
 
-    def _extract_python_imports(self, root_node: Node, code_bytes: bytes) -> List[ImportInfo]:
-        imports = []
-        
-        # Manual traversal
-        cursor = root_node.walk()
-        self._visit_imports(cursor, imports, code_bytes)
-        
-        return imports
+    # --- Python ---
+
+    def _walk_python(self, root_node: Node):
+        imports: List[ImportInfo] = []
+        classes: List[ClassInfo] = []
+        functions: List[FunctionInfo] = []
+        class_defs: List[Dict[str, Any]] = []
+        func_defs: List[Dict[str, Any]] = []
+
+        for node in self._iter_nodes(root_node):
+            node_type = node.type
+            if node_type == 'import_statement' or node_type == 'import_from_statement':
+                self._python_imports(node, imports)
+            elif node_type == 'class_definition':
+                self._python_class(node, classes, class_defs)
+            elif node_type == 'function_definition':
+                self._python_function(node, functions, func_defs)
+
+        # Chunk order: all classes, then all functions
+        return imports, classes, functions, class_defs + func_defs
+
+    def _query_python(self, root_node: Node):
+        imports: List[ImportInfo] = []
+        classes: List[ClassInfo] = []
+        functions: List[FunctionInfo] = []
+        class_defs: List[Dict[str, Any]] = []
+        func_defs: List[Dict[str, Any]] = []
+
+        captures = self._run_query('python', root_node)
+        for node in captures.get('import', ()):
+            self._python_imports(node, imports)
+        for node in captures.get('class', ()):
+            self._python_class(node, classes, class_defs)
+        for node in captures.get('function', ()):
+            self._python_function(node, functions, func_defs)
+
+        return imports, classes, functions, class_defs + func_defs
+
+    def _run_query(self, language_name: str, root_node: Node) -> Dict[str, List[Node]]:
+        """
+        Runs the language's extraction query in one native pass. Captures come back
+        grouped by pattern; each list is re-sorted into pre-order (document order,
+        outer node first), the order the cursor walk visits them in.
+        """
+        captures = QueryCursor(self.queries[language_name]).captures(root_node)
+        for nodes in captures.values():
+            nodes.sort(key=_preorder_key)
+        return captures
+
+    def _python_class(self, node: Node, classes: List[ClassInfo], definitions: List[Dict[str, Any]]):
+        name_node = node.child_by_field_name('name')
+        name = name_node.text.decode('utf8') if name_node else "Unknown"
+
+        bases = []
+        superclasses_node = node.child_by_field_name('superclasses')
+        if superclasses_node:
+            for child in superclasses_node.children:
+                if child.type in ('identifier', 'attribute', 'call'):
+                    # call for complex bases like func()
+                    bases.append(child.text.decode('utf8'))
+
+        code = node.text.decode('utf8')
+        start_line, end_line = node.start_point[0], node.end_point[0]
+        classes.append(ClassInfo(
+            name=name,
+            bases=bases,
+            code=code,
+            start_line=start_line,
+            end_line=end_line
+        ))
+        definitions.append(self._definition('class_definition', name, start_line, end_line, code, node))
+
+    def _python_function(self, node: Node, functions: List[FunctionInfo], definitions: List[Dict[str, Any]]):
+        name_node = node.child_by_field_name('name')
+        name = name_node.text.decode('utf8') if name_node else "Unknown"
+
+        # Methods are function_definitions too; graph service handles hierarchy
+        args = []
+        params_node = node.child_by_field_name('parameters')
+        if params_node:
+            for child in params_node.children:
+                if child.type in ('identifier', 'typed_parameter', 'default_parameter'):
+                    args.append(child.text.decode('utf8'))
+
+        code = node.text.decode('utf8')
+        start_line, end_line = node.start_point[0], node.end_point[0]
+        functions.append(FunctionInfo(
+            name=name,
+            args=args,
+            code=code,
+            start_line=start_line,
+            end_line=end_line
+        ))
+        definitions.append(self._definition('function_definition', name, start_line, end_line, code, node))
 
-    def _visit_imports(self, cursor, imports: List[ImportInfo], code_bytes: bytes):
-        """Helper to traverse and find import nodes."""
-        node = cursor.node
+    def _python_imports(self, node: Node, imports: List[ImportInfo]):
+        """Appends the ImportInfo entries of one import statement."""
         if node.type == 'import_statement':
             # import os, sys
             for child in node.children:
@@ -220,74 +251,47 @@ class CodeParser:
                         name = name_node.text.decode('utf8')
                         alias = alias_node.text.decode('utf8') if alias_node else None
                         imports.append(ImportInfo(module=name, alias=alias, type=self._classify_import(name)))
+            return
 
-        elif node.type == 'import_from_statement':
-            # from . import x
-            # from backend.app import main
-            module_name = None
-            module_node = node.child_by_field_name('module_name')
-            if module_node:
-                module_name = module_node.text.decode('utf8')
-            else:
-                # Check for relative import dots
-                # relative_import node usually contains the dots
-                rel_node = node.child_by_field_name('relative') # Field might be 'relative' or check type
-                if not rel_node:
-                    # Fallback scan
-                    for child in node.children:
-                        if child.type == 'relative_import':
-                            rel_node = child
-                            break
-                
-                if rel_node:
-                    module_name = rel_node.text.decode('utf8')
-            
-            # Now find imported names
-            # They appear after 'import' keyword
-            seen_import = False
+        # from . import x
+        # from backend.app import main
+        module_name = None
+        module_node = node.child_by_field_name('module_name')
+        if module_node:
+            module_name = module_node.text.decode('utf8')
+        else:
+            # relative_import node usually contains the dots
             for child in node.children:
-                if child.type == 'import':
-                    seen_import = True
-                    continue
-                
-                if seen_import:
-                    if child.type == 'dotted_name':
-                        name = child.text.decode('utf8')
-                        imports.append(ImportInfo(
-                             module=module_name or ".",
-                             name=name,
-                             type=self._classify_import(module_name)
-                         ))
-                    elif child.type == 'aliased_import':
-                         name_node = child.child_by_field_name('name')
-                         alias_node = child.child_by_field_name('alias')
-                         if name_node:
-                             name = name_node.text.decode('utf8')
-                             alias = alias_node.text.decode('utf8') if alias_node else None
-                             imports.append(ImportInfo(
-                                 module=module_name or ".", 
-                                 name=name, 
-                                 alias=alias,
-                                 type=self._classify_import(module_name)
-                             ))
-                    # Sometimes simple names are just identifiers? 
-                    # tree-sitter-python usually uses dotted_name even for simple ones in imports?
-                    # Let's handle identifier just in case
-                    elif child.type == 'identifier':
-                        name = child.text.decode('utf8')
-                        imports.append(ImportInfo(
-                             module=module_name or ".",
-                             name=name,
-                             type=self._classify_import(module_name)
-                         ))
-
-        # Recurse
-        if cursor.goto_first_child():
-            while True:
-                self._visit_imports(cursor, imports, code_bytes)
-                if not cursor.goto_next_sibling():
+                if child.type == 'relative_import':
+                    module_name = child.text.decode('utf8')
                     break
-            cursor.goto_parent()
+
+        import_type = self._classify_import(module_name)
+        # Imported names appear after the 'import' keyword
+        seen_import = False
+        for child in node.children:
+            if child.type == 'import':
+                seen_import = True
+                continue
+
+            if not seen_import:
+                continue
+            if child.type in ('dotted_name', 'identifier'):
+                imports.append(ImportInfo(
+                    module=module_name or ".",
+                    name=child.text.decode('utf8'),
+                    type=import_type
+                ))
+            elif child.type == 'aliased_import':
+                name_node = child.child_by_field_name('name')
+                alias_node = child.child_by_field_name('alias')
+                if name_node:
+                    imports.append(ImportInfo(
+                        module=module_name or ".",
+                        name=name_node.text.decode('utf8'),
+                        alias=alias_node.text.decode('utf8') if alias_node else None,
+                        type=import_type
+                    ))
 
     def _classify_import(self, module_name: Optional[str]) -> str:
         if not module_name:
@@ -301,154 +305,143 @@ class CodeParser:
             return "local_absolute"
         return "stdlib" # Default fallback, graph service filters this anyway or we can improve later
 
-    def _extract_python_classes(self, root_node: Node, code_bytes: bytes) -> List[ClassInfo]:
-        classes = []
-        
-        # Manual traversal
-        cursor = root_node.walk()
-        self._visit_classes(cursor, classes, code_bytes)
-        return classes
-
-    def _visit_classes(self, cursor, classes: List[ClassInfo], code_bytes: bytes):
-        if cursor.node.type == 'class_definition':
-            node = cursor.node
-            name_node = node.child_by_field_name('name')
-            name = name_node.text.decode('utf8') if name_node else "Unknown"
-            
-            bases = []
-            superclasses_node = node.child_by_field_name('superclasses')
-            if superclasses_node:
-                for child in superclasses_node.children:
-                    if child.type in ('identifier', 'attribute', 'call'): 
-                        # call for complex bases like func()
-                        bases.append(child.text.decode('utf8'))
-            
+    # --- TypeScript / JavaScript ---
+
+    def _walk_ts(self, root_node: Node):
+        imports: List[ImportInfo] = []
+        classes: List[ClassInfo] = []
+        functions: List[FunctionInfo] = []
+        definitions: List[Dict[str, Any]] = []
+
+        for node in self._iter_nodes(root_node):
+            node_type = node.type
+            if node_type in ('import_statement', 'export_statement'):
+                # import { x } from 'y';  import x from 'y';  export { x } from 'y';
+                # For now, just register the module dependency.
+                source_node = node.child_by_field_name('source')
+                if source_node is not None:
+                    self._ts_import(source_node, imports)
+                if node_type == 'import_statement':
+                    continue
+            elif node_type == 'call_expression':
+                # require('y') and dynamic import('y') with a literal specifier
+                function_node = node.child_by_field_name('function')
+                args_node = node.child_by_field_name('arguments')
+                if (function_node is not None and args_node is not None and args_node.named_child_count == 1
+                        and (function_node.type == 'import' or function_node.text == b'require')
+                        and args_node.named_children[0].type == 'string'):
+                    self._ts_import(args_node.named_children[0], imports)
+                continue
+
+            if node_type in TS_DEFINITION_TYPES:
+                self._ts_definition(node, classes, functions, definitions)
+
+        return imports, classes, functions, definitions
+
+    def _query_ts(self, root_node: Node, language_name: str):
+        imports: List[ImportInfo] = []
+        classes: List[ClassInfo] = []
+        functions: List[FunctionInfo] = []
+        definitions: List[Dict[str, Any]] = []
+
+        captures = self._run_query(language_name, root_node)
+        for node in captures.get('source', ()):
+            self._ts_import(node, imports)
+        for node in captures.get('definition', ()):
+            self._ts_definition(node, classes, functions, definitions)
+
+        return imports, classes, functions, definitions
+
+    def _ts_definition(self, node: Node, classes: List[ClassInfo], functions: List[FunctionInfo],
+                       definitions: List[Dict[str, Any]]):
+        node_type = node.type
+        name_node = node.child_by_field_name('name')
+        name = name_node.text.decode('utf8') if name_node else None
+        code = node.text.decode('utf8')
+        start_line, end_line = node.start_point[0], node.end_point[0]
+
+        if node_type == 'class_declaration':
             classes.append(ClassInfo(
-                name=name,
-                bases=bases,
-                code=node.text.decode('utf8'),
-                start_line=node.start_point[0],
-                end_line=node.end_point[0]
+                name=name or "AnonymousClass",
+                bases=[], # TS 'extends' logic omitted for brevity
+                code=code,
+                start_line=start_line,
+                end_line=end_line
             ))
-            
-        if cursor.goto_first_child():
-            while True:
-                self._visit_classes(cursor, classes, code_bytes)
-                if not cursor.goto_next_sibling():
-                    break
-            cursor.goto_parent()
-
-    def _extract_python_functions(self, root_node: Node, code_bytes: bytes) -> List[FunctionInfo]:
-        functions = []
-        # Manual traversal
-        cursor = root_node.walk()
-        self._visit_functions(cursor, functions, code_bytes)
-        return functions
-
-    def _visit_functions(self, cursor, functions: List[FunctionInfo], code_bytes: bytes):
-        if cursor.node.type == 'function_definition':
-            node = cursor.node
-            name_node = node.child_by_field_name('name')
-            name = name_node.text.decode('utf8') if name_node else "Unknown"
-            
-            # Check if it's a method? (inside class)
-            # Tree-sitter node doesn't explicitly say "method", but parent is class_definition body
-            # We treat all as functions for now, graph service handles hierarchy
-            
-            args = []
-            params_node = node.child_by_field_name('parameters')
-            if params_node:
-                for child in params_node.children:
-                    if child.type in ('identifier', 'typed_parameter', 'default_parameter'):
-                        args.append(child.text.decode('utf8'))
-            
+        elif node_type in ('function_declaration', 'method_definition'):
             functions.append(FunctionInfo(
-                name=name,
-                args=args,
-                code=node.text.decode('utf8'),
-                start_line=node.start_point[0],
-                end_line=node.end_point[0]
+                name=name or "AnonymousFunction",
+                args=[], # Args parsing omitted
+                code=code,
+                start_line=start_line,
+                end_line=end_line
             ))
-            
-        if cursor.goto_first_child():
-            while True:
-                self._visit_functions(cursor, functions, code_bytes)
-                if not cursor.goto_next_sibling():
-                    break
-            cursor.goto_parent()
 
-    # Legacy method for Chunker compatibility (optional, or we update chunker)
-    def extract_definitions(self, root_node: Node, language_name: str, code: str) -> List[Dict[str, Any]]:
-        """
-        Legacy wrapper: uses new structure extraction to return old format.
-        """
-        # We need file_path, but this method signature doesn't have it.
-        # This is a problem if we rely on this method.
-        # But 'extract_definitions' is called by Chunker.
-        # I'll implement a basic traversal here similar to what it was, 
-        # OR update Chunker to use extract_structure.
-        
-        # Let's reuse the logic but return dicts
-        definitions = []
-        code_bytes = bytes(code, "utf8")
-        
-        if language_name == 'python':
-            # Use shared extraction logic to avoid code duplication
-            classes = self._extract_python_classes(root_node, code_bytes)
-            functions = self._extract_python_functions(root_node, code_bytes)
-            
-            for c in classes:
-                definitions.append({
-                    'type': 'class_definition',
-                    'name': c.name,
-                    'start_line': c.start_line,
-                    'end_line': c.end_line,
-                    'code': c.code
-                })
-            for f in functions:
-                definitions.append({
-                    'type': 'function_definition',
-                    'name': f.name,
-                    'start_line': f.start_line,
-                    'end_line': f.end_line,
-                    'code': f.code
-                })
-
-        elif language_name in ['typescript', 'tsx', 'javascript']:
-            relevant_types = {
-                'function_declaration', 
-                'class_declaration', 
-                'method_definition',
-                'interface_declaration',
-                'lexical_declaration'
-            }
-            cursor = root_node.walk()
-            
-            def visit_ts(cursor):
-                if cursor.node.type in relevant_types:
-                    name_node = cursor.node.child_by_field_name('name')
-                    name = None
-                    if name_node:
-                        name = name_node.text.decode('utf8')
-                    elif cursor.node.type == 'lexical_declaration':
-                         # const x = ...
-                         # This is complex, skipping for brevity or need to traverse child
-                         pass
-                    
-                    if name:
-                        definitions.append({
-                            'type': cursor.node.type,
-                            'name': name,
-                            'start_line': cursor.node.start_point[0],
-                            'end_line': cursor.node.end_point[0],
-                            'code': cursor.node.text.decode('utf8')
-                        })
-                if cursor.goto_first_child():
-                    while True:
-                        visit_ts(cursor)
-                        if not cursor.goto_next_sibling():
-                            break
-                    cursor.goto_parent()
-            visit_ts(cursor)
-            
-        return definitions
+        # Unnamed declarations (e.g. `const x = ...`) are not chunked
+        if name:
+            definitions.append(self._definition(node_type, name, start_line, end_line, code, node))
+
+    def _ts_import(self, source_node: Node, imports: List[ImportInfo]):
+        """Appends the ImportInfo of a string specifier; bare ones may still be tsconfig path aliases."""
+        module_name = source_node.text.decode('utf8').strip("'\"`")
+        import_type = "local_relative" if module_name.startswith(".") else "third_party"
+        imports.append(ImportInfo(module=module_name, type=import_type))
+
+    def _definition(self, def_type: str, name: str, start_line: int, end_line: int, code: str,
+                    node: Optional[Node] = None) -> Dict[str, Any]:
+        definition = {
+            'type': def_type,
+            'name': name,
+            'start_line': start_line,
+            'end_line': end_line,
+            'code': code
+        }
+        # AST boundaries for the chunker: where the body starts, and where each of its statements/members starts
+        body = node.child_by_field_name('body') if node is not None else None
+        if body is not None:
+            definition['body_line'] = body.start_point[0]
+            definition['boundaries'] = [child.start_point[0] for child in body.named_children]
+        return definition
+
+
+TS_LANGUAGES = ('typescript', 'tsx', 'javascript')
+
+# Node types emitted as chunks for TS/JS
+TS_DEFINITION_TYPES = {
+    'function_declaration',
+    'class_declaration',
+    'method_definition',
+    'interface_declaration',
+    'lexical_declaration'
+}
+
+def _preorder_key(node: Node) -> Tuple[int, int]:
+    return node.start_byte, -node.end_byte
+
+PYTHON_QUERY = """
+(import_statement) @import
+(import_from_statement) @import
+(class_definition) @class
+(function_definition) @function
+"""
+
+def _ts_query_source(language: Language) -> str:
+    """
+    Extraction query for a TS/JS grammar. Definition types the grammar lacks
+    (e.g. interface_declaration in JavaScript) are left out.
+    """
+    definition_types = " ".join(
+        f"({t})" for t in sorted(TS_DEFINITION_TYPES) if language.id_for_node_kind(t, True)
+    )
+    return f"""
+(import_statement source: (string) @source)
+(export_statement source: (string) @source)
+(call_expression
+  function: (identifier) @_function
+  arguments: (arguments . (string) @source .)
+  (#eq? @_function "require"))
+(call_expression
+  function: (import)
+  arguments: (arguments . (string) @source .))
+[{definition_types}] @definition
+"""
@@ -0,0 +1,360 @@
+import codecs
+import os
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import git
+
+# Files larger than this are skipped (0 disables the limit)
+DEFAULT_MAX_FILE_SIZE = int(os.getenv("AUTOWIKI_MAX_FILE_SIZE", str(2 * 1024 * 1024)))
+# List files from the git index (respecting .gitignore natively) when scanning a checkout
+DEFAULT_SCAN_USE_GIT = os.getenv("AUTOWIKI_SCAN_USE_GIT", "1") != "0"
+
+# Pattern files read in every directory, lowest precedence first
+GITIGNORE_FILE = ".gitignore"
+AUTOWIKI_IGNORE_FILE = ".autowikiignore"
+
+# Names skipped at any depth; hidden files and directories are skipped as well
+IGNORED_NAMES = frozenset({
+    '.git', '__pycache__', 'node_modules', '.next', 'venv', '.venv',
+    '.DS_Store', 'dist', 'build', '.pytest_cache', 'data', 'temp_repos',
+    # Lockfiles: large, generated, and nothing to document
+    'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock', 'Pipfile.lock',
+    'Cargo.lock', 'composer.lock', 'Gemfile.lock', 'go.sum',
+})
+
+# Known binary formats are skipped by extension, without opening the file
+BINARY_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.tiff', '.psd',
+    '.pdf', '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.tar', '.jar', '.war',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot', '.mp3', '.mp4', '.mov', '.avi', '.wav', '.ogg',
+    '.so', '.dylib', '.dll', '.exe', '.bin', '.o', '.a', '.class', '.pyc', '.pyo', '.whl',
+    '.db', '.sqlite', '.sqlite3', '.npy', '.npz', '.pkl', '.parquet', '.onnx',
+})
+# Bundled/minified sources are detected by name or by line length
+MINIFIED_SUFFIXES = ('.min.js', '.min.mjs', '.min.css', '.bundle.js', '.js.map', '.css.map')
+MINIFIABLE_EXTENSIONS = frozenset({'.js', '.mjs', '.cjs', '.jsx', '.ts', '.tsx', '.css'})
+
+SNIFF_BYTES = 8192
+# Sniffed text whose lines average more than this many characters is treated as minified
+MINIFIED_LINE_LENGTH = 300
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translates a gitignore glob (without negation or trailing slash) into a regex body."""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                at_start = i == 0 or pattern[i - 1] == '/'
+                at_end = i + 2 == n or pattern[i + 2] == '/'
+                if at_start and at_end:
+                    # `**/` matches zero or more directories, a trailing `/**` everything inside
+                    if i + 2 == n:
+                        out.append('.*')
+                    else:
+                        out.append('(?:.*/)?')
+                        i += 1
+                    i += 2
+                    continue
+                i += 1
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern.startswith('[!', i) or pattern.startswith('[^', i) else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def parse_ignore_patterns(lines: List[str]) -> List[Tuple["re.Pattern", bool, bool]]:
+    """
+    Compiles gitignore-syntax lines into (regex, negated, dir_only) rules. Each
+    regex matches a path relative to the directory holding the pattern file.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip('\r')
+        # Trailing spaces are ignored unless escaped
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        # A slash anywhere but the end anchors the pattern to its directory
+        anchored = '/' in line
+        body = _glob_to_regex(line.lstrip('/'))
+        if not anchored:
+            body = '(?:.*/)?' + body
+        rules.append((re.compile(body + r'\Z', re.DOTALL), negated, dir_only))
+    return rules
+
+
+class IgnoreRules:
+    """
+    Hierarchical .gitignore/.autowikiignore evaluation. Pattern files are loaded
+    lazily per directory and cached; deeper files override shallower ones and,
+    within a directory, .autowikiignore overrides .gitignore. As in git, nothing
+    inside an ignored directory can be re-included.
+    """
+    def __init__(self, root: str, pattern_files: Tuple[str, ...] = (GITIGNORE_FILE, AUTOWIKI_IGNORE_FILE)):
+        self.root = root
+        self.pattern_files = pattern_files
+        # dir rel path ("" for root) -> [(base dir, rules)], shallowest first
+        self._layers: Dict[str, List[Tuple[str, list]]] = {}
+        self._dir_ignored: Dict[str, bool] = {"": False}
+
+    def _load(self, rel_dir: str) -> list:
+        rules = []
+        for name in self.pattern_files:
+            path = os.path.join(self.root, rel_dir, name)
+            try:
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    rules.extend(parse_ignore_patterns(f.readlines()))
+            except OSError:
+                continue
+        return rules
+
+    def layers(self, rel_dir: str) -> List[Tuple[str, list]]:
+        layers = self._layers.get(rel_dir)
+        if layers is None:
+            parent = self.layers(rel_dir.rpartition('/')[0]) if rel_dir else []
+            rules = self._load(rel_dir)
+            layers = parent + [(rel_dir, rules)] if rules else parent
+            self._layers[rel_dir] = layers
+        return layers
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        """Whether the pattern files of the ancestors ignore `rel_path` ('/'-separated)."""
+        parent = rel_path.rpartition('/')[0]
+        for base, rules in reversed(self.layers(parent)):
+            local = rel_path[len(base) + 1:] if base else rel_path
+            for regex, negated, dir_only in reversed(rules):
+                if dir_only and not is_dir:
+                    continue
+                if regex.match(local):
+                    return not negated
+        return False
+
+    def is_dir_ignored(self, rel_dir: str) -> bool:
+        ignored = self._dir_ignored.get(rel_dir)
+        if ignored is None:
+            parent, _, name = rel_dir.rpartition('/')
+            ignored = (self.is_dir_ignored(parent) or is_ignored_name(name)
+                       or self.matches(rel_dir, is_dir=True))
+            self._dir_ignored[rel_dir] = ignored
+        return ignored
+
+
+def is_ignored_name(name: str) -> bool:
+    return name in IGNORED_NAMES or name.startswith('.')
+
+
+class ScanStats:
+    """Per-scan counters: files yielded, and files/bytes skipped per reason."""
+    REASONS = ("ignored", "unsupported", "too_large", "binary", "minified", "unreadable")
+
+    def __init__(self):
+        self.source = "walk"
+        self.files_seen = 0
+        self.files_yielded = 0
+        self.bytes_yielded = 0
+        self.dirs_ignored = 0
+        self.skipped = {reason: 0 for reason in self.REASONS}
+        self.skipped_bytes = {reason: 0 for reason in self.REASONS}
+        self.seconds = 0.0
+
+    def skip(self, reason: str, size: int = 0):
+        self.skipped[reason] += 1
+        self.skipped_bytes[reason] += size
+
+    @property
+    def files_skipped(self) -> int:
+        return sum(self.skipped.values())
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "source": self.source,
+            "files_seen": self.files_seen,
+            "files_yielded": self.files_yielded,
+            "bytes_yielded": self.bytes_yielded,
+            "files_skipped": self.files_skipped,
+            "dirs_ignored": self.dirs_ignored,
+            "skipped": dict(self.skipped),
+            "skipped_bytes": dict(self.skipped_bytes),
+            "seconds": round(self.seconds, 4),
+        }
+
+
+class RepositoryScanner:
+    """
+    Enumerates the files of a checkout worth chunking, in a deterministic order
+    (per directory: files by name, then subdirectories by name). Files are taken
+    from `git ls-files` when the root is a git work tree, otherwise from an
+    os.scandir walk that applies .gitignore itself. In both cases .autowikiignore,
+    the built-in ignore list, the size limit and a sniff of the first bytes
+    (NUL bytes / invalid UTF-8 for binaries, line length for minified code) are
+    applied before any file is read in full.
+    With `extensions` set, other files (except those named in `keep_names`) are
+    skipped as "unsupported" by name alone, before they are opened.
+    """
+    def __init__(self, max_file_size: Optional[int] = None, use_git: Optional[bool] = None,
+                 extensions: Optional[Iterable[str]] = None, keep_names: Iterable[str] = ()):
+        self.max_file_size = DEFAULT_MAX_FILE_SIZE if max_file_size is None else max_file_size
+        self.use_git = DEFAULT_SCAN_USE_GIT if use_git is None else use_git
+        self.extensions = frozenset(extensions) if extensions is not None else None
+        self.keep_names = frozenset(keep_names)
+
+    def scan(self, root: str, stats: Optional[ScanStats] = None) -> Iterator[Tuple[str, str]]:
+        """Yields (file_path, rel_path) pairs; skip counts are recorded into `stats`."""
+        stats = stats if stats is not None else ScanStats()
+        started = time.perf_counter()
+        try:
+            candidates = None
+            if self.use_git and os.path.isdir(os.path.join(root, ".git")):
+                candidates = self._git_files(root)
+            if candidates is not None:
+                stats.source = "git"
+                yield from self._filter_listed(root, candidates, stats)
+            else:
+                stats.source = "walk"
+                yield from self._walk(root, stats)
+        finally:
+            stats.seconds += time.perf_counter() - started
+
+    def _git_files(self, root: str) -> Optional[List[str]]:
+        """Tracked and untracked-but-not-ignored files, or None if git cannot list them."""
+        try:
+            output = git.Repo(root).git.ls_files("-z", "--cached", "--others", "--exclude-standard")
+        except Exception as e:
+            print(f"Could not list files with git in {root}, walking the directory instead: {e}")
+            return None
+        paths = dict.fromkeys(p for p in output.split("\0") if p)
+        # Same order as the directory walk: within a directory, files before subdirectories
+        return sorted(paths, key=lambda p: [(1, part) for part in p.split("/")[:-1]] + [(0, p.rpartition("/")[2])])
+
+    def _filter_listed(self, root: str, paths: List[str], stats: ScanStats) -> Iterator[Tuple[str, str]]:
+        # git already applied .gitignore
+        rules = IgnoreRules(root, pattern_files=(AUTOWIKI_IGNORE_FILE,))
+        for rel_path in paths:
+            rel_dir, _, name = rel_path.rpartition("/")
+            if rules.is_dir_ignored(rel_dir) or is_ignored_name(name) or rules.matches(rel_path, is_dir=False):
+                stats.files_seen += 1
+                stats.skip("ignored")
+                continue
+            file_path = os.path.join(root, *rel_path.split("/"))
+            # Tracked files deleted from the work tree and submodules are listed too
+            if not os.path.isfile(file_path):
+                continue
+            stats.files_seen += 1
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                stats.skip("unreadable")
+                continue
+            if self._accept(file_path, name, st.st_size, stats):
+                yield file_path, rel_path.replace("/", os.sep)
+
+    def _walk(self, root: str, stats: ScanStats) -> Iterator[Tuple[str, str]]:
+        rules = IgnoreRules(root)
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                with os.scandir(os.path.join(root, rel_dir) if rel_dir else root) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError as e:
+                print(f"Could not scan {rel_dir or root}: {e}")
+                continue
+            subdirs = []
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    # Symlinked directories are not followed, as with os.walk
+                    if entry.is_dir(follow_symlinks=False):
+                        if rules.is_dir_ignored(rel_path):
+                            stats.dirs_ignored += 1
+                        else:
+                            subdirs.append(rel_path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    stats.files_seen += 1
+                    if is_ignored_name(entry.name) or rules.matches(rel_path, is_dir=False):
+                        stats.skip("ignored")
+                        continue
+                    size = entry.stat().st_size
+                except OSError:
+                    stats.skip("unreadable")
+                    continue
+                if self._accept(entry.path, entry.name, size, stats):
+                    yield entry.path, rel_path.replace("/", os.sep)
+            # Depth-first, subdirectories in name order
+            stack.extend(reversed(subdirs))
+
+    def _accept(self, file_path: str, name: str, size: int, stats: ScanStats) -> bool:
+        """Applies the extension filter, the size limit and the binary/minified checks; records skips."""
+        lower = name.lower()
+        ext = os.path.splitext(lower)[1]
+        if self.extensions is not None and ext not in self.extensions and name not in self.keep_names:
+            stats.skip("unsupported", size)
+            return False
+        if self.max_file_size and size > self.max_file_size:
+            stats.skip("too_large", size)
+            return False
+        if ext in BINARY_EXTENSIONS:
+            stats.skip("binary", size)
+            return False
+        if lower.endswith(MINIFIED_SUFFIXES):
+            stats.skip("minified", size)
+            return False
+        reason = self._sniff(file_path, ext) if size else None
+        if reason:
+            stats.skip(reason, size)
+            return False
+        stats.files_yielded += 1
+        stats.bytes_yielded += size
+        return True
+
+    def _sniff(self, file_path: str, ext: str) -> Optional[str]:
+        """Skip reason from the first SNIFF_BYTES of a file, or None if it looks like source/text."""
+        try:
+            with open(file_path, 'rb') as f:
+                head = f.read(SNIFF_BYTES)
+        except OSError:
+            return "unreadable"
+        if b"\0" in head:
+            return "binary"
+        try:
+            # Incremental, so a multi-byte character cut off at the end is not an error
+            text = codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        except UnicodeDecodeError:
+            return "binary"
+        if ext in MINIFIABLE_EXTENSIONS and len(text) / (text.count("\n") + 1) > MINIFIED_LINE_LENGTH:
+            return "minified"
+        return None
@@ -1,84 +1,371 @@
-import json
-import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from .storage import VectorStorage
 from .graph import GraphService
+from .lexical import LexicalIndexService, reciprocal_rank_fusion, is_symbol_query
+from .cache import SearchCache
+from .chunker import part_chunk_id
+from .manifest import ManifestStore
+
+# Re-ranking weights (see SearchService._rerank). Relevance (normalised RRF) is in [0, 1];
+# graph signals nudge the order between comparably relevant hits.
+IMPORTANCE_WEIGHT = 0.15
+PROXIMITY_WEIGHT = 0.2
+# Small prior per classify_node_layer() layer: entry points and core logic over docs/misc
+LAYER_PRIOR = {0: 0.0, 1: 0.05, 2: 0.05, 3: 0.02, 4: 0.0}
 
 class SearchService:
-    def __init__(self):
-        self.storage = VectorStorage()
-        self.graph_service = GraphService()
+    def __init__(self, storage: Optional[VectorStorage] = None, graph_service: Optional[GraphService] = None,
+                 lexical_index: Optional[LexicalIndexService] = None, cache: Optional[SearchCache] = None,
+                 manifest_store: Optional[ManifestStore] = None):
+        self.storage = storage or VectorStorage()
+        self.graph_service = graph_service or GraphService()
+        self.lexical_index = lexical_index or LexicalIndexService()
+        # Shared with ingestion, which invalidates a project when it is re-ingested or cleared
+        self.cache = cache or SearchCache()
+        self.manifest_store = manifest_store or ManifestStore()
+
+    def resolve(self, project_id: str, ref: Optional[str] = None) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        (revision key, vector-store revision filter) for a ref; None if the project
+        has no such revision. Graph, tree and symbol index are looked up by the key;
+        chunks live in the project's shared collection and are filtered by revision
+        membership (no filter for projects indexed before revisions existed).
+        """
+        key = self.manifest_store.resolve_revision(project_id, ref)
+        if key is None:
+            return None
+        return key, key if self.manifest_store.load_revisions(project_id) else None
 
-    def search(self, project_id: str, query: str, limit: int = 10) -> Dict[str, Any]:
+    def search(self, project_id: str, query: str, limit: int = 10, active_only: bool = False,
+               ref: Optional[str] = None) -> Dict[str, Any]:
         """
         Performs a hybrid search:
-        1. Vector search for semantic relevance.
+        1. Lexical lookup in the project's symbol index (exact/prefix names, BM25)
+           and vector search for semantic relevance, fused by reciprocal rank.
+           A single-identifier query with an exact symbol match skips the embedding call.
         2. Overlays results onto the hierarchical module tree.
         3. Returns the tree with 'active' and 'score' attributes injected.
+        The cached tree is never mutated: only nodes on hit paths are copied
+        (the rest is shared), so per-query cost scales with the number of hits.
+        With active_only=True, only the active subtree is returned.
+        Responses are cached per (revision, query, limit, active_only) until the
+        revision changes; treat the returned dict as read-only.
+        `ref` selects a revision by ref name or commit SHA (default: the default branch);
+        raises ValueError if it names no ingested revision.
         """
-        # 1. Vector Search (fetch more candidates to populate the map)
-        vector_results = self.storage.query_code(project_id, query, n_results=limit * 3)
+        scope = self.resolve(project_id, ref)
+        if scope is None:
+            raise ValueError(f"Revision {ref} not found for project {project_id}")
+        key, revision = scope
+        cache_key = self.cache.key(key, query, limit, active_only)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # 1. Candidates (over-fetched, then re-ranked with graph signals down to `limit`)
+        results, vector_count, lexical_count = self._retrieve(project_id, key, revision, [query], limit * 3)[0]
+        results = self._rerank(key, results)[:limit]
+        self._fill_content(project_id, results)
+        hits = self._group_hits(results)
+
+        # 2-3. Cached module tree with a sparse overlay of hit annotations
+        result_tree = self._render_tree(key, hits, active_only)
+        if result_tree is None:
+            return {"error": "Project tree not found. Please ingest project first."}
         
-        # Create a lookup map: file_path -> {score, chunks}
+        result = {
+            "tree": result_tree,
+            "stats": {
+                "hits_found": len(hits),
+                "vector_results": vector_count,
+                "lexical_results": lexical_count
+            }
+        }
+        self.cache.put(cache_key, result)
+        return result
+
+    def search_batch(self, project_id: str, queries: List[str], limit: int = 10,
+                     include_tree: bool = False, active_only: bool = False,
+                     ref: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Runs many queries against one project with per-call overhead paid once:
+        uncached queries are embedded in one batch and answered by a single
+        multi-query vector lookup, and lexical-hit contents are fetched together.
+        Returns one {"query", "results"[, "tree"]} entry per query, in order.
+        The codemap overlay is only built when include_tree is set.
+        Raises ValueError if `ref` names no ingested revision.
+        """
+        scope = self.resolve(project_id, ref)
+        if scope is None:
+            raise ValueError(f"Revision {ref} not found for project {project_id}")
+        key, revision = scope
+        keys = [self.cache.key(key, "batch", q, limit, include_tree, active_only) for q in queries]
+        responses: List[Optional[Dict[str, Any]]] = [self.cache.get(key) for key in keys]
+        # Each distinct uncached query is retrieved once
+        pending = list(dict.fromkeys(q for q, r in zip(queries, responses) if r is None))
+
+        if pending:
+            retrieved = [
+                (self._rerank(key, results)[:limit], vector_count, lexical_count)
+                for results, vector_count, lexical_count in self._retrieve(project_id, key, revision, pending, limit * 3)
+            ]
+            self._fill_content(project_id, [res for results, _, _ in retrieved for res in results])
+            computed: Dict[str, Dict[str, Any]] = {}
+            for query, (results, vector_count, lexical_count) in zip(pending, retrieved):
+                response = {
+                    "query": query,
+                    "results": results,
+                    "stats": {"vector_results": vector_count, "lexical_results": lexical_count}
+                }
+                if include_tree:
+                    response["tree"] = self._render_tree(key, self._group_hits(results), active_only)
+                computed[query] = response
+
+            for i, (query, cache_key) in enumerate(zip(queries, keys)):
+                if responses[i] is None:
+                    responses[i] = computed[query]
+                    self.cache.put(cache_key, responses[i])
+        return responses
+
+    def _retrieve(self, project_id: str, key: str, revision: Optional[str], queries: List[str],
+                  n: int) -> List[Tuple[List[Dict[str, Any]], int, int]]:
+        """
+        Hybrid candidates per query: the lexical symbol index plus vector search,
+        fused by reciprocal rank. A single-identifier query with an exact symbol
+        match skips the embedding call; all other queries share one vector lookup.
+        Returns (fused results, vector result count, lexical result count) per query.
+        """
+        lexical = [self.lexical_index.search(key, q, limit=n) for q in queries]
+        needs_vector = [
+            i for i, (q, lex) in enumerate(zip(queries, lexical))
+            if not (is_symbol_query(q) and lex and lex[0]["match"] == "exact")
+        ]
+        vector: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if len(needs_vector) == 1:
+            i = needs_vector[0]
+            vector[i] = self.storage.query_code(project_id, queries[i], n_results=n, revision=revision)
+        elif needs_vector:
+            batch = self.storage.query_code_batch(project_id, [queries[i] for i in needs_vector], n_results=n,
+                                                  revision=revision)
+            for i, results in zip(needs_vector, batch):
+                vector[i] = results
+
+        return [
+            (reciprocal_rank_fusion([vec, lex])[:n], len(vec), len(lex))
+            for vec, lex in zip(vector, lexical)
+        ]
+
+    def _rerank(self, project_id: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Re-orders fused candidates using the graph signals precomputed at ingest:
+            rank_score = rrf / max_rrf
+                       + IMPORTANCE_WEIGHT * file importance
+                       + PROXIMITY_WEIGHT * share of other candidate files one import hop away
+                       + LAYER_PRIOR[layer]
+        Files that sit next to other hits in the import graph form the "cluster" the
+        query is about, and rise above isolated matches. Without signals (project
+        ingested before they existed) the fused order is kept.
+        """
+        signals = self.graph_service.get_rank_signals(project_id)
+        if not signals or not results:
+            return results
+
+        top_rrf = max(r.get("rrf_score", 0.0) for r in results) or 1.0
+        files = {r["metadata"].get("file_path") for r in results}
+        files.discard(None)
+        other_files = max(1, len(files) - 1)
+        importance, layers, neighbors = signals["importance"], signals["layer"], signals["neighbors"]
+
+        for r in results:
+            path = r["metadata"].get("file_path")
+            proximity = len(files & neighbors[path]) / other_files if path in neighbors else 0.0
+            r["rank_score"] = (
+                r.get("rrf_score", 0.0) / top_rrf
+                + IMPORTANCE_WEIGHT * importance.get(path, 0.0)
+                + PROXIMITY_WEIGHT * proximity
+                + LAYER_PRIOR.get(layers.get(path, 4), 0.0)
+            )
+        # Stable sort: ties keep the fused order
+        return sorted(results, key=lambda r: r["rank_score"], reverse=True)
+
+    def _group_hits(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Groups ranked chunks into file_path -> {score, chunks}, in fused rank order."""
         hits = {}
-        for res in vector_results:
+        for res in results:
             path = res['metadata'].get('file_path')
             if not path:
                 continue
                 
             if path not in hits:
                 hits[path] = {
-                    "score": res['distance'], # Lower is better in Chroma usually, but let's just store it
+                    "score": res.get('distance'), # Vector distance of the best chunk (None for lexical-only hits)
                     "chunks": []
                 }
+            elif hits[path]["score"] is None:
+                hits[path]["score"] = res.get('distance')
             hits[path]["chunks"].append(res)
+        return hits
 
-        # 2. Load Module Tree
-        tree_path = os.path.join(self.graph_service.base_path, f"{project_id}_tree.json")
-        if not os.path.exists(tree_path):
-            return {"error": "Project tree not found. Please ingest project first."}
-            
-        with open(tree_path, 'r') as f:
-            tree = json.load(f)
+    def _render_tree(self, project_id: str, hits: Dict[str, Any], active_only: bool) -> Optional[Dict[str, Any]]:
+        """Overlays hits onto the cached module tree; None if the project has no tree."""
+        # Tree and paths must come from the same build, not one from before a re-ingest
+        with self.graph_service.lock(project_id).read():
+            tree = self.graph_service.get_module_tree(project_id)
+            if tree is None:
+                return None
+            paths = self.graph_service.get_tree_paths(project_id)
 
-        # 3. Propagate Hits to Tree
-        # We need to return a tree where relevant nodes are marked.
-        # We also calculate a "relevance" for sorting if we were returning a list,
-        # but for a tree, we just mark nodes.
+        # Sparse overlay of hit annotations, keyed by node ID
+        overlay = self._build_overlay(tree, paths, hits)
+        if active_only:
+            return self._active_subtree(tree, paths, overlay)
+        return self._apply_overlay(tree, paths, overlay)
 
-        has_hits = self._mark_tree_recursive(tree, hits)
-        
-        return {
-            "tree": tree,
-            "stats": {
-                "hits_found": len(hits),
-                "vector_results": len(vector_results)
-            }
-        }
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the result cache and the query-embedding cache."""
+        stats = {"results": self.cache.stats()}
+        embedder = getattr(self.storage, "embedder", None)
+        if embedder is not None:
+            stats["query_embeddings"] = embedder.query_cache.stats()
+        return stats
+
+    def _fill_content(self, project_id: str, results: List[Dict[str, Any]]):
+        """Lexical hits carry only metadata; fetch their content in one batch."""
+        missing = [res["id"] for res in results if "content" not in res]
+        if not missing:
+            return
+        contents = {c["id"]: c["content"] for c in self.storage.get_chunks(project_id, missing)}
+        for res in results:
+            if "content" not in res:
+                res["content"] = contents.get(res["id"])
 
-    def _mark_tree_recursive(self, node: Dict[str, Any], hits: Dict[str, Any]) -> bool:
+    def get_node(self, project_id: str, node_id: str, include_source: bool = True,
+                 ref: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
-        Recursively marks nodes as 'active' if they or their children have hits.
-        Returns True if this node or any child is active.
+        Returns a graph node's metadata. Graph nodes only keep a chunk_id pointer,
+        so the source is fetched from the vector store here, on request.
+        Split definitions are reassembled from their parts; nested members of a
+        class appear collapsed (`...`), as their source belongs to their own nodes.
+        None if the node, or the revision named by `ref`, does not exist.
         """
-        is_active = False
-        
-        # Check if this node itself is a hit (Files)
-        if node["type"] == "file":
-            if node["id"] in hits:
-                is_active = True
-                node["is_hit"] = True
-                node["search_score"] = hits[node["id"]]["score"]
-                node["matched_chunks"] = hits[node["id"]]["chunks"]
-        
-        # Check children (Folders)
-        if "children" in node:
-            for child in node["children"]:
-                child_active = self._mark_tree_recursive(child, hits)
-                if child_active:
-                    is_active = True
-        
-        if is_active:
-            node["is_active"] = True
-            
-        return is_active
+        scope = self.resolve(project_id, ref)
+        if scope is None:
+            return None
+        key = scope[0]
+        with self.graph_service.lock(key).read():
+            graph = self.graph_service._get_or_create_graph(key)
+            if not graph.has_node(node_id):
+                return None
+            attributes = dict(self.graph_service.get_node_attributes(key, node_id))
+            node = {"id": node_id, "type": graph.nodes[node_id].get("type"), "attributes": attributes}
+        # Graphs saved by older versions still carry the code inline
+        source = attributes.pop("code", None)
+        if include_source:
+            chunk_id = attributes.get("chunk_id")
+            if source is None and chunk_id:
+                source = self._chunk_source(project_id, chunk_id)
+            node["source"] = source
+        return node
+
+    def _chunk_source(self, project_id: str, chunk_id: str) -> Optional[str]:
+        chunks = self.storage.get_chunks(project_id, [chunk_id])
+        if not chunks:
+            return None
+        parts = chunks[0]["metadata"].get("parts", 1)
+        if parts <= 1:
+            return chunks[0]["content"]
+        rest = {c["id"]: c for c in self.storage.get_chunks(
+            project_id, [part_chunk_id(chunk_id, i) for i in range(1, parts)])}
+        pieces = [chunks[0]["content"]]
+        for i in range(1, parts):
+            part = rest.get(part_chunk_id(chunk_id, i))
+            if part is None:
+                continue
+            # Drop the repeated context line(s) at the top of each continuation part
+            context_lines = part["metadata"].get("context_lines", 0)
+            pieces.append(part["content"].split("\n", context_lines)[-1] if context_lines else part["content"])
+        return "\n".join(pieces)
+
+    def _build_overlay(self, tree: Dict[str, Any], paths: Dict[str, Tuple[int, ...]],
+                       hits: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns node_id -> annotations for hit files and every ancestor folder.
+        """
+        overlay: Dict[str, Dict[str, Any]] = {}
+        for file_id, hit in hits.items():
+            path = paths.get(file_id)
+            if path is None:
+                continue # e.g. docs, which are not part of the module tree
+
+            # Ancestors (root included) become active
+            node = tree
+            overlay.setdefault(node["id"], {"is_active": True})
+            for idx in path:
+                node = node["children"][idx]
+                overlay.setdefault(node["id"], {"is_active": True})
+
+            if node["type"] == "file":
+                overlay[file_id].update({
+                    "is_hit": True,
+                    "search_score": hit["score"],
+                    "matched_chunks": hit["chunks"]
+                })
+        return overlay
+
+    def _apply_overlay(self, tree: Dict[str, Any], paths: Dict[str, Tuple[int, ...]],
+                       overlay: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Path-copies the annotated nodes: each active node and its children list is
+        shallow-copied once; untouched subtrees are shared with the cached tree.
+        """
+        copies: Dict[str, Dict[str, Any]] = {}
+
+        def copy_of(node: Dict[str, Any]) -> Dict[str, Any]:
+            node_copy = copies.get(node["id"])
+            if node_copy is None:
+                node_copy = dict(node)
+                if "children" in node_copy:
+                    node_copy["children"] = list(node_copy["children"])
+                node_copy.update(overlay.get(node["id"], {}))
+                copies[node["id"]] = node_copy
+            return node_copy
+
+        root = copy_of(tree)
+        for node_id in overlay:
+            original, parent_copy = tree, root
+            for idx in paths.get(node_id, ()):
+                original = original["children"][idx]
+                child_copy = copy_of(original)
+                parent_copy["children"][idx] = child_copy
+                parent_copy = child_copy
+        return root
+
+    def _active_subtree(self, tree: Dict[str, Any], paths: Dict[str, Tuple[int, ...]],
+                        overlay: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Builds a pruned copy holding only active nodes, children kept in tree order.
+        """
+        def pruned(node: Dict[str, Any]) -> Dict[str, Any]:
+            node_copy = {k: v for k, v in node.items() if k != "children"}
+            node_copy.update(overlay.get(node["id"], {}))
+            if "children" in node:
+                node_copy["children"] = []
+            return node_copy
+
+        root = pruned(tree)
+        if tree["id"] not in overlay:
+            return root
+
+        copies = {tree["id"]: root}
+        # Sorting by path visits parents before children and keeps sibling order
+        for node_id in sorted(overlay, key=lambda n: paths.get(n, ())):
+            if node_id in copies or node_id not in paths:
+                continue
+            parent, original = None, tree
+            for idx in paths[node_id]:
+                parent, original = original, original["children"][idx]
+            parent_copy = copies[parent["id"]]
+            node_copy = pruned(original)
+            parent_copy["children"].append(node_copy)
+            copies[node_id] = node_copy
+        return root
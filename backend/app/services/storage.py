@@ -1,10 +1,32 @@
+import hashlib
 import os
-from typing import List, Dict, Any
+import queue
+import threading
+from typing import List, Dict, Any, Optional, Callable
 import chromadb
+import chromadb.errors
 from chromadb.config import Settings
+from .embeddings import EmbeddingEngine, EmbeddingCache
+
+# Older Chroma raises ValueError for a missing collection, newer versions NotFoundError
+CollectionNotFound = (ValueError, getattr(chromadb.errors, "NotFoundError", ValueError))
+
+# Default number of chunks per upsert call; also capped by Chroma's own max batch size
+DEFAULT_UPSERT_BATCH_SIZE = int(os.getenv("AUTOWIKI_UPSERT_BATCH_SIZE", "256"))
+
+# Chunks are shared by the revisions of a project; a boolean metadata field per
+# revision ("rev_<hash of the revision key>") marks which ones contain a chunk
+REVISION_FIELD_PREFIX = "rev_"
+
+def revision_field(key: str) -> str:
+    return REVISION_FIELD_PREFIX + hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+
+def _public_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Chunk metadata without the revision membership fields."""
+    return {k: v for k, v in (metadata or {}).items() if not k.startswith(REVISION_FIELD_PREFIX)}
 
 class VectorStorage:
-    def __init__(self, persistence_path: str = None):
+    def __init__(self, persistence_path: str = None, embedder: Optional[EmbeddingEngine] = None):
         if persistence_path is None:
             # Default to a path compatible with both Docker (/app/data) and Local (./data)
             persistence_path = os.getenv("CHROMA_DB_PATH", os.path.join(os.getcwd(), "data", "chromadb"))
@@ -14,6 +36,23 @@ class VectorStorage:
 
         self.client = chromadb.PersistentClient(path=persistence_path)
 
+        if embedder is None:
+            # The embedding cache lives next to the Chroma directory unless configured
+            cache_path = os.getenv(
+                "AUTOWIKI_EMBEDDING_CACHE",
+                os.path.join(os.path.dirname(os.path.abspath(persistence_path)), "embedding_cache.db")
+            )
+            embedder = EmbeddingEngine(cache=EmbeddingCache(cache_path))
+        # Vectors are computed here and passed explicitly; Chroma never embeds on its own
+        self.embedder = embedder
+
+    def max_batch_size(self) -> int:
+        """Largest batch the Chroma client accepts in a single upsert."""
+        try:
+            return self.client.get_max_batch_size()
+        except Exception:
+            return DEFAULT_UPSERT_BATCH_SIZE
+
     def _get_collection_name(self, project_id: str) -> str:
         """Generates a safe collection name from project_id."""
         # ChromaDB collection names must be alphanumeric, underscores, hyphens.
@@ -26,7 +65,8 @@ class VectorStorage:
         name = self._get_collection_name(project_id)
         return self.client.get_or_create_collection(
             name=name,
-            metadata={"hnsw:space": "cosine"} # Cosine similarity for code search
+            metadata={"hnsw:space": "cosine"}, # Cosine similarity for code search
+            embedding_function=None
         )
 
     def delete_collection(self, project_id: str):
@@ -48,42 +88,106 @@ class VectorStorage:
             return
 
         collection = self.get_collection(project_id)
-        ids = [c["id"] for c in chunks]
-        documents = [c["content"] for c in chunks]
-        metadatas = [c["metadata"] for c in chunks]
-
-        # Upsert (update if exists, insert if new)
-        collection.upsert(
-            ids=ids,
-            documents=documents,
-            metadatas=metadatas
-        )
+        step = self.max_batch_size()
+
+        # Split so a single call never exceeds Chroma's max batch size
+        for i in range(0, len(chunks), step):
+            batch = chunks[i:i + step]
+            documents = [c["content"] for c in batch]
+            # Upsert (update if exists, insert if new)
+            collection.upsert(
+                ids=[c["id"] for c in batch],
+                documents=documents,
+                embeddings=self.embedder.embed(documents),
+                metadatas=[c["metadata"] for c in batch]
+            )
         print(f"Saved {len(chunks)} chunks to Vector DB for project {project_id}.")
 
-    def query_code(self, project_id: str, query_text: str, n_results: int = 5) -> List[Dict[str, Any]]:
+    def delete_chunks(self, project_id: str, chunk_ids: List[str]):
+        """
+        Deletes specific chunks (e.g. those of a modified or removed file).
+        """
+        if not chunk_ids:
+            return
+
+        collection = self.get_collection(project_id)
+        collection.delete(ids=chunk_ids)
+        print(f"Deleted {len(chunk_ids)} stale chunks from Vector DB for project {project_id}.")
+
+    def set_revision(self, project_id: str, chunk_ids: List[str], key: str, member: bool = True):
+        """
+        Adds stored chunks to (or removes them from) the revision `key`. Only the
+        membership field is written: documents and vectors are left untouched.
+        """
+        if not chunk_ids:
+            return
+
+        collection = self.get_collection(project_id)
+        field = revision_field(key)
+        step = self.max_batch_size()
+        for i in range(0, len(chunk_ids), step):
+            batch = chunk_ids[i:i + step]
+            # A None value deletes the field
+            collection.update(ids=batch, metadatas=[{field: True if member else None} for _ in batch])
+
+    def get_chunks(self, project_id: str, chunk_ids: List[str]) -> List[Dict[str, Any]]:
         """
-        Semantic search for code chunks within a project.
+        Fetches chunks by ID (e.g. to resolve the source of a graph node).
         """
+        if not chunk_ids:
+            return []
         try:
-            collection = self.client.get_collection(self._get_collection_name(project_id))
-        except ValueError:
-            return [] # Collection not found
+            collection = self.client.get_collection(self._get_collection_name(project_id), embedding_function=None)
+        except CollectionNotFound:
+            return []
+
+        results = collection.get(ids=chunk_ids, include=["documents", "metadatas"])
+        return [
+            {"id": chunk_id, "content": document, "metadata": _public_metadata(metadata)}
+            for chunk_id, document, metadata in zip(results['ids'], results['documents'], results['metadatas'])
+        ]
+
+    def query_code(self, project_id: str, query_text: str, n_results: int = 5,
+                   revision: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Semantic search for code chunks within a project (and revision, if given).
+        """
+        return self.query_code_batch(project_id, [query_text], n_results=n_results, revision=revision)[0]
+
+    def query_code_batch(self, project_id: str, query_texts: List[str], n_results: int = 5,
+                         revision: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Semantic search for several queries at once: the queries are embedded in
+        one batch and answered by a single collection lookup.
+        With a revision key, only chunks of that revision are considered.
+        Returns one result list per query, in order.
+        """
+        if not query_texts:
+            return []
+        try:
+            collection = self.client.get_collection(self._get_collection_name(project_id), embedding_function=None)
+        except CollectionNotFound:
+            return [[] for _ in query_texts] # Collection not found
 
         results = collection.query(
-            query_texts=[query_text],
-            n_results=n_results
+            query_embeddings=self.embedder.embed_queries(query_texts),
+            n_results=n_results,
+            where={revision_field(revision): True} if revision else None
         )
 
         # Reformat results
         formatted_results = []
-        if results['ids']:
-            for i in range(len(results['ids'][0])):
-                formatted_results.append({
-                    "id": results['ids'][0][i],
-                    "content": results['documents'][0][i],
-                    "metadata": results['metadatas'][0][i],
-                    "distance": results['distances'][0][i] if results['distances'] else None
-                })
+        for q in range(len(query_texts)):
+            formatted = []
+            if results['ids']:
+                for i in range(len(results['ids'][q])):
+                    formatted.append({
+                        "id": results['ids'][q][i],
+                        "content": results['documents'][q][i],
+                        "metadata": _public_metadata(results['metadatas'][q][i]),
+                        "distance": results['distances'][q][i] if results['distances'] else None
+                    })
+            formatted_results.append(formatted)
         
         return formatted_results
 
@@ -92,7 +196,7 @@ class VectorStorage:
         Deletes all entries in the collection for a project.
         """
         try:
-            collection = self.client.get_collection(self._get_collection_name(project_id))
+            collection = self.client.get_collection(self._get_collection_name(project_id), embedding_function=None)
             count = collection.count()
             if count > 0:
                 # Delete by matching all IDs (ChromaDB requirement for bulk delete)
@@ -100,14 +204,109 @@ class VectorStorage:
                 if all_ids:
                     collection.delete(ids=all_ids)
             return count
-        except ValueError:
+        except CollectionNotFound:
             return 0
 
     def get_stats(self, project_id: str):
         try:
-            collection = self.client.get_collection(self._get_collection_name(project_id))
+            collection = self.client.get_collection(self._get_collection_name(project_id), embedding_function=None)
             return {
                 "count": collection.count()
             }
-        except ValueError:
-            return {"count": 0}
\ No newline at end of file
+        except CollectionNotFound:
+            return {"count": 0}
+
+class ChunkWriter:
+    """
+    Streams chunks into a project's collection in size-limited upsert batches.
+    Batches go through a bounded queue to a background thread, so embedding
+    overlaps with parsing and at most ~(max_pending_batches + 1) * batch_size
+    chunks are held in memory regardless of repository size.
+
+    Usage:
+        with ChunkWriter(storage, project_id) as writer:
+            writer.add(chunks)
+    """
+    _SENTINEL = None
+
+    def __init__(self, storage: VectorStorage, project_id: str, batch_size: int = None,
+                 max_pending_batches: int = 2,
+                 on_batch: Optional[Callable[[int, int], None]] = None):
+        self.storage = storage
+        self.project_id = project_id
+        self.batch_size = batch_size or DEFAULT_UPSERT_BATCH_SIZE
+        self.on_batch = on_batch
+
+        # Progress counters, updated as batches commit
+        self.chunks_written = 0
+        self.batches_committed = 0
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending_batches)
+        self._error: Optional[BaseException] = None
+        self._aborted = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"chunk-writer-{project_id}", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def add(self, chunks: List[Dict[str, Any]]):
+        """Buffers chunks; blocks when the writer thread is max_pending_batches behind."""
+        self._raise_if_failed()
+        self._buffer.extend(chunks)
+        while len(self._buffer) >= self.batch_size:
+            batch = self._buffer[:self.batch_size]
+            del self._buffer[:self.batch_size]
+            self._queue.put(batch)
+
+    def close(self):
+        """Flushes remaining chunks and waits for all batches to commit."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._buffer:
+            self._queue.put(self._buffer)
+            self._buffer = []
+        self._queue.put(self._SENTINEL)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def abort(self):
+        """Stops after the batch in flight; buffered chunks are discarded."""
+        if self._closed:
+            return
+        self._closed = True
+        self._buffer = []
+        self._aborted = True
+        self._queue.put(self._SENTINEL)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is self._SENTINEL:
+                return
+            # After a failure keep draining so producers never block on a full queue
+            if self._error is not None or self._aborted:
+                continue
+            try:
+                self.storage.save_chunks(self.project_id, batch)
+                self.chunks_written += len(batch)
+                self.batches_committed += 1
+                if self.on_batch:
+                    self.on_batch(self.chunks_written, self.batches_committed)
+            except BaseException as e:
+                self._error = e
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,49 @@
+"""
+Benchmark for GraphService module-tree construction.
+
+Generates synthetic repositories (a wide, skewed directory layout with a few
+very large folders) and times tree assembly at increasing sizes. Per-file time
+should stay roughly flat, i.e. construction scales linearly.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_module_tree
+    python -m backend.benchmarks.bench_module_tree --sizes 10000 100000 500000
+"""
+import argparse
+import random
+import tempfile
+import time
+from backend.app.services.graph import GraphService
+
+def synthetic_paths(n_files: int, seed: int = 0):
+    rng = random.Random(seed)
+    top = ["src", "lib", "tests", "docs", "vendor", "app"]
+    paths = []
+    for i in range(n_files):
+        depth = rng.randint(0, 6)
+        # A handful of huge flat folders plus a long tail of small nested ones
+        if i % 10 == 0:
+            parts = ["generated", "flat"]
+        else:
+            parts = [rng.choice(top)] + [f"pkg{rng.randint(0, 30)}" for _ in range(depth)]
+        paths.append("/".join(parts + [f"module_{i}.py"]))
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000, 250000, 500000])
+    args = parser.parse_args()
+
+    service = GraphService(base_path=tempfile.mkdtemp(prefix="autowiki-bench-"))
+    print(f"{'files':>10} {'seconds':>10} {'us/file':>10}")
+    for n in args.sizes:
+        paths = synthetic_paths(n)
+        scores = {p: (i % 97) / 97 for i, p in enumerate(paths)}
+        start = time.perf_counter()
+        tree = service._assemble_tree(paths, scores)
+        elapsed = time.perf_counter() - start
+        assert tree["importance"] > 0
+        print(f"{n:>10} {elapsed:>10.3f} {elapsed / n * 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
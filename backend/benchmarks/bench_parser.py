@@ -0,0 +1,88 @@
+"""
+Benchmark for CodeParser extraction engines: tree-sitter queries vs. the
+Python cursor walk, per language. Parsing is timed separately, since both
+engines share it; 'extract' is the time spent turning the tree into a
+FileStructure and definitions. Outputs of both engines are compared too.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_parser                  # synthetic corpus
+    python -m backend.benchmarks.bench_parser --path /some/repo # real files
+"""
+import argparse
+import os
+import time
+from collections import defaultdict
+from backend.app.services.parser import CodeParser, PARSER_ENGINES
+
+def synthetic_corpus(files_per_language: int):
+    py = "\n".join(
+        f"import os\nfrom .mod{i} import thing{i}\n\nclass Model{i}(Base):\n"
+        f"    def method(self, a, b=1):\n        return [x for x in range(a) if x % 2]\n"
+        f"\ndef helper{i}(value: int) -> int:\n    total = 0\n    for j in range(value):\n"
+        f"        total += j * {i}\n    return total\n"
+        for i in range(60)
+    )
+    ts = "\n".join(
+        f"import {{ thing{i} }} from './mod{i}';\nexport interface Props{i} {{ id: number; name: string }}\n"
+        f"export class Widget{i} {{\n  render(props: Props{i}) {{\n    return props.items.map((x) => x * {i}).filter(Boolean);\n  }}\n}}\n"
+        f"export function helper{i}(value: number): number {{\n  let total = 0;\n"
+        f"  for (let j = 0; j < value; j++) {{ total += j * {i}; }}\n  return total;\n}}\n"
+        f"const lazy{i} = () => import('./lazy{i}');\n"
+        for i in range(60)
+    )
+    js = ts.replace(f"export interface", "// interface").replace(": number", "").replace(": Props", " /* Props */")
+    corpus = []
+    for n in range(files_per_language):
+        corpus += [(f"f{n}.py", "python", py), (f"f{n}.ts", "typescript", ts), (f"f{n}.js", "javascript", js)]
+    return corpus
+
+def directory_corpus(path: str, parser: CodeParser):
+    corpus = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = [d for d in dirnames if d not in (".git", "node_modules")]
+        for filename in filenames:
+            language = parser.get_language_from_ext(filename)
+            if not language:
+                continue
+            try:
+                with open(os.path.join(dirpath, filename), "r", encoding="utf-8") as f:
+                    corpus.append((filename, language, f.read()))
+            except (OSError, UnicodeDecodeError):
+                continue
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", help="Directory of source files to use instead of the synthetic corpus")
+    parser.add_argument("--files", type=int, default=200, help="Synthetic files per language")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    args = parser.parse_args()
+
+    parsers = {engine: CodeParser(engine=engine) for engine in PARSER_ENGINES}
+    corpus = directory_corpus(args.path, parsers["query"]) if args.path else synthetic_corpus(args.files)
+    by_language = defaultdict(list)
+    for name, language, code in corpus:
+        # Parse once up front; both engines extract from the same trees
+        by_language[language].append((name, code, parsers["query"].parse_code(code, language)))
+
+    print(f"{'language':<12} {'files':>6} {'engine':<8} {'extract s':>10} {'speedup':>8}")
+    for language, files in sorted(by_language.items()):
+        timings = {}
+        outputs = {}
+        for engine, code_parser in parsers.items():
+            walk = code_parser._get_walker(language)
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = [walk(root) for _, _, root in files]
+                best = min(best, time.perf_counter() - start)
+            timings[engine] = best
+            outputs[engine] = results
+        for engine in PARSER_ENGINES:
+            speedup = timings["cursor"] / timings[engine] if timings[engine] else 0.0
+            print(f"{language:<12} {len(files):>6} {engine:<8} {timings[engine]:>10.3f} {speedup:>7.2f}x")
+        if outputs["query"] != outputs["cursor"]:
+            print(f"  WARNING: engines disagree on {language}")
+
+if __name__ == "__main__":
+    main()
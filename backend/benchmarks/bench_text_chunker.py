@@ -0,0 +1,103 @@
+"""
+Benchmark for CodeChunker text chunking on large documentation files.
+
+Generates synthetic Markdown (headings, paragraphs, lists, code fences) of
+increasing size and times chunk_text. Throughput should stay roughly flat as
+files grow, i.e. chunking is linear. With --legacy, the previous implementation
+(per-character offset loop plus a linear line-number scan per chunk) is timed
+on the same files for comparison; it is quadratic, so keep those sizes small.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_text_chunker
+    python -m backend.benchmarks.bench_text_chunker --sizes-mb 1 2 4 --legacy
+"""
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+from backend.app.services.chunker import CodeChunker
+
+WORDS = ["index", "graph", "module", "query", "chunk", "vector", "token", "parser",
+         "wiki", "repository", "the", "a", "of", "and", "to", "is", "with", "for"]
+
+def synthetic_markdown(size_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    section = 0
+    while total < size_bytes:
+        if rng.random() < 0.08:
+            section += 1
+            block = f"{'#' * rng.randint(1, 3)} Section {section}"
+        elif rng.random() < 0.1:
+            block = "\n".join(f"- {' '.join(rng.choices(WORDS, k=rng.randint(3, 10)))}" for _ in range(rng.randint(2, 6)))
+        elif rng.random() < 0.05:
+            block = "```python\n" + "\n".join(f"value_{i} = compute({i})" for i in range(rng.randint(3, 12))) + "\n```"
+        else:
+            lines = [" ".join(rng.choices(WORDS, k=rng.randint(8, 16))) for _ in range(rng.randint(1, 6))]
+            block = "\n".join(lines)
+        parts.append(block)
+        total += len(block) + 2
+    return "\n\n".join(parts) + "\n"
+
+def legacy_chunk_text(file_path: str, chunk_size: int = 1000, overlap: int = 200, rel_path: str = None):
+    """The pre-streaming implementation, kept here only as a baseline."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    path_for_id = rel_path if rel_path else file_path
+    lines_indices = [0]
+    for i, char in enumerate(text):
+        if char == '\n':
+            lines_indices.append(i + 1)
+
+    def line_number(char_index):
+        for i, idx in enumerate(lines_indices):
+            if idx > char_index:
+                return i
+        return len(lines_indices)
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        chunks.append({
+            "id": hashlib.md5(f"{path_for_id}:text:{start}".encode('utf-8')).hexdigest(),
+            "content": text[start:end],
+            "metadata": {"start_line": line_number(start), "end_line": line_number(end)},
+        })
+        start += chunk_size - overlap
+    return chunks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--legacy", action="store_true", help="also time the previous quadratic implementation")
+    args = parser.parse_args()
+
+    chunker = CodeChunker()
+    work_dir = tempfile.mkdtemp(prefix="autowiki-bench-")
+    header = f"{'MB':>8} {'chunks':>9} {'seconds':>9} {'MB/s':>9}"
+    print(header + (f" {'legacy s':>10} {'speedup':>8}" if args.legacy else ""))
+    for size_mb in args.sizes_mb:
+        path = os.path.join(work_dir, f"doc_{size_mb}.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_markdown(int(size_mb * (1 << 20))))
+
+        start = time.perf_counter()
+        chunks = chunker.chunk_text(path, rel_path="doc.md")
+        elapsed = time.perf_counter() - start
+        assert chunks and all(len(c["content"]) <= 1000 for c in chunks)
+        line = f"{size_mb:>8g} {len(chunks):>9} {elapsed:>9.3f} {size_mb / elapsed:>9.1f}"
+
+        if args.legacy:
+            start = time.perf_counter()
+            legacy_chunk_text(path, rel_path="doc.md")
+            legacy_elapsed = time.perf_counter() - start
+            line += f" {legacy_elapsed:>10.3f} {legacy_elapsed / elapsed:>7.1f}x"
+        print(line)
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from backend.app.services.cache import LRUCache, SearchCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1 # 'a' becomes most recent
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+def test_lru_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=10, ttl=5, clock=clock)
+    cache.put("q", "result")
+    clock.now = 5
+    assert cache.get("q") == "result"
+    clock.now = 5.1
+    assert cache.get("q") is None
+    assert len(cache) == 0
+
+def test_search_cache_invalidates_per_project():
+    cache = SearchCache(maxsize=10, ttl=60)
+    key_a = cache.key("a", "query", 5)
+    cache.put(key_a, {"tree": 1})
+    cache.put(cache.key("b", "query", 5), {"tree": 2})
+
+    cache.invalidate_project("a")
+    assert cache.get(cache.key("a", "query", 5)) is None
+    assert cache.get(cache.key("b", "query", 5)) == {"tree": 2}
+
+def test_result_computed_during_invalidation_is_never_served():
+    cache = SearchCache(maxsize=10, ttl=60)
+    key = cache.key("a", "query")      # taken before the (slow) search
+    cache.invalidate_project("a")      # re-ingest finishes meanwhile
+    cache.put(key, {"stale": True})
+    assert cache.get(cache.key("a", "query")) is None
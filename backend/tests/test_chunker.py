@@ -2,7 +2,8 @@ import os
 import shutil
 import pytest
 import tempfile
-from backend.app.services.chunker import CodeChunker
+from unittest.mock import patch
+from backend.app.services.chunker import CodeChunker, estimate_tokens, part_chunk_id
 
 @pytest.fixture
 def chunker():
@@ -46,6 +47,17 @@ def top_level_func():
     assert chunks[0]['metadata']['start_line'] is not None
     assert chunks[0]['metadata']['end_line'] is not None
 
+def test_chunk_ids_are_content_addressed(chunker, temp_dir):
+    path = create_test_file(temp_dir, "app.py", "def a():\n    return 1\n\ndef b():\n    return 2\n")
+    first = {c["metadata"]["name"]: c["id"] for c in chunker.chunk_file(path, rel_path="app.py")}
+    assert first == {c["metadata"]["name"]: c["id"] for c in chunker.chunk_file(path, rel_path="app.py")}
+
+    create_test_file(temp_dir, "app.py", "def a():\n    return 1\n\ndef b():\n    return 3\n")
+    second = {c["metadata"]["name"]: c["id"] for c in chunker.chunk_file(path, rel_path="app.py")}
+    # Unchanged definitions keep their ID (shareable across revisions); changed ones get a new one
+    assert second["a"] == first["a"]
+    assert second["b"] != first["b"]
+
 def test_unsupported_file_returns_empty(chunker, temp_dir):
     path = create_test_file(temp_dir, "data.bin", "\x00\x01\x02")
     chunks, structure = chunker.chunk_and_structure(path, rel_path="data.bin")
@@ -67,6 +79,103 @@ class Test:
     assert structure.classes[0].name == "Test"
     assert len(structure.imports) == 1
 
+def test_code_file_is_parsed_once(chunker, temp_dir):
+    content = """
+class A:
+    def m(self):
+        pass
+
+def f():
+    pass
+"""
+    path = create_test_file(temp_dir, "once.py", content)
+    with patch.object(chunker.parser, "parse_code", wraps=chunker.parser.parse_code) as spy:
+        chunks, structure = chunker.chunk_and_structure(path, rel_path="once.py")
+
+    assert spy.call_count == 1
+    # Classes first, then functions (methods included), as before
+    assert [c['metadata']['name'] for c in chunks] == ["A", "m", "f"]
+    assert {f.name for f in structure.functions} == {"m", "f"}
+
+def test_structure_points_at_chunks_instead_of_code(chunker, temp_dir):
+    content = """
+class A:
+    def m(self):
+        pass
+"""
+    path = create_test_file(temp_dir, "ptr.py", content)
+    chunks, structure = chunker.chunk_and_structure(path, rel_path="ptr.py")
+
+    ids = {c['metadata']['name']: c['id'] for c in chunks}
+    assert structure.classes[0].chunk_id == ids["A"]
+    assert structure.functions[0].chunk_id == ids["m"]
+    assert structure.classes[0].code is None
+
+def test_class_chunk_collapses_method_bodies(chunker, temp_dir):
+    content = """
+class A:
+    \"\"\"Docs.\"\"\"
+    def m(self):
+        x = 1
+        return x
+
+    def n(self):
+        return 2
+"""
+    path = create_test_file(temp_dir, "dedupe.py", content)
+    chunks, _ = chunker.chunk_and_structure(path, rel_path="dedupe.py")
+    by_name = {c['metadata']['name']: c for c in chunks}
+
+    summary = by_name["A"]['content']
+    assert "def m(self):" in summary and "def n(self):" in summary
+    assert "x = 1" not in summary and "return 2" not in summary
+    assert summary.count("...") == 2
+    # Method chunks keep their full source
+    assert "x = 1" in by_name["m"]['content']
+    assert by_name["A"]['metadata']['source_tokens'] > by_name["A"]['metadata']['tokens']
+
+def test_ts_class_chunk_collapses_method_bodies(chunker, temp_dir):
+    content = """class Store {
+  load(id: string) {
+    const item = fetchItem(id);
+    return item;
+  }
+}
+"""
+    path = create_test_file(temp_dir, "store.ts", content)
+    chunks, _ = chunker.chunk_and_structure(path, rel_path="store.ts")
+    by_name = {c['metadata']['name']: c for c in chunks}
+    assert "fetchItem" not in by_name["Store"]['content']
+    assert "load(id: string) {" in by_name["Store"]['content']
+    assert "fetchItem" in by_name["load"]['content']
+
+def test_oversized_definition_is_split_at_statements(temp_dir):
+    chunker = CodeChunker(token_budget=40)
+    body = "\n".join(f"    value_{i} = compute(value_{i - 1}, {i})" for i in range(1, 13))
+    content = f"def big(value_0):\n{body}\n    return value_12\n"
+    path = create_test_file(temp_dir, "big.py", content)
+    chunks, structure = chunker.chunk_and_structure(path, rel_path="big.py")
+
+    parts = [c for c in chunks if c['metadata']['name'] == "big"]
+    assert len(parts) > 1
+    base_id = parts[0]['id']
+    assert structure.functions[0].chunk_id == base_id
+    for i, chunk in enumerate(parts):
+        meta = chunk['metadata']
+        assert meta['part'] == i and meta['parts'] == len(parts)
+        assert meta['tokens'] <= 40
+        assert meta['tokens'] == estimate_tokens(chunk['content'])
+        if i:
+            assert chunk['id'] == part_chunk_id(base_id, i)
+            assert chunk['content'].startswith("def big(value_0):\n")
+            assert meta['context_lines'] == 1
+
+    # Dropping the context lines gives back the original source, line for line
+    pieces = [parts[0]['content']] + [c['content'].split("\n", 1)[1] for c in parts[1:]]
+    assert "\n".join(pieces) == content.rstrip("\n")
+    assert parts[0]['metadata']['source_tokens'] == estimate_tokens(content)
+    assert parts[-1]['metadata']['end_line'] == 13
+
 # --- Documentation Chunking Tests ---
 
 def test_markdown_chunking(chunker, temp_dir):
@@ -106,3 +215,47 @@ def test_text_sliding_window_lines(chunker, temp_dir):
     second_chunk = chunks[1]
     # Overlap means start of 2nd chunk < end of 1st chunk
     assert second_chunk['metadata']['start_line'] < first_chunk['metadata']['end_line']
+
+def test_text_chunks_end_at_headings_and_paragraphs(chunker, temp_dir):
+    sections = [f"# Section {i}\n\n" + "\n\n".join(f"Paragraph {i}.{j} " + "word " * 12 for j in range(3))
+                for i in range(6)]
+    content = "\n\n".join(sections) + "\n"
+    path = create_test_file(temp_dir, "guide.md", content)
+    chunks = chunker.chunk_text(path, chunk_size=300, overlap=50, rel_path="guide.md")
+
+    assert len(chunks) > 1
+    for chunk in chunks[:-1]:
+        # Every chunk but the last ends at a paragraph break or just before a heading
+        assert chunk['content'].endswith("\n\n") or content[content.index(chunk['content']) + len(chunk['content'])] == "#"
+    assert chunks[-1]['content'].endswith("word \n")
+    # Overlapping chunks start on line boundaries
+    lines = content.split("\n")
+    for chunk in chunks:
+        meta = chunk['metadata']
+        assert chunk['content'].startswith(lines[meta['start_line'] - 1])
+        assert chunk['content'].rstrip("\n").endswith(lines[meta['end_line'] - 1])
+
+def test_streamed_text_chunks_match_whole_file(chunker, temp_dir):
+    import random
+    rng = random.Random(7)
+    paragraphs = []
+    for i in range(400):
+        if i % 25 == 0:
+            paragraphs.append(f"## Heading {i}")
+        paragraphs.append("\n".join(" ".join(rng.choice(["alpha", "beta", "gamma", "ünïcode"])
+                                               for _ in range(rng.randint(1, 15)))
+                                      for _ in range(rng.randint(1, 4))))
+    content = "\n\n".join(paragraphs)
+    path = create_test_file(temp_dir, "big.md", content)
+
+    whole = list(chunker.iter_text_chunks(path, rel_path="big.md", block_size=1 << 30))
+    streamed = list(chunker.iter_text_chunks(path, rel_path="big.md", block_size=1500))
+    assert streamed == whole
+    assert whole[0]['content'] == content[:len(whole[0]['content'])]
+    assert whole[-1]['metadata']['end_line'] == content.count("\n") + 1
+    for chunk in whole:
+        meta = chunk['metadata']
+        assert len(chunk['content']) <= 1000
+        offset = content.index(chunk['content'])
+        assert meta['start_line'] == content.count("\n", 0, offset) + 1
+        assert meta['end_line'] == meta['start_line'] + chunk['content'][:-1].count("\n")
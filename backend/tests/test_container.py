@@ -0,0 +1,170 @@
+import os
+import git
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app.api.deps import ServiceContainer, set_container, get_container
+from backend.app.services.storage import VectorStorage
+from backend.app.services.graph import GraphService
+from backend.app.services.manifest import ManifestStore
+from backend.app.services.lexical import LexicalIndexService
+from backend.app.services.mirror import MirrorCache
+from backend.app.services.embeddings import EmbeddingEngine, EmbeddingCache, HashEmbeddingBackend
+from backend.app.schemas import FileStructure
+
+@pytest.fixture
+def container(tmp_path):
+    c = ServiceContainer(
+        storage=VectorStorage(persistence_path=str(tmp_path / "chromadb")),
+        graph_service=GraphService(base_path=str(tmp_path / "graphs")),
+        manifest_store=ManifestStore(base_path=str(tmp_path / "manifests")),
+        lexical_index=LexicalIndexService(base_path=str(tmp_path / "symbols")),
+    )
+    set_container(c)
+    yield c
+    c.shutdown()
+    set_container(None)
+
+def test_services_share_one_client_and_graph_cache(container):
+    assert container.ingestion_service.storage is container.storage
+    assert container.search_service.storage is container.storage
+    assert container.ingestion_service.graph_service is container.graph_service
+    assert container.search_service.graph_service is container.graph_service
+    assert container.search_service.lexical_index is container.ingestion_service.lexical_index
+    assert container.search_service.cache is container.ingestion_service.search_cache
+    assert container.job_manager.ingestion_service is container.ingestion_service
+    assert get_container() is container
+
+def test_graph_built_by_ingestion_is_visible_to_search(container):
+    container.ingestion_service.graph_service.update_dependency_graph("p", FileStructure(file_path="a.py"))
+    # No reload from disk: search sees the same in-memory graph
+    assert container.search_service.graph_service._get_or_create_graph("p").has_node("a.py")
+
+def test_routes_use_injected_services(container):
+    container.graph_service.update_dependency_graph("p", FileStructure(file_path="a.py"))
+    container.graph_service.save_graph("p")
+    client = TestClient(app)
+
+    res = client.post("/api/clear", params={"project_id": "p"})
+    assert res.status_code == 200
+    assert res.json()["status"] == "success"
+    # The shared graph cache was cleared too
+    assert not container.graph_service._get_or_create_graph("p").has_node("a.py")
+
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+def test_clear_invalidates_cached_search_results(container):
+    cache = container.search_cache
+    key = cache.key("p", "query", 5, False)
+    cache.put(key, {"tree": {}})
+    client = TestClient(app)
+
+    client.post("/api/clear", params={"project_id": "p"})
+    assert cache.get(cache.key("p", "query", 5, False)) is None
+
+    stats = client.get("/api/search/cache").json()
+    assert stats["results"]["misses"] == 1
+    assert "query_embeddings" in stats
+
+def test_batch_search_route(container):
+    client = TestClient(app)
+    res = client.post("/api/search/batch", json={"project_id": "p", "queries": ["a", "b"]})
+    assert res.status_code == 200
+    assert [r["query"] for r in res.json()["results"]] == ["a", "b"]
+
+    assert client.post("/api/search/batch", json={"project_id": "p", "queries": []}).status_code == 422
+
+def test_graph_analytics_route(container):
+    container.graph_service.update_dependency_graph("p", FileStructure(file_path="a.py"))
+    container.graph_service.compute_analytics("p")
+    client = TestClient(app)
+
+    body = client.get("/api/graph/analytics", params={"project_id": "p"}).json()
+    assert body["files"] == 1
+    assert body["top_files"][0]["file"] == "a.py"
+    assert client.get("/api/graph/analytics", params={"project_id": "none"}).status_code == 404
+
+def test_graph_query_routes_paginate(container):
+    from backend.app.schemas import ImportInfo
+    for i in range(5):
+        container.graph_service.update_dependency_graph("p", FileStructure(
+            file_path=f"m{i}.py", imports=[ImportInfo(module="core", type="local_absolute")]
+        ))
+    container.graph_service.update_dependency_graph("p", FileStructure(file_path="core.py"))
+    container.graph_service.build_edges("p")
+    client = TestClient(app)
+
+    page = client.get("/api/graph/impact", params={"project_id": "p", "node_id": "core.py", "offset": 2, "limit": 2}).json()
+    assert page["total"] == 5
+    assert [item["id"] for item in page["items"]] == ["m2.py", "m3.py"]
+
+    res = client.get("/api/graph/neighbors", params={"project_id": "p", "node_id": "m0.py", "edge_types": "imports"})
+    assert res.json()["items"][0]["id"] == "core.py"
+    assert client.get("/api/graph/neighbors", params={"project_id": "p", "node_id": "m0.py", "edge_types": "bogus"}).status_code == 400
+
+    assert client.get("/api/graph/path", params={"project_id": "p", "source": "m0.py", "target": "core.py"}).json() == {
+        "path": ["m0.py", "core.py"], "length": 1
+    }
+    assert client.get("/api/graph/path", params={"project_id": "p", "source": "x", "target": "core.py"}).status_code == 404
+
+@pytest.fixture
+def offline_container(tmp_path, monkeypatch):
+    """Container with an offline embedder and a local mirror cache, for real ingests."""
+    monkeypatch.chdir(tmp_path)
+    embedder = EmbeddingEngine(HashEmbeddingBackend(), cache=EmbeddingCache(str(tmp_path / "cache.db")))
+    c = ServiceContainer(
+        storage=VectorStorage(persistence_path=str(tmp_path / "chromadb"), embedder=embedder),
+        graph_service=GraphService(base_path=str(tmp_path / "graphs")),
+        manifest_store=ManifestStore(base_path=str(tmp_path / "manifests")),
+        lexical_index=LexicalIndexService(base_path=str(tmp_path / "symbols")),
+    )
+    c.ingestion_service.mirror_cache = MirrorCache(base_path=str(tmp_path / "mirrors"))
+    c.ingestion_service.workers = 1
+    set_container(c)
+    yield c
+    c.shutdown()
+    set_container(None)
+
+def test_slash_named_branch_is_ingested_and_served(offline_container, tmp_path):
+    author = git.Actor("Test", "test@example.com")
+    work = git.Repo.init(tmp_path / "work")
+    (tmp_path / "work" / "app.py").write_text("def main():\n    return 1\n")
+    work.index.add(["app.py"])
+    work.index.commit("first", author=author, committer=author)
+    work.create_head("feature/x").checkout()
+    os.makedirs(tmp_path / "work" / "lib")
+    (tmp_path / "work" / "lib" / "util.py").write_text("def helper():\n    return 2\n")
+    work.index.add(["lib/util.py"])
+    branch_commit = work.index.commit("feature", author=author, committer=author).hexsha
+    bare = tmp_path / "origin.git"
+    git.Repo.clone_from(work.working_tree_dir, bare, bare=True)
+    url = f"file://{bare}"
+
+    stats = offline_container.ingestion_service.ingest_project(url, ref="feature/x")
+    assert stats["commit"] == branch_commit
+    project_id = stats["project_id"]
+
+    client = TestClient(app)
+    res = client.get("/api/graph/tree", params={"project_id": project_id, "ref": "feature/x"})
+    assert res.status_code == 200
+    assert [c["id"] for c in res.json()["children"]] == ["root/lib", "app.py"]
+    assert client.get("/api/graph/tree", params={"project_id": project_id, "ref": branch_commit[:7]}).status_code == 200
+
+    # Unknown revisions are 404s, never unscoped results
+    assert client.get("/api/graph/tree", params={"project_id": project_id, "ref": "main"}).status_code == 404
+    res = client.get("/api/search", params={"project_id": project_id, "q": "helper", "ref": "main"})
+    assert res.status_code == 404
+    res = client.get("/api/search", params={"project_id": project_id, "q": "helper", "ref": "feature/x"})
+    assert res.status_code == 200 and "tree" in res.json()
+
+def test_search_fallback_stays_within_the_revision(container, monkeypatch):
+    container.manifest_store.save_revision("p", "dev", "b" * 40)
+    calls = []
+    def failing_search(*args, **kwargs):
+        raise RuntimeError("tree unavailable")
+    monkeypatch.setattr(container.search_service, "search", failing_search)
+    monkeypatch.setattr(container.storage, "query_code", lambda *args, **kwargs: calls.append(kwargs) or [])
+
+    res = TestClient(app).get("/api/search", params={"project_id": "p", "q": "x", "ref": "dev"})
+    assert res.status_code == 200 and res.json()["fallback"] is True
+    assert calls == [{"n_results": 5, "revision": "p@dev"}]
@@ -0,0 +1,140 @@
+import os
+import numpy as np
+import pytest
+from backend.app.services.embeddings import (
+    EmbeddingEngine, EmbeddingCache, EmbeddingBackend, HashEmbeddingBackend, get_embedding_backend,
+    OnnxEmbeddingBackend, ONNX_MODEL_FOLDER, download_onnx_model, mean_pool
+)
+
+class CountingBackend(EmbeddingBackend):
+    name = "counting"
+
+    def __init__(self):
+        self.batches = []
+
+    def embed(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+@pytest.fixture
+def cache(tmp_path):
+    c = EmbeddingCache(str(tmp_path / "cache.db"))
+    yield c
+    c.close()
+
+def test_engine_batches_and_deduplicates(cache):
+    backend = CountingBackend()
+    engine = EmbeddingEngine(backend, cache=cache, batch_size=2)
+
+    vectors = engine.embed(["a", "bb", "a", "ccc"])
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0], [3.0, 1.0]]
+    # Three unique texts, embedded in batches of at most two
+    assert backend.batches == [["a", "bb"], ["ccc"]]
+    assert engine.cache_misses == 3
+
+def test_cache_persists_across_engines(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = EmbeddingEngine(CountingBackend(), cache=EmbeddingCache(path))
+    first.embed(["def f(): pass"])
+
+    backend = CountingBackend()
+    second = EmbeddingEngine(backend, cache=EmbeddingCache(path))
+    assert second.embed(["def f(): pass", "new"]) == [[13.0, 1.0], [3.0, 1.0]]
+    assert backend.batches == [["new"]]
+    assert (second.cache_hits, second.cache_misses) == (1, 1)
+
+def test_cache_is_keyed_by_model(cache):
+    EmbeddingEngine(CountingBackend(), cache=cache).embed(["x"])
+    hashed = EmbeddingEngine(HashEmbeddingBackend(), cache=cache)
+    vector = hashed.embed(["x"])[0]
+    assert len(vector) == 384
+    assert hashed.cache_misses == 1
+
+def test_hash_backend_is_deterministic_and_normalised():
+    backend = HashEmbeddingBackend(dimension=64)
+    a, b, c = backend.embed(["load user config", "load user config", ""])
+    assert np.allclose(a, b)
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert not c.any()
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        get_embedding_backend("nope")
+
+def test_query_embeddings_are_memoised(cache):
+    backend = CountingBackend()
+    engine = EmbeddingEngine(backend, cache=cache, query_cache_size=8)
+    assert engine.embed_query("find config") == engine.embed_query("find config")
+    assert backend.batches == [["find config"]]
+    assert engine.query_cache.stats()["hits"] == 1
+
+def test_query_embeddings_stay_out_of_the_persistent_cache(cache):
+    engine = EmbeddingEngine(CountingBackend(), cache=cache)
+    engine.embed_queries(["where is auth", "where is auth", "retry logic"])
+    assert cache.get_many("counting", [engine.content_hash("where is auth")]) == {}
+
+    # Chunk content still goes to the persistent cache
+    engine.embed(["retry logic"])
+    assert len(cache.get_many("counting", [engine.content_hash("retry logic")])) == 1
+
+def test_mean_pool_ignores_padding_and_normalises():
+    hidden = np.array([[[3.0, 4.0], [1.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    pooled = mean_pool(hidden, mask)
+    # Mean of the two real tokens is (2, 2); the padded token is ignored
+    assert np.allclose(pooled, [[2 ** -0.5, 2 ** -0.5]])
+    assert pooled.dtype == np.float32
+
+def test_onnx_backend_tokenises_batches_and_pools(tmp_path):
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+
+    tokenizer = Tokenizer(WordLevel({"[PAD]": 0, "[UNK]": 1, "alpha": 2, "beta": 3}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+    class FakeSession:
+        def __init__(self):
+            self.feeds = []
+
+        def run(self, outputs, feed):
+            self.feeds.append(feed)
+            # One-hot token ids as the hidden state, so pooling is easy to predict
+            return [np.eye(4, dtype=np.float32)[feed["input_ids"]]]
+
+    backend = OnnxEmbeddingBackend(batch_size=2, model_dir=str(tmp_path))
+    backend._tokenizer = tokenizer
+    backend._session = session = FakeSession()
+
+    vectors = backend.embed(["alpha", "alpha beta", "beta"])
+    assert vectors.shape == (3, 4)
+    assert np.allclose(vectors[0], [0, 0, 1, 0])
+    assert np.allclose(vectors[1], [0, 0, 2 ** -0.5, 2 ** -0.5])
+    assert np.allclose(vectors[2], [0, 0, 0, 1])
+    assert [f["input_ids"].shape[0] for f in session.feeds] == [2, 1]
+    assert all(f["input_ids"].dtype == np.int64 for f in session.feeds)
+    assert not session.feeds[0]["token_type_ids"].any()
+
+def test_download_onnx_model_verifies_checksum(tmp_path):
+    import hashlib
+    import tarfile
+
+    src = tmp_path / "src" / ONNX_MODEL_FOLDER
+    src.mkdir(parents=True)
+    (src / "model.onnx").write_bytes(b"model")
+    (src / "tokenizer.json").write_text("{}")
+    archive = tmp_path / "onnx.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(src, arcname=ONNX_MODEL_FOLDER)
+    url = archive.as_uri()
+
+    with pytest.raises(RuntimeError, match="sha256"):
+        download_onnx_model(str(tmp_path / "bad"), url=url, sha256="0" * 64)
+    assert not (tmp_path / "bad" / ONNX_MODEL_FOLDER).exists()
+
+    digest = hashlib.sha256(archive.read_bytes()).hexdigest()
+    folder = download_onnx_model(str(tmp_path / "models"), url=url, sha256=digest)
+    assert open(os.path.join(folder, "model.onnx"), "rb").read() == b"model"
+    # Already unpacked: no second download is attempted
+    assert download_onnx_model(str(tmp_path / "models"), url="file:///missing", sha256=digest) == folder
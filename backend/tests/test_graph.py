@@ -1,7 +1,8 @@
 import os
 import pytest
 import shutil
-from backend.app.services.graph import GraphService
+import threading
+from backend.app.services.graph import GraphService, ReadWriteLock
 from backend.app.schemas import FileStructure, ImportInfo, ClassInfo, FunctionInfo, NodeType, EdgeType
 
 @pytest.fixture
@@ -106,4 +107,333 @@ def test_import_resolution_cross_file(graph_service_instance):
     
     g = graph_service_instance._get_or_create_graph(project_id)
     assert g.has_edge("main.py", "utils.py")
-    assert g.edges["main.py", "utils.py"]["type"] == EdgeType.IMPORTS
\ No newline at end of file
+    assert g.edges["main.py", "utils.py"]["type"] == EdgeType.IMPORTS
+def test_remove_file_and_partial_edge_rebuild(graph_service_instance):
+    project_id = "partial_edges"
+
+    graph_service_instance.update_dependency_graph(project_id, FileStructure(
+        file_path="utils.py",
+        functions=[FunctionInfo(name="helper", args=[], start_line=0, end_line=1)]
+    ))
+    graph_service_instance.update_dependency_graph(project_id, FileStructure(
+        file_path="main.py",
+        imports=[ImportInfo(module="utils", type="local_absolute")]
+    ))
+    graph_service_instance.build_edges(project_id)
+
+    importers = graph_service_instance.remove_file(project_id, "utils.py")
+    assert importers == ["main.py"]
+
+    g = graph_service_instance._get_or_create_graph(project_id)
+    assert not g.has_node("utils.py")
+    assert not g.has_node("utils.py::helper")
+    assert "utils" not in graph_service_instance._get_file_map(project_id)
+
+    # main.py now has an unresolved import; re-adding utils.py re-links it without listing main.py
+    graph_service_instance.build_edges(project_id, file_ids=importers)
+    assert g.nodes["main.py"]["unresolved_imports"] == 1
+    graph_service_instance.update_dependency_graph(project_id, FileStructure(file_path="utils.py"))
+    graph_service_instance.build_edges(project_id, file_ids=["utils.py"])
+    assert g.has_edge("main.py", "utils.py")
+
+def test_attributes_load_lazily_after_reload(graph_service_instance):
+    pid = "lazy"
+    graph_service_instance.update_dependency_graph(pid, FileStructure(
+        file_path="pkg/a.py",
+        classes=[ClassInfo(name="A", bases=["Base"], start_line=1, end_line=5)],
+        functions=[FunctionInfo(name="f", args=["x"], start_line=7, end_line=8)],
+        imports=[ImportInfo(module="pkg.b", name="g", type="local_absolute")]
+    ))
+    graph_service_instance.update_dependency_graph(pid, FileStructure(file_path="pkg/b.py"))
+    graph_service_instance.build_edges(pid)
+
+    new_service = GraphService(base_path=graph_service_instance.base_path)
+    g = new_service._get_or_create_graph(pid)
+
+    # Structure and edges are in memory, attribute blobs are not
+    assert g.has_edge("pkg/a.py", "pkg/b.py")
+    assert g.edges["pkg/a.py", "pkg/b.py"]["type"] == EdgeType.IMPORTS
+    assert g.nodes["pkg/a.py::A"]["type"] == NodeType.CLASS
+    assert "attributes" not in g.nodes["pkg/a.py::A"]
+
+    assert new_service.get_node_attributes(pid, "pkg/a.py::A")["bases"] == ["Base"]
+    assert new_service.get_node_attributes(pid, "pkg/a.py::f")["args"] == ["x"]
+    assert new_service.get_node_attributes(pid, "missing") == {}
+
+def test_legacy_json_graph_is_migrated(graph_service_instance):
+    import json
+    pid = "legacy"
+    legacy_path = os.path.join(graph_service_instance.base_path, "legacy.json")
+    with open(legacy_path, "w") as f:
+        json.dump({
+            "nodes": [
+                {"id": "a.py", "type": "FILE", "attributes": {"path": "a.py", "imports": []}},
+                {"id": "a.py::A", "type": "CLASS", "attributes": {"name": "A"}},
+            ],
+            "edges": [{"source": "a.py", "target": "a.py::A", "type": "DEFINES"}],
+        }, f)
+
+    g = graph_service_instance._get_or_create_graph(pid)
+    assert g.has_edge("a.py", "a.py::A")
+    graph_service_instance.save_graph(pid)
+
+    assert not os.path.exists(legacy_path)
+    reloaded = GraphService(base_path=graph_service_instance.base_path)
+    assert reloaded._get_or_create_graph(pid).has_edge("a.py", "a.py::A")
+    assert reloaded.get_node_attributes(pid, "a.py::A") == {"name": "A"}
+
+def test_rank_signals_are_built_with_the_tree(graph_service_instance):
+    pid = "signals"
+    graph_service_instance.update_dependency_graph(pid, FileStructure(
+        file_path="app/main.py", imports=[ImportInfo(module="app.core", type="local_absolute")]
+    ))
+    graph_service_instance.update_dependency_graph(pid, FileStructure(
+        file_path="app/util.py", imports=[ImportInfo(module="app.core", type="local_absolute")]
+    ))
+    graph_service_instance.update_dependency_graph(pid, FileStructure(file_path="app/core.py"))
+    graph_service_instance.build_edges(pid)
+    graph_service_instance.build_module_tree(pid)
+
+    signals = GraphService(base_path=graph_service_instance.base_path).get_rank_signals(pid)
+    assert signals["importance"]["app/core.py"] == 1.0
+    assert signals["importance"]["app/main.py"] < 0.5
+    assert signals["layer"]["app/main.py"] == 1
+    assert signals["neighbors"]["app/core.py"] == {"app/main.py", "app/util.py"}
+    assert signals["neighbors"]["app/main.py"] == {"app/core.py"}
+
+    graph_service_instance.delete_graph(pid)
+    assert graph_service_instance.get_rank_signals(pid) is None
+
+@pytest.fixture
+def layered_graph(graph_service_instance):
+    # api.py -> service.py -> core.py, util.py -> core.py; core.py defines Base
+    pid = "query"
+    files = {
+        "api.py": ["service"],
+        "service.py": ["core"],
+        "util.py": ["core"],
+        "core.py": [],
+    }
+    for path, deps in files.items():
+        graph_service_instance.update_dependency_graph(pid, FileStructure(
+            file_path=path,
+            classes=[ClassInfo(name="Base", bases=[], start_line=1, end_line=2)] if path == "core.py" else [],
+            imports=[ImportInfo(module=d, type="local_absolute") for d in deps]
+        ))
+    graph_service_instance.build_edges(pid)
+    return graph_service_instance, pid
+
+def test_neighbors_by_direction_and_depth(layered_graph):
+    service, pid = layered_graph
+    out = service.get_neighbors(pid, "api.py", depth=2, edge_types=[EdgeType.IMPORTS])
+    assert [(n["id"], n["distance"]) for n in out] == [("service.py", 1), ("core.py", 2)]
+
+    importers = service.get_neighbors(pid, "core.py", direction="in")
+    assert [n["id"] for n in importers] == ["service.py", "util.py"]
+
+    defined = service.get_neighbors(pid, "core.py", edge_types=[EdgeType.DEFINES])
+    assert defined == [{"id": "core.py::Base", "type": NodeType.CLASS, "distance": 1}]
+    assert service.get_neighbors(pid, "missing.py") is None
+
+def test_shortest_path(layered_graph):
+    service, pid = layered_graph
+    assert service.find_path(pid, "api.py", "core.py") == ["api.py", "service.py", "core.py"]
+    assert service.find_path(pid, "core.py", "api.py") is None
+    assert service.find_path(pid, "api.py", "missing.py") == []
+
+def test_impact_of_class_follows_its_file(layered_graph):
+    service, pid = layered_graph
+    impact = service.get_impact(pid, "core.py::Base")
+    assert [(n["id"], n["distance"]) for n in impact] == [("service.py", 1), ("util.py", 1), ("api.py", 2)]
+    assert [n["id"] for n in service.get_impact(pid, "core.py", max_depth=1)] == ["service.py", "util.py"]
+
+def test_impact_of_base_class_reaches_subclasses(graph_service_instance):
+    pid = "inherit"
+    structures = [
+        FileStructure(file_path="pkg/base.py",
+                      classes=[ClassInfo(name="Base", bases=["object"], start_line=1, end_line=2)]),
+        FileStructure(file_path="pkg/models.py",
+                      imports=[ImportInfo(module=".base", name="Base", type="local_relative")],
+                      classes=[ClassInfo(name="Model", bases=["Base"], start_line=1, end_line=2),
+                               ClassInfo(name="Local", bases=["Model"], start_line=3, end_line=4)]),
+        FileStructure(file_path="app.py",
+                      imports=[ImportInfo(module="pkg.models", type="local_absolute"),
+                               ImportInfo(module="abc", name="ABC", type="stdlib")],
+                      classes=[ClassInfo(name="View", bases=["pkg.models.Model", "ABC"], start_line=1, end_line=2)]),
+    ]
+    for structure in structures:
+        graph_service_instance.update_dependency_graph(pid, structure)
+    graph_service_instance.build_edges(pid)
+
+    impact = graph_service_instance.get_impact(pid, "pkg/base.py::Base")
+    assert [(n["id"], n["distance"]) for n in impact] == [
+        ("pkg/models.py", 1), ("pkg/models.py::Model", 1), ("app.py", 2), ("app.py::View", 2), ("pkg/models.py::Local", 2)
+    ]
+
+    # A re-ingested base file relinks the subclasses that import it
+    affected = graph_service_instance.remove_file(pid, "pkg/base.py")
+    graph_service_instance.update_dependency_graph(pid, structures[0])
+    graph_service_instance.build_edges(pid, file_ids=affected + ["pkg/base.py"])
+    subclasses = graph_service_instance.get_neighbors(pid, "pkg/base.py::Base", direction="in",
+                                                      edge_types=[EdgeType.INHERITS])
+    assert [n["id"] for n in subclasses] == ["pkg/models.py::Model"]
+
+def test_graph_index_is_rebuilt_after_changes(layered_graph):
+    service, pid = layered_graph
+    assert service.find_path(pid, "api.py", "core.py") is not None
+    service.remove_file(pid, "service.py")
+    service.build_edges(pid, file_ids=["api.py"])
+    assert service.find_path(pid, "api.py", "core.py") is None
+
+def test_module_tree_aggregates_folder_importance(graph_service_instance):
+    scores = {"src/a.py": 0.5, "src/pkg/b.py": 0.25, "src/pkg/c.py": 0.25, "README.md": 1.0}
+    tree = graph_service_instance._assemble_tree(list(scores), scores)
+
+    assert [c["id"] for c in tree["children"]] == ["root/src", "README.md"]
+    src = tree["children"][0]
+    assert [c["id"] for c in src["children"]] == ["root/src/pkg", "src/a.py"]
+    assert src["children"][0]["importance"] == 0.5
+    assert src["importance"] == 1.0
+    assert tree["importance"] == 2.0
+
+def test_module_tree_handles_deep_and_wide_folders(graph_service_instance):
+    deep = "/".join(f"d{i}" for i in range(3000)) + "/leaf.py"
+    wide = [f"flat/f{i}.py" for i in range(5000)]
+    tree = graph_service_instance._assemble_tree([deep] + wide, {deep: 1.0})
+
+    flat = next(c for c in tree["children"] if c["name"] == "flat")
+    assert len(flat["children"]) == 5000
+    node, depth = tree, 0
+    while node["children"] and node["children"][0]["type"] == "folder" and node["children"][0]["name"].startswith("d"):
+        node, depth = node["children"][0], depth + 1
+        assert node["importance"] == 1.0
+    assert depth == 3000
+    assert node["children"][0]["id"] == deep
+
+def test_incremental_build_edges_relinks_only_waiting_importers(graph_service_instance, monkeypatch):
+    pid = "waiting"
+    for path, module in (("a.py", "models"), ("b.py", "missing")):
+        graph_service_instance.update_dependency_graph(pid, FileStructure(
+            file_path=path, imports=[ImportInfo(module=module, type="local_absolute")]
+        ))
+    graph_service_instance.build_edges(pid)
+
+    resolver = graph_service_instance._get_import_resolver(pid)
+    resolved = []
+    original = resolver.resolve_file
+    monkeypatch.setattr(resolver, "resolve_file", lambda f: resolved.append(f) or original(f))
+
+    graph_service_instance.update_dependency_graph(pid, FileStructure(file_path="models.py"))
+    graph_service_instance.build_edges(pid, file_ids=["models.py"])
+    assert sorted(resolved) == ["a.py", "models.py"]
+    g = graph_service_instance._get_or_create_graph(pid)
+    assert g.has_edge("a.py", "models.py")
+    assert g.nodes["b.py"]["unresolved_imports"] == 1
+
+    # After a reload nothing is tracked yet, so files with unresolved imports are re-linked once
+    reloaded = GraphService(base_path=graph_service_instance.base_path)
+    reloaded.update_dependency_graph(pid, FileStructure(file_path="missing.py"))
+    reloaded.build_edges(pid, file_ids=["missing.py"])
+    assert reloaded._get_or_create_graph(pid).has_edge("b.py", "missing.py")
+
+def test_js_imports_resolve_with_index_files_and_aliases(graph_service_instance):
+    pid = "frontend"
+    for path, imports in (
+        ("web/app/page.tsx", [("./widgets", "local_relative"), ("@/lib/api", "third_party")]),
+        ("web/app/widgets/index.ts", []),
+        ("web/lib/api.ts", [("./types", "local_relative")]),
+        ("web/lib/types.ts", []),
+    ):
+        graph_service_instance.update_dependency_graph(pid, FileStructure(
+            file_path=path, imports=[ImportInfo(module=m, type=t) for m, t in imports]
+        ))
+    assert graph_service_instance.set_path_aliases(pid, {"web": {"base_url": "web", "paths": {"@/*": ["web/*"]}}})
+    assert not graph_service_instance.set_path_aliases(pid, {"web": {"base_url": "web", "paths": {"@/*": ["web/*"]}}})
+    graph_service_instance.build_edges(pid)
+
+    g = graph_service_instance._get_or_create_graph(pid)
+    assert g.has_edge("web/app/page.tsx", "web/app/widgets/index.ts")
+    assert g.has_edge("web/app/page.tsx", "web/lib/api.ts")
+    assert g.has_edge("web/lib/api.ts", "web/lib/types.ts")
+
+    # widgets.ts takes precedence over widgets/index.ts, which takes over again once it is removed
+    graph_service_instance.update_dependency_graph(pid, FileStructure(file_path="web/app/widgets.ts"))
+    graph_service_instance.build_edges(pid, file_ids=["web/app/widgets.ts", "web/app/page.tsx"])
+    assert g.has_edge("web/app/page.tsx", "web/app/widgets.ts")
+    importers = graph_service_instance.remove_file(pid, "web/app/widgets.ts")
+    graph_service_instance.build_edges(pid, file_ids=importers)
+    assert g.has_edge("web/app/page.tsx", "web/app/widgets/index.ts")
+
+    # Aliases are persisted with the graph
+    reloaded = GraphService(base_path=graph_service_instance.base_path)
+    assert reloaded._get_import_resolver(pid).path_aliases == {"web": {"base_url": "web", "paths": {"@/*": ["web/*"]}}}
+
+def test_read_write_lock_excludes_writers_and_allows_reentry():
+    lock = ReadWriteLock()
+    entered = threading.Event()
+    def writer():
+        with lock.write():
+            entered.set()
+
+    late_reader = threading.Event()
+    def reader():
+        with lock.read():
+            late_reader.set()
+
+    with lock.read():
+        thread = threading.Thread(target=writer)
+        thread.start()
+        assert not entered.wait(0.1)
+        with lock.read():  # nested reads do not wait, even behind a waiting writer
+            pass
+        # New readers queue behind the waiting writer
+        other = threading.Thread(target=reader)
+        other.start()
+        assert not late_reader.wait(0.1)
+    thread.join(5)
+    other.join(5)
+    assert entered.is_set() and late_reader.is_set()
+
+    with lock.write():
+        with lock.write(), lock.read():  # the writer may re-enter and read
+            pass
+
+def test_queries_run_safely_during_concurrent_rebuilds(graph_service_instance):
+    service, pid = graph_service_instance, "live"
+    def rebuild(n):
+        with service.lock(pid).write():
+            for i in range(n):
+                service.update_dependency_graph(pid, FileStructure(
+                    file_path=f"m{i}.py",
+                    imports=[ImportInfo(module=f"m{j}", type="local_absolute") for j in range(i)][-3:]
+                ))
+            service.build_edges(pid)
+            service.build_module_tree(pid)
+    rebuild(5)
+
+    errors = []
+    done = threading.Event()
+    def reader():
+        while not done.is_set():
+            try:
+                service.get_impact(pid, "m0.py")
+                service.get_neighbors(pid, "m1.py", direction="both", depth=3)
+                with service.lock(pid).read():
+                    tree = service.get_module_tree(pid)
+                    paths = service.get_tree_paths(pid)
+                    assert all(child["id"] in paths for child in tree["children"])
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in readers:
+        thread.start()
+    try:
+        for n in range(6, 40):
+            rebuild(n)
+    finally:
+        done.set()
+        for thread in readers:
+            thread.join()
+    assert errors == []
+    assert len(service.get_impact(pid, "m0.py")) == 38
@@ -0,0 +1,92 @@
+import random
+import numpy as np
+import networkx as nx
+import pytest
+from networkx.algorithms.link_analysis.pagerank_alg import _pagerank_python
+from backend.app.services.graph_index import (
+    CSRGraph, pagerank, strongly_connected_components, reachability_counts
+)
+from backend.app.services.graph import GraphService
+from backend.app.schemas import FileStructure, ImportInfo
+
+@pytest.fixture
+def random_graph():
+    rng = random.Random(7)
+    g = nx.DiGraph()
+    g.add_nodes_from(f"n{i}" for i in range(60))
+    for _ in range(150):
+        g.add_edge(f"n{rng.randrange(60)}", f"n{rng.randrange(60)}")
+    return g
+
+def test_csr_matches_graph(random_graph):
+    csr = CSRGraph.from_graph(random_graph)
+    assert csr.num_edges == random_graph.number_of_edges()
+    for node in random_graph:
+        i = csr.index[node]
+        assert {csr.nodes[j] for j in csr.successors(i)} == set(random_graph.successors(node))
+
+    transposed = csr.transpose()
+    for node in random_graph:
+        i = csr.index[node]
+        assert {csr.nodes[j] for j in transposed.successors(i)} == set(random_graph.predecessors(node))
+
+def test_pagerank_matches_networkx(random_graph):
+    csr = CSRGraph.from_graph(random_graph)
+    ranks = pagerank(csr)
+    expected = _pagerank_python(random_graph, tol=1e-12)
+    for node, score in zip(csr.nodes, ranks):
+        assert score == pytest.approx(expected[node], abs=1e-6)
+
+    # Warm start converges to the same fixpoint
+    assert np.allclose(pagerank(csr, initial=ranks), ranks, atol=1e-9)
+
+def test_sccs_and_reachability_match_networkx(random_graph):
+    csr = CSRGraph.from_graph(random_graph)
+    component, count = strongly_connected_components(csr)
+
+    expected = {frozenset(c) for c in nx.strongly_connected_components(random_graph)}
+    got = {}
+    for node, c in zip(csr.nodes, component):
+        got.setdefault(c, set()).add(node)
+    assert count == len(expected)
+    assert {frozenset(c) for c in got.values()} == expected
+    # Reverse topological numbering: edges never point to a higher component
+    for u, v in random_graph.edges():
+        assert component[csr.index[u]] >= component[csr.index[v]]
+
+    counts = reachability_counts(csr, component, count)
+    for node in random_graph:
+        assert counts[csr.index[node]] == len(nx.descendants(random_graph, node))
+
+def test_scc_handles_long_chains_without_recursion():
+    nodes = [f"m{i}" for i in range(5000)]
+    csr = CSRGraph.from_edges(nodes, list(zip(nodes, nodes[1:])) + [(nodes[-1], nodes[0])])
+    component, count = strongly_connected_components(csr)
+    assert count == 1
+
+def test_analytics_are_persisted_and_reused(tmp_path):
+    service = GraphService(base_path=str(tmp_path))
+    for name, deps in {"a": ["b"], "b": ["c"], "c": ["a"], "d": ["a"]}.items():
+        service.update_dependency_graph("p", FileStructure(
+            file_path=f"{name}.py", imports=[ImportInfo(module=d, type="local_absolute") for d in deps]
+        ))
+    service.build_edges("p")
+
+    analytics = service.compute_analytics("p")
+    assert analytics["cycles"] == [["a.py", "b.py", "c.py"]]
+    assert analytics["depends_on"]["d.py"] == 3
+    assert analytics["depended_by"]["d.py"] == 0
+    assert analytics["depended_by"]["a.py"] == 3
+    assert max(analytics["pagerank"], key=analytics["pagerank"].get) != "d.py"
+
+    # Unchanged edges: served as-is from a fresh service, no recompute
+    reloaded = GraphService(base_path=str(tmp_path))
+    assert reloaded.compute_analytics("p") == analytics
+    assert reloaded.compute_node_importance("p") == analytics["pagerank"]
+
+    # Breaking the cycle changes the fingerprint
+    reloaded.remove_file("p", "c.py")
+    reloaded.build_edges("p", file_ids=["b.py"])
+    updated = reloaded.compute_analytics("p")
+    assert updated["fingerprint"] != analytics["fingerprint"]
+    assert updated["cycles"] == []
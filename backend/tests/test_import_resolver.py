@@ -0,0 +1,115 @@
+from backend.app.services.import_resolver import ImportResolver
+
+def make_resolver(*files):
+    module_index = {}
+    for f in files:
+        module = f[:-3].replace("/", ".")
+        module_index[module] = f
+        if module.endswith(".__init__"):
+            module_index[module[:-9]] = f
+    return ImportResolver(module_index)
+
+def test_compile_keeps_only_local_imports():
+    imports = [
+        {"module": "os", "name": None, "alias": None, "type": "stdlib"},
+        {"module": "requests", "name": None, "alias": None, "type": "third_party"},
+        {"module": ".utils", "name": "helper", "alias": None, "type": "local_relative"},
+        {"module": "app.core", "name": None, "alias": None, "type": "local_absolute"},
+    ]
+    assert ImportResolver.compile(imports) == (("local_relative", ".utils"), ("local_absolute", "app.core"))
+
+def test_relative_candidates():
+    resolver = make_resolver()
+    current = "app/services/graph.py"
+    assert resolver.candidate(current, "local_relative", ".parser") == "app.services.parser"
+    assert resolver.candidate(current, "local_relative", "..schemas") == "app.schemas"
+    assert resolver.candidate(current, "local_relative", ".") == "app.services"
+    # Going above the root stops at the root
+    assert resolver.candidate(current, "local_relative", "....x") == "x"
+    assert resolver.candidate(current, "local_relative", "parser") is None
+    assert resolver.candidate("main.py", "local_relative", ".app") == "app"
+
+def test_candidates_are_memoised_per_package():
+    resolver = make_resolver()
+    resolver.candidate("app/a.py", "local_relative", ".x")
+    resolver.candidate("app/b.py", "local_relative", ".x")
+    assert list(resolver._candidates) == [("app", ".x")]
+
+def test_resolve_file_and_waiting_importers():
+    resolver = make_resolver("app/__init__.py", "app/main.py")
+    resolver.set_imports("app/main.py", (("local_relative", "."), ("local_absolute", "app.models")))
+    resolver.set_imports("app/other.py", (("local_relative", ".main"),))
+
+    assert resolver.resolve_file("app/main.py") == (["app/__init__.py"], 1)
+    assert resolver.resolve_file("app/other.py") == (["app/main.py"], 0)
+    assert resolver.is_tracked("app/main.py")
+    assert resolver.newly_resolvable() == set()
+
+    resolver.module_index["app.models"] = "app/models.py"
+    assert resolver.newly_resolvable() == {"app/main.py"}
+    assert resolver.resolve_file("app/main.py") == (["app/__init__.py", "app/models.py"], 0)
+    assert resolver.newly_resolvable() == set()
+
+    resolver.forget("app/main.py")
+    assert not resolver.is_tracked("app/main.py") and not resolver.has_imports("app/main.py")
+
+def test_parse_jsonc_keeps_comment_markers_inside_strings():
+    from backend.app.services.import_resolver import parse_jsonc
+    text = '{\n  // comment\n  "paths": {"@/*": ["./*",], /* block */},\n}'
+    assert parse_jsonc(text) == {"paths": {"@/*": ["./*"]}}
+
+def test_load_path_aliases_follows_extends(tmp_path):
+    from backend.app.services.import_resolver import load_path_aliases
+    (tmp_path / "web").mkdir()
+    (tmp_path / "tsconfig.base.json").write_text('{"compilerOptions": {"baseUrl": "web", "paths": {"~lib/*": ["lib/*"]}}}')
+    (tmp_path / "web" / "tsconfig.json").write_text('{"extends": "../tsconfig.base", "compilerOptions": {"paths": {"@/*": ["./src/*"]}}}')
+    (tmp_path / "other.json").write_text("{not json")
+
+    aliases = load_path_aliases(str(tmp_path), ["web/tsconfig.json", "other.json"])
+    assert aliases == {"web": {"base_url": "web", "paths": {"@/*": ["web/src/*"]}}}
+
+def test_js_specifiers_resolve_through_paths_and_base_url():
+    aliases = {"web": {"base_url": "web", "paths": {"@/*": ["web/src/*"], "@config": ["web/config/index.ts"]}}}
+    resolver = ImportResolver({
+        "/web/src/lib/api": "web/src/lib/api.ts",
+        "/web/config/index": "web/config/index.ts",
+        "/web/config": "web/config/index.ts",
+        "/web/shared/util": "web/shared/util.js",
+        "/web/src/components/Tree": "web/src/components/Tree.tsx",
+    }, aliases)
+    page = "web/src/app/page.tsx"
+    resolver.set_imports(page, ImportResolver.compile([
+        {"module": "../lib/api.js", "type": "local_relative"},
+        {"module": "@/components/Tree", "type": "third_party"},
+        {"module": "@config", "type": "third_party"},
+        {"module": "shared/util", "type": "third_party"},
+        {"module": "react", "type": "third_party"},
+        {"module": "./page.css", "type": "local_relative"},
+        {"module": "@/missing", "type": "third_party"},
+        {"module": "./gone", "type": "local_relative"},
+    ], page))
+
+    targets, unresolved = resolver.resolve_file(page)
+    assert targets == ["web/src/lib/api.ts", "web/src/components/Tree.tsx", "web/config/index.ts", "web/shared/util.js"]
+    # Packages and stylesheets do not count; a missing alias target and relative module do
+    assert unresolved == 2
+    assert resolver.js_candidates(page, "./gone") == (("/web/src/app/gone",), True)
+    assert resolver.js_candidates("elsewhere/a.ts", "react") == ((), False)
+
+def test_resolve_symbol_through_imports():
+    resolver = make_resolver("app/models/__init__.py", "app/models/base.py", "app/views.py")
+    imports = [
+        {"module": ".models.base", "name": "Base", "alias": "B", "type": "local_relative"},
+        {"module": "app", "name": "models", "alias": None, "type": "local_absolute"},
+        {"module": "app.models.base", "name": None, "alias": "mb", "type": "local_absolute"},
+        {"module": "collections", "name": "OrderedDict", "alias": None, "type": "stdlib"},
+    ]
+    current = "app/views.py"
+    assert resolver.resolve_symbol(current, "B", imports) == ("app/models/base.py", "Base")
+    assert resolver.resolve_symbol(current, "models.base.Base", imports) == ("app/models/base.py", "Base")
+    assert resolver.resolve_symbol(current, "mb.Base", imports) == ("app/models/base.py", "Base")
+    assert resolver.resolve_symbol(current, "models.Registry", imports) == ("app/models/__init__.py", "Registry")
+    # Unbound names are local; stdlib, third-party and unknown modules do not resolve
+    assert resolver.resolve_symbol(current, "View", imports) == ("app/views.py", "View")
+    assert resolver.resolve_symbol(current, "OrderedDict", imports) is None
+    assert resolver.resolve_symbol(current, "django.db.Model", imports) is None
@@ -4,6 +4,9 @@ import pytest
 import tempfile
 from unittest.mock import MagicMock, patch
 from backend.app.services.ingestion import IngestionService
+from backend.app.services.graph import GraphService
+from backend.app.services.manifest import ManifestStore
+from backend.app.services.lexical import LexicalIndexService
 
 @pytest.fixture
 def ingestion_service(tmp_path):
@@ -14,6 +17,11 @@ def ingestion_service(tmp_path):
         # Mock storage and graph services
         service.storage = MagicMock()
         service.graph_service = MagicMock()
+        service.manifest_store = ManifestStore(base_path=str(tmp_path / "manifests"))
+        service.lexical_index = LexicalIndexService(base_path=str(tmp_path / "symbols"))
+        # No network: checkouts come from a mocked mirror cache
+        service.mirror_cache = MagicMock()
+        service.mirror_cache.checkout.return_value = "0" * 40
         
         # Mock internal graph stats
         service.graph_service._get_or_create_graph.return_value = MagicMock()
@@ -88,8 +96,197 @@ def test_ingest_project_flow(ingestion_service):
     
     assert stats['repo_url'] == repo_url
     assert 'project_id' in stats
+    assert stats['commit'] == "0" * 40
+    assert ingestion_service.mirror_cache.checkout.call_args.args[0] == repo_url
     project_id = stats['project_id']
     
-    # Verify cleanup calls
-    ingestion_service.storage.delete_collection.assert_called_with(project_id)
+    # Verify cleanup calls: the default revision's graph and symbol index are rebuilt;
+    # the chunk collection is shared by all revisions and is not dropped
     ingestion_service.graph_service.delete_graph.assert_called_with(project_id)
+    ingestion_service.storage.delete_collection.assert_not_called()
+
+def test_incremental_reingest_only_touches_changed_files(ingestion_service, test_repo_dir, tmp_path):
+    # Real graph so edges can be checked; storage stays mocked
+    ingestion_service.graph_service = GraphService(base_path=str(tmp_path / "graphs"))
+    project_id = "incr_proj"
+
+    create_file(test_repo_dir, "app/utils.py", "def helper(): pass")
+    create_file(test_repo_dir, "main.py", "from app.utils import helper\ndef run(): pass")
+    create_file(test_repo_dir, "old.py", "def legacy(): pass")
+    ingestion_service.ingest_directory(str(test_repo_dir), project_id)
+
+    manifest = ingestion_service.manifest_store.load(project_id)
+    assert set(manifest) == {"app/utils.py", "main.py", "old.py"}
+    old_chunk_ids = manifest["old.py"]["chunk_ids"]
+    assert old_chunk_ids
+
+    # Modify one file, delete one, add one
+    create_file(test_repo_dir, "app/utils.py", "def helper(): pass\ndef extra(): pass")
+    os.remove(test_repo_dir / "old.py")
+    create_file(test_repo_dir, "new.py", "def fresh(): pass")
+
+    ingestion_service.storage.reset_mock()
+    with patch.object(ingestion_service.chunker, "chunk_and_structure",
+                      wraps=ingestion_service.chunker.chunk_and_structure) as spy:
+        stats = ingestion_service.ingest_directory(str(test_repo_dir), project_id, incremental=True)
+
+    chunked = {call.kwargs["rel_path"] for call in spy.call_args_list}
+    assert chunked == {"app/utils.py", "new.py"}
+    assert stats["files_unchanged"] == 1
+    assert stats["files_deleted"] == 1
+
+    ingestion_service.storage.delete_chunks.assert_called_once()
+    deleted_ids = ingestion_service.storage.delete_chunks.call_args[0][1]
+    assert set(old_chunk_ids) <= set(deleted_ids)
+
+    g = ingestion_service.graph_service._get_or_create_graph(project_id)
+    assert not g.has_node("old.py")
+    assert g.has_node("new.py::fresh")
+    assert g.has_node("app/utils.py::extra")
+    # main.py was not re-parsed but its import of the modified file is re-linked
+    assert g.has_edge("main.py", "app/utils.py")
+
+def test_incremental_falls_back_to_full_without_manifest(ingestion_service):
+    repo_url = "https://github.com/fake/repo.git"
+    ingestion_service.ingest_directory = MagicMock(return_value={"files_processed": 5})
+
+    stats = ingestion_service.ingest_project(repo_url, incremental=True)
+
+    ingestion_service.graph_service.delete_graph.assert_called_with(stats['project_id'])
+    ingestion_service.ingest_directory.assert_called_once()
+    assert ingestion_service.ingest_directory.call_args.kwargs["incremental"] is False
+
+def test_parallel_ingestion_matches_serial(ingestion_service, test_repo_dir, tmp_path):
+    for i in range(6):
+        create_file(test_repo_dir, f"pkg/mod{i}.py", f"class C{i}:\n    def m(self): pass\n\ndef f{i}(): pass\n")
+    create_file(test_repo_dir, "docs/guide.md", "# Guide\nSome text.")
+
+    results = {}
+    for workers in (1, 2):
+        ingestion_service.storage.reset_mock()
+        ingestion_service.graph_service = GraphService(base_path=str(tmp_path / f"graphs_{workers}"))
+        ingestion_service.ingest_directory(str(test_repo_dir), f"par_{workers}", workers=workers)
+        saved = [c for call in ingestion_service.storage.save_chunks.call_args_list for c in call[0][1]]
+        graph = ingestion_service.graph_service._get_or_create_graph(f"par_{workers}")
+        results[workers] = ([c["id"] for c in saved], sorted(graph.nodes))
+
+    # Same chunk IDs in the same order, same graph
+    assert results[1] == results[2]
+
+def test_chunks_are_written_in_bounded_batches(ingestion_service, test_repo_dir):
+    for i in range(5):
+        create_file(test_repo_dir, f"m{i}.py", "def a(): pass\ndef b(): pass\n")
+    ingestion_service.upsert_batch_size = 3
+
+    stats = ingestion_service.ingest_directory(str(test_repo_dir), "batched")
+
+    batch_sizes = [len(call[0][1]) for call in ingestion_service.storage.save_chunks.call_args_list]
+    assert sum(batch_sizes) == stats["chunks_generated"] == 10
+    assert max(batch_sizes) <= 3
+    assert stats["upsert_batches"] == len(batch_sizes)
+
+def test_ingestion_maintains_symbol_index(ingestion_service, test_repo_dir):
+    create_file(test_repo_dir, "main.py", "def hello():\n    pass\n")
+    ingestion_service.ingest_directory(test_repo_dir, "sym")
+    reloaded = LexicalIndexService(base_path=ingestion_service.lexical_index.base_path)
+    hits = reloaded.search("sym", "hello")
+    assert hits and hits[0]["match"] == "exact"
+    assert hits[0]["metadata"]["file_path"] == "main.py"
+
+    # Incremental: the removed function drops out of the index
+    create_file(test_repo_dir, "main.py", "def goodbye():\n    pass\n")
+    ingestion_service.ingest_directory(test_repo_dir, "sym", incremental=True)
+    assert ingestion_service.lexical_index.search("sym", "hello") == []
+    assert ingestion_service.lexical_index.search("sym", "goodbye")[0]["match"] == "exact"
+
+def test_ingestion_reports_skipped_files(ingestion_service, test_repo_dir):
+    create_file(test_repo_dir, ".gitignore", "generated/\n")
+    create_file(test_repo_dir, "generated/client.py", "def gen(): pass")
+    create_file(test_repo_dir, "app.min.js", "var a=1;")
+    create_file(test_repo_dir, "valid.py", "def ok(): pass")
+
+    stats = ingestion_service.ingest_directory(str(test_repo_dir), "test_skipped")
+
+    assert stats['files_processed'] == 1
+    assert stats['scan']['dirs_ignored'] == 1
+    assert stats['scan']['skipped']['minified'] == 1
+    assert stats['files_skipped'] == 2  # app.min.js and the .gitignore itself
+
+@pytest.fixture
+def revision_service(tmp_path):
+    from backend.app.services.storage import VectorStorage
+    from backend.app.services.embeddings import EmbeddingEngine, EmbeddingCache, HashEmbeddingBackend
+    embedder = EmbeddingEngine(HashEmbeddingBackend(), cache=EmbeddingCache(str(tmp_path / "cache.db")))
+    return IngestionService(
+        workers=1,
+        storage=VectorStorage(persistence_path=str(tmp_path / "chromadb"), embedder=embedder),
+        graph_service=GraphService(base_path=str(tmp_path / "graphs")),
+        manifest_store=ManifestStore(base_path=str(tmp_path / "manifests")),
+        lexical_index=LexicalIndexService(base_path=str(tmp_path / "symbols")),
+    )
+
+def test_revisions_share_unchanged_chunks(revision_service, test_repo_dir):
+    create_file(test_repo_dir, "core.py", "def stable():\n    return 1\n")
+    create_file(test_repo_dir, "feature.py", "def feature():\n    return 'v1'\n")
+    main = revision_service.ingest_directory(str(test_repo_dir), "proj", commit="a" * 40)
+    assert main["chunks_reused"] == 0
+
+    create_file(test_repo_dir, "feature.py", "def feature():\n    return 'v2'\n")
+    branch = revision_service.ingest_directory(str(test_repo_dir), "proj", ref="dev", commit="b" * 40)
+    # Only the changed file produced new chunks; core.py's are shared with the default revision
+    assert branch["chunks_reused"] == 1
+    assert revision_service.storage.get_collection("proj").count() == 3
+
+    store = revision_service.manifest_store
+    assert store.resolve_revision("proj") == "proj"
+    assert store.resolve_revision("proj", "dev") == "proj@dev"
+    assert store.resolve_revision("proj", "bbbbbbb") == "proj@dev"
+    assert store.resolve_revision("proj", "ccccccc") is None
+
+    # Each revision sees only its own version of feature.py
+    storage = revision_service.storage
+    for key, marker in (("proj", "v1"), ("proj@dev", "v2")):
+        results = storage.query_code("proj", "feature", n_results=10, revision=key)
+        contents = {r["metadata"]["file_path"]: r["content"] for r in results}
+        assert set(contents) == {"core.py", "feature.py"}
+        assert marker in contents["feature.py"]
+        assert not any(k.startswith("rev_") for r in results for k in r["metadata"])
+
+def test_index_without_revisions_is_rebuilt_from_scratch(revision_service, test_repo_dir):
+    create_file(test_repo_dir, "core.py", "def stable():\n    return 1\n")
+    # Chunk it the way ingest does, then store it as an index from before revisions did
+    chunks, _ = revision_service.chunker.chunk_and_structure(str(test_repo_dir / "core.py"), rel_path="core.py")
+    storage = revision_service.storage
+    storage.save_chunks("proj", chunks + [{"id": "orphan", "content": "def gone(): pass",
+                                           "metadata": {"file_path": "gone.py", "type": "code"}}])
+    revision_service.manifest_store.save("proj", {
+        "core.py": {"sha": "0" * 40, "chunk_ids": [c["id"] for c in chunks]},
+        "gone.py": {"sha": "1" * 40, "chunk_ids": ["orphan"]},
+    })
+    assert revision_service.manifest_store.load_revisions("proj") == {}
+
+    stats = revision_service.ingest_directory(str(test_repo_dir), "proj", incremental=True, commit="a" * 40)
+    # Nothing is reused from the old collection; every chunk is written with its revision field
+    assert stats["chunks_reused"] == 0
+    assert stats["files_processed"] == 1
+    assert storage.get_collection("proj").count() == len(chunks)
+    results = storage.query_code("proj", "stable", n_results=10, revision="proj")
+    assert [r["metadata"]["file_path"] for r in results] == ["core.py"]
+    assert list(revision_service.manifest_store.load_revisions("proj")) == ["HEAD"]
+
+def test_clearing_a_revision_keeps_shared_chunks(revision_service, test_repo_dir):
+    create_file(test_repo_dir, "core.py", "def stable():\n    return 1\n")
+    create_file(test_repo_dir, "feature.py", "def feature():\n    return 'v1'\n")
+    revision_service.ingest_directory(str(test_repo_dir), "proj", commit="a" * 40)
+    create_file(test_repo_dir, "feature.py", "def feature():\n    return 'v2'\n")
+    revision_service.ingest_directory(str(test_repo_dir), "proj", ref="dev", commit="b" * 40)
+
+    # Only the chunk no other revision references is deleted
+    assert revision_service.clear_project("proj", ref="dev") == 1
+    assert revision_service.storage.get_collection("proj").count() == 2
+    assert list(revision_service.manifest_store.load_revisions("proj")) == ["HEAD"]
+    results = revision_service.storage.query_code("proj", "stable", n_results=10, revision="proj@dev")
+    assert results == []
+
+    assert revision_service.clear_project("proj") == 2
+    assert revision_service.manifest_store.load_revisions("proj") == {}
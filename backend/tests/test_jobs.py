@@ -0,0 +1,130 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from backend.app.services.jobs import JobManager, IngestionJob, IngestionCancelled
+from backend.app.services.ingestion import IngestionService
+from backend.app.services.manifest import ManifestStore
+from backend.app.services.lexical import LexicalIndexService
+from backend.app.schemas import JobState, JobPhase
+
+class FakeIngestionService:
+    """Blocks inside ingest_project until released, polling for cancellation like the real pipeline."""
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+    def _generate_project_id(self, repo_url):
+        return f"pid-{repo_url}"
+
+    def ingest_project(self, repo_url, incremental=False, job=None, ref=None):
+        self.calls.append(repo_url)
+        self.started.set()
+        job.set_phase(JobPhase.PARSING)
+        while not self.release.wait(0.01):
+            job.raise_if_cancelled()
+        job.update(files_parsed=3)
+        return {"files_processed": 3}
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+@pytest.fixture
+def fake_service():
+    return FakeIngestionService()
+
+@pytest.fixture
+def manager(fake_service):
+    m = JobManager(fake_service, max_workers=1)
+    yield m
+    fake_service.release.set()
+    m.shutdown(wait=True)
+
+def test_job_runs_in_background_and_reports_stats(manager, fake_service):
+    job = manager.submit("repo-a")
+    assert fake_service.started.wait(5)
+    assert manager.get(job.id).state == JobState.RUNNING
+    assert job.phase == JobPhase.PARSING
+
+    fake_service.release.set()
+    assert wait_for(lambda: job.is_finished)
+
+    status = job.to_dict()
+    assert status["state"] == JobState.SUCCEEDED
+    assert status["stats"] == {"files_processed": 3}
+    assert status["progress"]["files_parsed"] == 3
+    assert status["project_id"] == "pid-repo-a"
+
+def test_cancel_running_job(manager, fake_service):
+    job = manager.submit("repo-a")
+    assert fake_service.started.wait(5)
+
+    manager.cancel(job.id)
+    assert wait_for(lambda: job.is_finished)
+    assert job.state == JobState.CANCELLED
+
+def test_concurrency_cap_and_queued_cancel(manager, fake_service):
+    first = manager.submit("repo-a")
+    second = manager.submit("repo-b")
+    assert fake_service.started.wait(5)
+
+    # Only one worker: the second job waits in the queue
+    assert second.state == JobState.QUEUED
+    manager.cancel(second.id)
+    assert second.state == JobState.CANCELLED
+
+    fake_service.release.set()
+    assert wait_for(lambda: first.is_finished)
+    assert fake_service.calls == ["repo-a"]
+
+def test_resubmitting_active_project_returns_same_job(manager, fake_service):
+    job = manager.submit("repo-a")
+    assert manager.submit("repo-a") is job
+
+def test_job_listing_is_safe_while_jobs_are_submitted_and_pruned(fake_service):
+    fake_service.release.set()
+    manager = JobManager(fake_service, max_workers=4, max_finished_jobs=5)
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            try:
+                for job in manager.list_jobs():
+                    manager.get(job.id)
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(300):
+            manager.submit(f"repo-{i}")
+    finally:
+        done.set()
+        thread.join()
+        manager.shutdown(wait=True)
+    assert errors == []
+
+def test_ingest_directory_honours_cancellation(tmp_path):
+    service = IngestionService()
+    service.storage = MagicMock()
+    service.graph_service = MagicMock()
+    service.manifest_store = ManifestStore(base_path=str(tmp_path / "manifests"))
+    service.lexical_index = LexicalIndexService(base_path=str(tmp_path / "symbols"))
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("def a(): pass\n")
+
+    job = IngestionJob("repo", "pid")
+    job.cancel()
+    with pytest.raises(IngestionCancelled):
+        service.ingest_directory(str(repo), "pid", job=job)
+    service.graph_service.build_edges.assert_not_called()
@@ -0,0 +1,68 @@
+import pytest
+from backend.app.services.lexical import SymbolIndex, LexicalIndexService, tokenize, reciprocal_rank_fusion
+
+def chunk(chunk_id, name, file_path, content=""):
+    return {"id": chunk_id, "content": content, "metadata": {"name": name, "file_path": file_path}}
+
+@pytest.fixture
+def index():
+    idx = SymbolIndex()
+    idx.add_chunks([
+        chunk("a", "build_module_tree", "app/services/graph.py", "def build_module_tree(self): tree = {}"),
+        chunk("b", "build_edges", "app/services/graph.py", "def build_edges(self): resolve imports"),
+        chunk("c", "ImportInfo", "app/schemas.py", "class ImportInfo(BaseModel): module: str"),
+        chunk("d", "README.md", "README.md", "How the module tree is built"),
+    ])
+    return idx
+
+def test_tokenize_splits_compound_identifiers():
+    assert tokenize("build_module_tree") == ["build_module_tree", "build", "module", "tree"]
+    assert tokenize("ImportInfo") == ["importinfo", "import", "info"]
+
+def test_exact_and_prefix_lookup(index):
+    assert index.lookup("BUILD_MODULE_TREE") == ["a"]
+    assert index.lookup("build_", prefix=True) == ["b", "a"]
+    assert index.lookup("build_") == []
+
+def test_search_ranks_exact_then_prefix_then_bm25(index):
+    results = index.search("ImportInfo")
+    assert results[0]["id"] == "c"
+    assert results[0]["match"] == "exact"
+
+    results = index.search("build")
+    assert {r["id"] for r in results if r["match"] == "prefix"} == {"a", "b"}
+
+    results = index.search("module tree")
+    assert results[0]["id"] == "a"
+    assert all(r["match"] == "bm25" for r in results)
+
+def test_dotted_query_matches_last_component(index):
+    assert index.search("schemas.ImportInfo")[0]["id"] == "c"
+
+def test_remove_and_replace_chunks(index):
+    index.remove_chunks(["a"])
+    assert index.lookup("build_module_tree") == []
+    assert "a" not in index.postings.get("tree", {})
+
+    index.add_chunks([chunk("b", "link_edges", "app/services/graph.py")])
+    assert index.lookup("build_edges") == []
+    assert index.lookup("link_edges") == ["b"]
+    assert len(index) == 3
+
+def test_service_persists_and_reloads(tmp_path, index):
+    service = LexicalIndexService(base_path=str(tmp_path))
+    service.indexes["p"] = index
+    service.save_index("p")
+
+    reloaded = LexicalIndexService(base_path=str(tmp_path))
+    assert reloaded.search("p", "build_edges")[0]["id"] == "b"
+
+    reloaded.delete_index("p")
+    assert LexicalIndexService(base_path=str(tmp_path)).search("p", "build_edges") == []
+
+def test_reciprocal_rank_fusion_merges_by_id():
+    vector = [{"id": "x", "content": "X", "distance": 0.1}, {"id": "y", "content": "Y", "distance": 0.2}]
+    lexical = [{"id": "y", "match": "exact"}, {"id": "z", "match": "bm25"}]
+    fused = reciprocal_rank_fusion([vector, lexical])
+    assert [r["id"] for r in fused] == ["y", "x", "z"]
+    assert fused[0]["distance"] == 0.2 and fused[0]["match"] == "exact"
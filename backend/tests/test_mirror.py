@@ -0,0 +1,102 @@
+import os
+import pytest
+import git
+from unittest.mock import MagicMock, patch
+from backend.app.services.mirror import MirrorCache
+from backend.app.services.ingestion import IngestionService
+from backend.app.services.manifest import ManifestStore
+from backend.app.services.lexical import LexicalIndexService
+
+AUTHOR = git.Actor("Test", "test@example.com")
+
+def commit_files(repo, files, message):
+    for name, content in files.items():
+        path = os.path.join(repo.working_tree_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    repo.index.add(list(files))
+    return repo.index.commit(message, author=AUTHOR, committer=AUTHOR).hexsha
+
+@pytest.fixture
+def origin(tmp_path):
+    """A work repo plus the bare repo it pushes to; the bare one is the ingest source."""
+    work = git.Repo.init(tmp_path / "work")
+    first = commit_files(work, {"app.py": "def one(): pass\n"}, "first")
+    bare = tmp_path / "origin.git"
+    git.Repo.clone_from(work.working_tree_dir, bare, bare=True)
+    work.create_remote("bare", str(bare))
+    return {"work": work, "url": f"file://{bare}", "first": first}
+
+def test_checkout_clones_mirror_then_fetches(origin, tmp_path):
+    cache = MirrorCache(base_path=str(tmp_path / "mirrors"))
+    target = tmp_path / "checkout"
+
+    commit = cache.checkout(origin["url"], str(target))
+    assert commit == origin["first"]
+    assert (target / "app.py").read_text() == "def one(): pass\n"
+    mirror = git.Repo(cache.mirror_path(origin["url"]))
+    assert mirror.bare
+
+    work = origin["work"]
+    second = commit_files(work, {"app.py": "def two(): pass\n", "lib/util.py": "x = 1\n"}, "second")
+    work.git.push("bare", f"{work.active_branch.name}")
+
+    with patch("git.Repo.clone_from", wraps=git.Repo.clone_from) as clone:
+        commit = cache.checkout(origin["url"], str(target))
+    # Only the work tree was cloned (from the mirror); the remote was fetched, not re-cloned
+    assert [c.args[0] for c in clone.call_args_list] == [cache.mirror_path(origin["url"])]
+    assert commit == second
+    assert (target / "lib" / "util.py").exists()
+
+    # Older commits stay available from the mirror
+    assert cache.checkout(origin["url"], str(target), ref=origin["first"]) == origin["first"]
+    assert not (target / "lib").exists()
+
+def test_broken_mirror_is_recloned(origin, tmp_path):
+    cache = MirrorCache(base_path=str(tmp_path / "mirrors"))
+    os.makedirs(cache.mirror_path(origin["url"]))
+    assert cache.checkout(origin["url"], str(tmp_path / "checkout")) == origin["first"]
+
+def test_least_recently_used_mirrors_are_evicted(origin, tmp_path):
+    other = tmp_path / "other.git"
+    git.Repo.clone_from(origin["url"], other, bare=True)
+    cache = MirrorCache(base_path=str(tmp_path / "mirrors"))
+
+    cache.checkout(origin["url"], str(tmp_path / "a"))
+    cache.checkout(f"file://{other}", str(tmp_path / "b"))
+    # Make the first mirror clearly the older one
+    os.utime(cache.mirror_path(origin["url"]), (0, 0))
+    sizes = {path: size for path, _, size in cache.entries()}
+    assert len(sizes) == 2
+
+    cache.max_bytes = max(sizes.values())
+    assert cache.evict() == [cache.mirror_path(origin["url"])]
+    assert os.path.isdir(cache.mirror_path(f"file://{other}"))
+
+    # The mirror being used is kept even if it alone exceeds the budget
+    cache.max_bytes = 0
+    cache.checkout(origin["url"], str(tmp_path / "a"))
+    assert [p for p, _, _ in cache.entries()] == [cache.mirror_path(origin["url"])]
+
+def test_ingest_project_from_local_bare_repo(origin, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = IngestionService(
+        storage=MagicMock(),
+        graph_service=MagicMock(),
+        manifest_store=ManifestStore(base_path=str(tmp_path / "manifests")),
+        lexical_index=LexicalIndexService(base_path=str(tmp_path / "symbols")),
+        mirror_cache=MirrorCache(base_path=str(tmp_path / "mirrors")),
+    )
+    seen = {}
+    def fake_ingest(path, project_id, **kwargs):
+        seen["files"] = sorted(os.listdir(path))
+        return {"files_processed": 1}
+    service.ingest_directory = fake_ingest
+
+    stats = service.ingest_project(origin["url"])
+    assert stats["commit"] == origin["first"]
+    assert "app.py" in seen["files"]
+    # The checkout is temporary; the mirror persists
+    assert os.listdir(tmp_path / "temp_repos") == []
+    assert os.path.isdir(service.mirror_cache.mirror_path(origin["url"]))
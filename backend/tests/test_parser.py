@@ -1,3 +1,4 @@
+import os
 import pytest
 from backend.app.services.parser import CodeParser
 from backend.app.schemas import FileStructure, ImportInfo
@@ -115,3 +116,82 @@ function globalFunc() {
     assert 'UserManager' in class_names
     assert 'globalFunc' in func_names
     # Interfaces might not be captured as classes
+
+def test_extract_returns_structure_and_definitions(parser):
+    code = """
+class Outer:
+    def inner(self):
+        pass
+"""
+    structure, definitions = parser.extract(code, 'python', 'outer.py')
+
+    assert [c.name for c in structure.classes] == ['Outer']
+    assert [(d['type'], d['name']) for d in definitions] == [
+        ('class_definition', 'Outer'),
+        ('function_definition', 'inner'),
+    ]
+    assert definitions[0]['code'] == structure.classes[0].code
+
+def test_deeply_nested_code_does_not_recurse(parser):
+    depth = 3000
+    code = "x = " + "[" * depth + "]" * depth + "\ndef after():\n    pass\n"
+    structure = parser.extract_structure(code, 'python', 'deep.py')
+    assert [f.name for f in structure.functions] == ['after']
+
+def test_extract_ts_import_specifiers(parser):
+    code = """
+import api from './lib/api';
+import type { Node } from '@/lib/types';
+export { Tree } from "../components/Tree";
+const legacy = require('./legacy');
+const lazy = () => import('./lazy');
+import React from 'react';
+"""
+    structure = parser.extract_structure(code, "typescript", "app/page.ts")
+    assert [(i.module, i.type) for i in structure.imports] == [
+        ("./lib/api", "local_relative"),
+        ("@/lib/types", "third_party"),
+        ("../components/Tree", "local_relative"),
+        ("./legacy", "local_relative"),
+        ("./lazy", "local_relative"),
+        ("react", "third_party"),
+    ]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.mark.parametrize("rel_path", [
+    "backend/app/services/parser.py",
+    "backend/app/services/graph.py",
+    "frontend/lib/api.ts",
+    "frontend/components/CodemapTree.tsx",
+])
+def test_query_engine_matches_cursor_engine(rel_path):
+    query_parser, cursor_parser = CodeParser(engine="query"), CodeParser(engine="cursor")
+    with open(os.path.join(REPO_ROOT, rel_path), "r", encoding="utf-8") as f:
+        code = f.read()
+    language = query_parser.get_language_from_ext(rel_path)
+
+    assert language in query_parser.queries
+    structure, definitions = query_parser.extract(code, language, rel_path)
+    assert (structure, definitions) == cursor_parser.extract(code, language, rel_path)
+    assert structure.imports or definitions
+
+def test_query_engine_keeps_document_order(parser):
+    code = """
+import os
+def outer():
+    def inner():
+        pass
+from .b import c
+class A:
+    def method(self):
+        pass
+"""
+    assert parser.engine == "query"
+    structure = parser.extract_structure(code, "python", "m.py")
+    assert [i.module for i in structure.imports] == ["os", ".b"]
+    assert [f.name for f in structure.functions] == ["outer", "inner", "method"]
+
+def test_unknown_parser_engine():
+    with pytest.raises(ValueError):
+        CodeParser(engine="regex")
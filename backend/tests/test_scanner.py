@@ -0,0 +1,120 @@
+import os
+import pytest
+import git
+from backend.app.services.scanner import RepositoryScanner, ScanStats, IgnoreRules, parse_ignore_patterns
+
+def create_file(directory, name, content):
+    path = directory / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    mode = 'wb' if isinstance(content, bytes) else 'w'
+    with open(path, mode) as f:
+        f.write(content)
+    return str(path)
+
+def scan(root, **kwargs):
+    stats = ScanStats()
+    files = [rel for _, rel in RepositoryScanner(**kwargs).scan(str(root), stats)]
+    return files, stats
+
+@pytest.mark.parametrize("pattern,path,is_dir,expected", [
+    ("*.log", "a.log", False, True),
+    ("*.log", "deep/dir/a.log", False, True),
+    ("/build.txt", "build.txt", False, True),
+    ("/build.txt", "sub/build.txt", False, False),
+    ("docs/*.md", "docs/a.md", False, True),
+    ("docs/*.md", "docs/sub/a.md", False, False),
+    ("gen/", "gen", True, True),
+    ("gen/", "gen", False, False),
+    ("**/fixtures", "a/b/fixtures", True, True),
+    ("a/**/z.py", "a/z.py", False, True),
+    ("a/**/z.py", "a/b/c/z.py", False, True),
+    ("out/**", "out/x/y.js", False, True),
+    ("file?.txt", "file1.txt", False, True),
+    ("file[!0-9].txt", "file1.txt", False, False),
+    ("\\#hash", "#hash", False, True),
+])
+def test_ignore_pattern_semantics(tmp_path, pattern, path, is_dir, expected):
+    (tmp_path / ".gitignore").write_text(pattern + "\n")
+    assert IgnoreRules(str(tmp_path)).matches(path, is_dir=is_dir) is expected
+
+def test_parse_skips_comments_and_blank_lines():
+    rules = parse_ignore_patterns(["# comment\n", "\n", "   \n", "!keep.py\n"])
+    assert len(rules) == 1
+    assert rules[0][1] is True
+
+def test_walk_honours_nested_ignore_files_and_negation(tmp_path):
+    create_file(tmp_path, ".gitignore", "*.log\ngenerated/\n")
+    create_file(tmp_path, "app.py", "x = 1")
+    create_file(tmp_path, "debug.log", "log")
+    create_file(tmp_path, "generated/api.py", "y = 2")
+    create_file(tmp_path, "pkg/.gitignore", "!keep.log\n")
+    create_file(tmp_path, "pkg/keep.log", "kept")
+    create_file(tmp_path, "pkg/other.log", "dropped")
+    create_file(tmp_path, ".autowikiignore", "fixtures/\n!debug.log\n")
+    create_file(tmp_path, "tests/fixtures/sample.py", "z = 3")
+    create_file(tmp_path, "tests/test_app.py", "def test(): pass")
+
+    files, stats = scan(tmp_path, use_git=False)
+    # .autowikiignore overrides .gitignore in the same directory
+    assert files == ["app.py", "debug.log", "pkg/keep.log", "tests/test_app.py"]
+    assert stats.source == "walk"
+    assert stats.skipped["ignored"] == 4  # the three pattern files and pkg/other.log
+    assert stats.dirs_ignored == 2
+
+def test_size_limit_and_content_sniffing(tmp_path):
+    create_file(tmp_path, "small.py", "x = 1\n")
+    create_file(tmp_path, "huge.py", "x = 1\n" * 1000)
+    create_file(tmp_path, "blob.dat", b"abc\x00def")
+    create_file(tmp_path, "latin1.txt", "caf\xe9 au lait".encode("latin-1"))
+    create_file(tmp_path, "logo.png", b"\x89PNG")
+    create_file(tmp_path, "vendor.min.js", "var a=1;")
+    create_file(tmp_path, "bundle.js", "var a=1;" * 200)
+    create_file(tmp_path, "yarn.lock", "lock")
+    create_file(tmp_path, "long.md", "word " * 200)
+
+    files, stats = scan(tmp_path, use_git=False, max_file_size=2048)
+    assert files == ["long.md", "small.py"]
+    assert stats.skipped == {"ignored": 1, "unsupported": 0, "too_large": 1, "binary": 3, "minified": 2, "unreadable": 0}
+    assert stats.skipped_bytes["too_large"] == 6000
+    assert stats.to_dict()["files_skipped"] == 7
+
+def test_extension_filter_skips_files_without_opening_them(tmp_path, monkeypatch):
+    create_file(tmp_path, "app.py", "x = 1\n")
+    create_file(tmp_path, "README.md", "# Readme\n")
+    create_file(tmp_path, "tsconfig.json", "{}")
+    create_file(tmp_path, "data.csv", "a,b\n" * 100)
+    create_file(tmp_path, "Makefile", "all:\n")
+
+    sniffed = []
+    original = RepositoryScanner._sniff
+    monkeypatch.setattr(RepositoryScanner, "_sniff", lambda self, path, ext: sniffed.append(path) or original(self, path, ext))
+
+    files, stats = scan(tmp_path, use_git=False, extensions={".py", ".md"}, keep_names={"tsconfig.json"})
+    assert files == ["README.md", "app.py", "tsconfig.json"]
+    assert stats.skipped["unsupported"] == 2
+    assert stats.skipped_bytes["unsupported"] == 400 + 5
+    assert sorted(os.path.basename(p) for p in sniffed) == ["README.md", "app.py", "tsconfig.json"]
+
+def test_git_listing_matches_walk(tmp_path):
+    repo = git.Repo.init(tmp_path)
+    create_file(tmp_path, ".gitignore", "*.tmp\n")
+    create_file(tmp_path, ".autowikiignore", "docs/\n")
+    create_file(tmp_path, "z.py", "z = 1")
+    create_file(tmp_path, "a/b.py", "b = 1")
+    create_file(tmp_path, "a/c/d.py", "d = 1")
+    create_file(tmp_path, "scratch.tmp", "tmp")
+    create_file(tmp_path, "docs/guide.md", "# Guide")
+    create_file(tmp_path, "untracked.py", "u = 1")
+    repo.index.add(["z.py", "a/b.py", "a/c/d.py", "docs/guide.md"])
+
+    files, stats = scan(tmp_path, use_git=True)
+    assert stats.source == "git"
+    assert files == ["untracked.py", "z.py", "a/b.py", "a/c/d.py"]
+    assert files == scan(tmp_path, use_git=False)[0]
+
+def test_broken_git_dir_falls_back_to_walk(tmp_path):
+    create_file(tmp_path, ".git/config", "not a repo")
+    create_file(tmp_path, "valid.py", "def ok(): pass")
+    files, stats = scan(tmp_path, use_git=True)
+    assert files == ["valid.py"]
+    assert stats.source == "walk"
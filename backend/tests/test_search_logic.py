@@ -3,6 +3,9 @@ import json
 import os
 from unittest.mock import MagicMock, patch
 from backend.app.services.search import SearchService
+from backend.app.services.graph import GraphService
+from backend.app.services.lexical import LexicalIndexService
+from backend.app.services.manifest import ManifestStore
 
 # Mock data
 MOCK_TREE = {
@@ -35,46 +38,237 @@ MOCK_VECTOR_RESULTS = [
 ]
 
 @pytest.fixture
-def search_service():
-    service = SearchService()
-    service.storage = MagicMock()
-    service.graph_service = MagicMock()
+def search_service(tmp_path):
+    graph_service = GraphService(base_path=str(tmp_path / "graphs"))
+    # Tree as written by build_module_tree
+    with open(graph_service._get_tree_path("test_project"), "w") as f:
+        json.dump(MOCK_TREE, f)
+
+    lexical_index = LexicalIndexService(base_path=str(tmp_path / "symbols"))
+    manifest_store = ManifestStore(base_path=str(tmp_path / "manifests"))
+    service = SearchService(storage=MagicMock(), graph_service=graph_service, lexical_index=lexical_index,
+                            manifest_store=manifest_store)
     return service
 
 def test_search_marking(search_service):
     # Setup mocks
     search_service.storage.query_code.return_value = MOCK_VECTOR_RESULTS
-    
-    # Mock file reading for tree
-    with patch("builtins.open", new_callable=MagicMock) as mock_open:
-        mock_file = MagicMock()
-        mock_file.__enter__.return_value = mock_file
-        # Configure json.load to return our mock tree
-        with patch("json.load", return_value=MOCK_TREE):
-            with patch("os.path.exists", return_value=True):
-                 # Run search
-                 result = search_service.search("test_project", "query")
-                 
-                 tree = result["tree"]
-                 
-                 # Verify structure
-                 assert tree["is_active"] == True # Root should be active
-                 
-                 # Verify README hit
-                 readme = next(c for c in tree["children"] if c["id"] == "README.md")
-                 assert readme["is_active"] == True
-                 assert readme.get("is_hit") == True
-                 assert readme["search_score"] == 0.3
-                 
-                 # Verify Folder active
-                 backend = next(c for c in tree["children"] if c["id"] == "backend/app")
-                 assert backend["is_active"] == True
-                 
-                 # Verify main.py hit
-                 main_py = next(c for c in backend["children"] if c["id"] == "backend/app/main.py")
-                 assert main_py["is_active"] == True
-                 assert main_py.get("is_hit") == True
-                 
-                 # Verify utils.py NOT hit
-                 utils_py = next(c for c in backend["children"] if c["id"] == "backend/app/utils.py")
-                 assert utils_py.get("is_active") is None
+
+    # Run search
+    result = search_service.search("test_project", "query")
+
+    tree = result["tree"]
+
+    # Verify structure
+    assert tree["is_active"] == True # Root should be active
+
+    # Verify README hit
+    readme = next(c for c in tree["children"] if c["id"] == "README.md")
+    assert readme["is_active"] == True
+    assert readme.get("is_hit") == True
+    assert readme["search_score"] == 0.3
+
+    # Verify Folder active
+    backend = next(c for c in tree["children"] if c["id"] == "backend/app")
+    assert backend["is_active"] == True
+
+    # Verify main.py hit
+    main_py = next(c for c in backend["children"] if c["id"] == "backend/app/main.py")
+    assert main_py["is_active"] == True
+    assert main_py.get("is_hit") == True
+
+    # Verify utils.py NOT hit
+    utils_py = next(c for c in backend["children"] if c["id"] == "backend/app/utils.py")
+    assert utils_py.get("is_active") is None
+
+def test_search_does_not_mutate_cached_tree(search_service):
+    search_service.storage.query_code.return_value = MOCK_VECTOR_RESULTS
+
+    search_service.search("test_project", "query")
+
+    # Second search is served from memory, and the cached tree stays pristine
+    with patch("builtins.open", side_effect=AssertionError("tree must not be re-read")):
+        search_service.search("test_project", "query")
+    assert search_service.graph_service.get_module_tree("test_project") == MOCK_TREE
+
+def test_search_active_only_returns_pruned_subtree(search_service):
+    search_service.storage.query_code.return_value = [MOCK_VECTOR_RESULTS[0]]
+
+    tree = search_service.search("test_project", "query", active_only=True)["tree"]
+
+    assert [c["id"] for c in tree["children"]] == ["backend/app"]
+    backend = tree["children"][0]
+    assert [c["id"] for c in backend["children"]] == ["backend/app/main.py"]
+    assert backend["children"][0]["is_hit"] == True
+
+def test_get_node_resolves_source_from_chunk(search_service):
+    from backend.app.schemas import FileStructure, ClassInfo
+    graph_service = search_service.graph_service
+    graph_service.update_dependency_graph("test_project", FileStructure(
+        file_path="a.py",
+        classes=[ClassInfo(name="A", bases=[], code="class A: pass", chunk_id="c1", start_line=0, end_line=0)]
+    ))
+    graph_service.save_graph("test_project")
+    # The graph itself holds no source
+    assert "code" not in graph_service.get_node_attributes("test_project", "a.py::A")
+
+    search_service.storage.get_chunks.return_value = [{"id": "c1", "content": "class A: pass", "metadata": {}}]
+    node = search_service.get_node("test_project", "a.py::A")
+    assert node["source"] == "class A: pass"
+    assert node["attributes"]["chunk_id"] == "c1"
+    search_service.storage.get_chunks.assert_called_once_with("test_project", ["c1"])
+
+    assert search_service.get_node("test_project", "missing") is None
+
+def test_get_node_reassembles_split_chunks(search_service):
+    from backend.app.schemas import FileStructure, FunctionInfo
+    from backend.app.services.chunker import part_chunk_id
+    graph_service = search_service.graph_service
+    graph_service.update_dependency_graph("test_project", FileStructure(
+        file_path="a.py",
+        functions=[FunctionInfo(name="f", args=[], code=None, chunk_id="c1", start_line=0, end_line=3)]
+    ))
+
+    def get_chunks(project_id, ids):
+        store = {
+            "c1": {"id": "c1", "content": "def f():\n    a = 1", "metadata": {"part": 0, "parts": 3}},
+            part_chunk_id("c1", 1): {"id": part_chunk_id("c1", 1), "content": "def f():\n    b = 2",
+                                     "metadata": {"part": 1, "parts": 3, "context_lines": 1}},
+            part_chunk_id("c1", 2): {"id": part_chunk_id("c1", 2), "content": "def f():\n    return a + b",
+                                     "metadata": {"part": 2, "parts": 3, "context_lines": 1}},
+        }
+        # Out of order, as a vector store may return them
+        return [store[i] for i in reversed(ids) if i in store]
+    search_service.storage.get_chunks.side_effect = get_chunks
+
+    node = search_service.get_node("test_project", "a.py::f")
+    assert node["source"] == "def f():\n    a = 1\n    b = 2\n    return a + b"
+
+def test_exact_symbol_query_skips_vector_search(search_service):
+    search_service.lexical_index.get_index("test_project").add_chunks([
+        {"id": "u1", "content": "def build_module_tree(): pass",
+         "metadata": {"name": "build_module_tree", "file_path": "backend/app/utils.py", "type": "function_definition"}}
+    ])
+    search_service.storage.get_chunks.return_value = [{"id": "u1", "content": "def build_module_tree(): pass", "metadata": {}}]
+
+    result = search_service.search("test_project", "build_module_tree")
+
+    search_service.storage.query_code.assert_not_called()
+    utils_py = result["tree"]["children"][0]["children"][1]
+    assert utils_py["is_hit"] == True
+    assert utils_py["matched_chunks"][0]["match"] == "exact"
+    # Lexical hits get their content from the store by ID
+    assert utils_py["matched_chunks"][0]["content"] == "def build_module_tree(): pass"
+
+def test_free_text_query_fuses_lexical_and_vector_results(search_service):
+    search_service.lexical_index.get_index("test_project").add_chunks([
+        {"id": "chunk1", "content": "load the config", "metadata": {"name": "load", "file_path": "backend/app/main.py"}},
+        {"id": "u2", "content": "config helpers", "metadata": {"name": "helpers", "file_path": "backend/app/utils.py"}},
+    ])
+    search_service.storage.query_code.return_value = [dict(MOCK_VECTOR_RESULTS[0], content="load the config")]
+    search_service.storage.get_chunks.return_value = []
+
+    result = search_service.search("test_project", "load config")
+
+    backend = result["tree"]["children"][0]
+    main_py, utils_py = backend["children"]
+    # Found by both retrievers: keeps its vector distance and ranks first
+    assert main_py["search_score"] == 0.2
+    assert main_py["matched_chunks"][0]["rrf_score"] > utils_py["matched_chunks"][0]["rrf_score"]
+    assert utils_py["is_hit"] == True
+    assert result["stats"]["lexical_results"] == 2
+
+def test_repeated_search_is_served_from_cache_until_invalidated(search_service):
+    search_service.storage.query_code.return_value = MOCK_VECTOR_RESULTS
+
+    first = search_service.search("test_project", "query")
+    assert search_service.search("test_project", "query") is first
+    assert search_service.storage.query_code.call_count == 1
+    # Different parameters are a different entry
+    search_service.search("test_project", "query", limit=3)
+    assert search_service.storage.query_code.call_count == 2
+
+    search_service.cache.invalidate_project("test_project")
+    search_service.search("test_project", "query")
+    assert search_service.storage.query_code.call_count == 3
+    assert search_service.cache_stats()["results"]["hits"] == 1
+
+def test_search_batch_uses_one_vector_lookup(search_service):
+    search_service.lexical_index.get_index("test_project").add_chunks([
+        {"id": "u1", "content": "def build_module_tree(): pass",
+         "metadata": {"name": "build_module_tree", "file_path": "backend/app/utils.py"}}
+    ])
+    search_service.storage.query_code_batch.return_value = [
+        [dict(MOCK_VECTOR_RESULTS[0], content="a")],
+        [dict(MOCK_VECTOR_RESULTS[1], content="b")],
+    ]
+    search_service.storage.get_chunks.return_value = [{"id": "u1", "content": "def build_module_tree(): pass"}]
+
+    responses = search_service.search_batch(
+        "test_project", ["entry point", "build_module_tree", "docs", "entry point"], limit=2
+    )
+
+    # The exact symbol query is answered lexically; the other two share one lookup
+    search_service.storage.query_code_batch.assert_called_once_with("test_project", ["entry point", "docs"], n_results=6,
+                                                                     revision=None)
+    search_service.storage.query_code.assert_not_called()
+    assert [r["query"] for r in responses] == ["entry point", "build_module_tree", "docs", "entry point"]
+    assert responses[0]["results"][0]["id"] == "chunk1"
+    assert responses[1]["results"][0]["content"] == "def build_module_tree(): pass"
+    assert responses[2]["results"][0]["id"] == "chunk2"
+    assert "tree" not in responses[0]
+
+    # Cached per query; the tree overlay is opt-in
+    search_service.search_batch("test_project", ["docs"], limit=2)
+    assert search_service.storage.query_code_batch.call_count == 1
+    # A lone uncached query takes the single-query path
+    search_service.storage.query_code.return_value = [dict(MOCK_VECTOR_RESULTS[1], content="b")]
+    with_tree = search_service.search_batch("test_project", ["docs"], limit=2, include_tree=True)
+    readme = with_tree[0]["tree"]["children"][1]
+    assert readme["is_hit"] == True
+
+def test_rerank_promotes_connected_important_files(search_service):
+    from backend.app.schemas import FileStructure, ImportInfo
+    graph_service = search_service.graph_service
+    graph_service.update_dependency_graph("ranked", FileStructure(
+        file_path="a.py", imports=[ImportInfo(module="b", type="local_absolute")]
+    ))
+    graph_service.update_dependency_graph("ranked", FileStructure(file_path="b.py"))
+    graph_service.build_edges("ranked")
+    graph_service.build_module_tree("ranked")
+
+    search_service.storage.query_code.return_value = [
+        {"id": "r", "content": "", "distance": 0.30, "metadata": {"file_path": "notes.txt"}},
+        {"id": "a", "content": "", "distance": 0.31, "metadata": {"file_path": "a.py"}},
+        {"id": "b", "content": "", "distance": 0.32, "metadata": {"file_path": "b.py"}},
+    ]
+
+    result = search_service.search("ranked", "how are things wired", limit=2)
+
+    # a.py and b.py import each other's cluster and b.py is depended upon;
+    # the isolated, marginally closer notes.txt falls out of the top 2
+    files = {c["id"]: c for c in result["tree"]["children"]}
+    assert files["a.py"]["is_hit"] and files["b.py"]["is_hit"]
+    assert result["stats"]["hits_found"] == 2
+    assert files["b.py"]["matched_chunks"][0]["rank_score"] > 1.0
+
+def test_search_is_scoped_to_the_requested_revision(search_service):
+    graph_service = search_service.graph_service
+    with open(graph_service._get_tree_path("test_project@dev"), "w") as f:
+        json.dump(MOCK_TREE, f)
+    search_service.manifest_store.save_revision("test_project", "HEAD", "a" * 40)
+    search_service.manifest_store.save_revision("test_project", "dev", "b" * 40)
+    search_service.storage.query_code.return_value = MOCK_VECTOR_RESULTS
+
+    assert "tree" in search_service.search("test_project", "query", ref="bbbbbbbb")
+    search_service.storage.query_code.assert_called_with("test_project", "query", n_results=30,
+                                                         revision="test_project@dev")
+    search_service.search("test_project", "query")
+    search_service.storage.query_code.assert_called_with("test_project", "query", n_results=30,
+                                                         revision="test_project")
+
+    with pytest.raises(ValueError):
+        search_service.search("test_project", "query", ref="missing")
+    with pytest.raises(ValueError):
+        search_service.search_batch("test_project", ["query"], ref="missing")
+    assert search_service.get_node("test_project", "README.md", ref="missing") is None
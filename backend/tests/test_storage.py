@@ -2,13 +2,17 @@ import os
 import shutil
 import pytest
 import hashlib
-from backend.app.services.storage import VectorStorage
+from unittest.mock import MagicMock
+from backend.app.services.storage import VectorStorage, ChunkWriter
 from backend.app.services.ingestion import IngestionService
+from backend.app.services.embeddings import EmbeddingEngine, EmbeddingCache, HashEmbeddingBackend
 
 @pytest.fixture
 def vector_storage(tmp_path):
     db_path = tmp_path / "chromadb"
-    return VectorStorage(persistence_path=str(db_path))
+    # Offline backend: the tests must not download the ONNX model
+    embedder = EmbeddingEngine(HashEmbeddingBackend(), cache=EmbeddingCache(str(tmp_path / "cache.db")))
+    return VectorStorage(persistence_path=str(db_path), embedder=embedder)
 
 def test_vector_storage_isolation(vector_storage):
     project1 = "project_1"
@@ -55,3 +59,43 @@ def test_vector_storage_overwrite(vector_storage):
     
     coll = vector_storage.get_collection(project_id)
     assert coll.count() == 1
+
+def test_chunk_writer_batches_and_progress():
+    storage = MagicMock()
+    progress = []
+
+    with ChunkWriter(storage, "proj", batch_size=4, on_batch=lambda n, b: progress.append((n, b))) as writer:
+        for i in range(10):
+            writer.add([{"id": f"c{i}", "content": "x", "metadata": {}}])
+
+    sizes = [len(call[0][1]) for call in storage.save_chunks.call_args_list]
+    assert sizes == [4, 4, 2]
+    assert writer.chunks_written == 10
+    assert writer.batches_committed == 3
+    assert progress == [(4, 1), (8, 2), (10, 3)]
+
+def test_chunk_writer_surfaces_storage_errors():
+    storage = MagicMock()
+    storage.save_chunks.side_effect = RuntimeError("chroma down")
+
+    writer = ChunkWriter(storage, "proj", batch_size=1)
+    writer.add([{"id": "c1", "content": "x", "metadata": {}}])
+    with pytest.raises(RuntimeError, match="chroma down"):
+        writer.close()
+
+def test_query_code_batch_returns_results_per_query(vector_storage):
+    vector_storage.save_chunks("p", [
+        {"id": "c1", "content": "parse the config file", "metadata": {"file_path": "config.py"}},
+        {"id": "c2", "content": "render html template", "metadata": {"file_path": "views.py"}},
+    ])
+    embed_calls = []
+    backend = vector_storage.embedder.backend
+    original = backend.embed
+    backend.embed = lambda texts: embed_calls.append(list(texts)) or original(texts)
+
+    results = vector_storage.query_code_batch("p", ["config file", "html template"], n_results=1)
+
+    assert [r[0]["id"] for r in results] == ["c1", "c2"]
+    # Both queries were embedded in one call
+    assert embed_calls == [["config file", "html template"]]
+    assert vector_storage.query_code_batch("missing", ["a", "b"]) == [[], []]
@@ -53,7 +53,12 @@ export default function Home() {
     setIngestStats(null);
     setTree(null); // Clear previous tree
     try {
-      const stats = await triggerIngest(repoUrl);
+      const stats = await triggerIngest(repoUrl, (job) =>
+        setIngestStats(
+          `${job.phase}: ${job.progress.files_parsed}/${job.progress.files_total} files parsed, ` +
+          `${job.progress.chunks_embedded} chunks embedded`
+        )
+      );
       setProjectId(stats.project_id); // Store project ID for search
       setIngestStats(
         `Ingested ${stats.files_processed} files (${stats.code_files} code, ${stats.doc_files} docs) ` +
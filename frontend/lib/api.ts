@@ -1,4 +1,4 @@
-import { SearchResult, IngestStats, SearchResponse } from "./types";
+import { SearchResult, IngestStats, SearchResponse, IngestJob } from "./types";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
@@ -18,7 +18,10 @@ export async function searchCode(query: string, projectId: string): Promise<Sear
   return data; // Returns the full object { tree, stats, ... }
 }
 
-export async function triggerIngest(repoUrl: string): Promise<IngestStats & { project_id: string }> {
+export async function triggerIngest(
+  repoUrl: string,
+  onProgress?: (job: IngestJob) => void,
+): Promise<IngestStats & { project_id: string }> {
   const res = await fetch(`${API_URL}/api/ingest`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
@@ -30,8 +33,28 @@ export async function triggerIngest(repoUrl: string): Promise<IngestStats & { pr
     throw new Error(errorData.detail || "Ingestion failed");
   }
   
-  const data = await res.json();
-  return data.stats;
+  // Ingestion runs as a background job; poll until it finishes
+  const { job_id } = await res.json();
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+    const job = await getJob(job_id);
+    onProgress?.(job);
+    if (job.state === "succeeded" && job.stats) return job.stats as IngestStats & { project_id: string };
+    if (job.state === "failed") throw new Error(job.error || "Ingestion failed");
+    if (job.state === "cancelled") throw new Error("Ingestion cancelled");
+  }
+}
+
+export async function getJob(jobId: string): Promise<IngestJob> {
+  const res = await fetch(`${API_URL}/api/jobs/${jobId}`);
+  if (!res.ok) throw new Error("Failed to fetch job status");
+  return res.json();
+}
+
+export async function cancelJob(jobId: string): Promise<IngestJob> {
+  const res = await fetch(`${API_URL}/api/jobs/${jobId}/cancel`, { method: "POST" });
+  if (!res.ok) throw new Error("Failed to cancel job");
+  return res.json();
 }
 
 export async function clearDatabase(projectId: string): Promise<{ deleted_count: number }> {
@@ -9,7 +9,9 @@ export interface SearchResult {
     start_line: number;
     end_line: number;
   };
-  distance: number;
+  distance?: number | null;
+  match?: "exact" | "prefix" | "bm25";
+  rrf_score?: number;
 }
 
 export interface CodemapNode {
@@ -21,7 +23,7 @@ export interface CodemapNode {
   importance?: number;
   is_active?: boolean;
   is_hit?: boolean;
-  search_score?: number;
+  search_score?: number | null;
   matched_chunks?: SearchResult[];
 }
 
@@ -30,6 +32,7 @@ export interface SearchResponse {
   stats: {
     hits_found: number;
     vector_results: number;
+    lexical_results?: number;
   };
   fallback?: boolean;
   results?: SearchResult[];
@@ -42,5 +45,43 @@ export interface IngestStats {
   doc_files: number;
   code_chunks: number;
   doc_chunks: number;
+  embedded_tokens?: number;
+  source_tokens?: number;
+  token_reduction?: number;
+  files_skipped?: number;
+  scan?: ScanStats;
+  chunks_reused?: number;
   repo_url?: string;
+  ref?: string;
+  commit?: string;
+}
+
+export interface ScanStats {
+  source: "git" | "walk";
+  files_seen: number;
+  files_yielded: number;
+  bytes_yielded: number;
+  files_skipped: number;
+  dirs_ignored: number;
+  skipped: Record<string, number>;
+  skipped_bytes: Record<string, number>;
+  seconds: number;
+}
+
+
+export interface IngestJob {
+  job_id: string;
+  project_id: string;
+  repo_url: string;
+  ref: string | null;
+  state: "queued" | "running" | "succeeded" | "failed" | "cancelled";
+  phase: string;
+  progress: {
+    files_total: number;
+    files_parsed: number;
+    chunks_embedded: number;
+    edges_built: number;
+  };
+  stats: IngestStats | null;
+  error: string | null;
 }